@@ -0,0 +1,130 @@
+import os
+import shutil
+from typing import List, Dict, Tuple, Optional
+from safetensors_utils import read_header, num_elements, estimate_f16_bytes
+from gguf_export import select_tensors, QUANTIZATION_THRESHOLD
+
+# Average bits per weight of the quantized tensors in each output format. The
+# _M/_L mixes keep some tensors at a higher type, so theirs are a blend.
+BITS_PER_WEIGHT = {
+    "Q2_K": 2.625,
+    "Q2_K_S": 2.625,
+    "Q3_K_S": 3.4375,
+    "Q3_K_M": 3.91,
+    "Q3_K_L": 4.27,
+    "Q4_0": 4.5,
+    "Q4_1": 5.0,
+    "Q4_K": 4.89,
+    "Q4_K_S": 4.5,
+    "Q4_K_M": 4.89,
+    "Q5_0": 5.5,
+    "Q5_1": 6.0,
+    "Q5_K": 5.69,
+    "Q5_K_S": 5.5,
+    "Q5_K_M": 5.69,
+    "Q6_K": 6.5625,
+    "Q8_0": 8.5,
+    "F16": 16,
+    "BF16": 16,
+    "F32": 32,
+}
+
+# Headroom for GGUF metadata and estimation error on every file
+FILE_OVERHEAD_BYTES = 4 * 1024 * 1024
+
+def format_bytes(nbytes: int) -> str:
+    if abs(nbytes) >= 1024 ** 3:
+        return f"{nbytes / 1024 ** 3:.1f} GB"
+    return f"{nbytes / 1024 ** 2:.0f} MB"
+
+def estimate_output_bytes(path: str, fmt: Optional[str] = None) -> int:
+    """Expected size of an output of path in fmt; None means the F16 intermediate"""
+    bits = BITS_PER_WEIGHT.get(fmt, 16)
+    try:
+        tensors = select_tensors(read_header(path))
+    except (OSError, ValueError, KeyError, TypeError):
+        tensors = None
+    if not tensors:
+        # Unknown layout; scale the F16 estimate by the format's density
+        return int(estimate_f16_bytes(path) * bits / 16) + FILE_OVERHEAD_BYTES
+
+    total = 0
+    for info in tensors.values():
+        n_params = num_elements(info["shape"])
+        if fmt == "F32" or len(info["shape"]) == 1 or n_params <= QUANTIZATION_THRESHOLD:
+            # Norms, biases and tiny tensors are stored unquantized
+            total += n_params * 4
+        else:
+            total += int(n_params * bits / 8)
+    return total + FILE_OVERHEAD_BYTES
+
+def existing_parent(path: str) -> str:
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+def device_of(path: str) -> Tuple[int, str]:
+    """Filesystem id of the nearest existing directory of path, and that directory"""
+    directory = existing_parent(path)
+    return os.stat(directory).st_dev, directory
+
+def free_bytes(path: str) -> int:
+    return shutil.disk_usage(existing_parent(path)).free
+
+def estimate_job(item: Dict, outputs: List[Dict], f16_path: Optional[str]) -> Dict[int, Dict]:
+    """Bytes a job leaves on each device (outputs) and briefly needs there (F16)"""
+    needs = {}
+    for output in outputs:
+        nbytes = estimate_output_bytes(item["input"], output["format"])
+        output["estimated_bytes"] = nbytes
+        device, directory = device_of(output["output"])
+        need = needs.setdefault(device, {"directory": directory, "outputs": 0, "f16": 0})
+        need["outputs"] += nbytes
+    if f16_path:
+        device, directory = device_of(f16_path)
+        need = needs.setdefault(device, {"directory": directory, "outputs": 0, "f16": 0})
+        need["f16"] += estimate_output_bytes(item["input"], None)
+    return needs
+
+class DiskAdmission:
+    """Admits jobs in plan order while their outputs and F16 fit in free space.
+
+    Outputs stay on disk, so each admitted job lowers the space left for the
+    next ones; the F16 is only needed until the job's quantizations finish.
+    A job that doesn't fit is rejected, and later, smaller jobs may still run.
+    """
+
+    def __init__(self, min_free_bytes: int = 0, keep_f16: bool = False):
+        self.min_free_bytes = max(0, min_free_bytes or 0)
+        self.keep_f16 = keep_f16
+        self.available = {}
+        self.directories = {}
+
+    def _available(self, device: int, directory: str) -> int:
+        if device not in self.available:
+            self.available[device] = free_bytes(directory) - self.min_free_bytes
+            self.directories[device] = directory
+        return self.available[device]
+
+    def admit(self, needs: Dict[int, Dict]) -> Optional[str]:
+        """Reserve space for a job; returns why it doesn't fit, or None if admitted"""
+        for device, need in needs.items():
+            available = self._available(device, need["directory"])
+            required = need["outputs"] + need["f16"]
+            if required > available:
+                return (
+                    f"Not enough disk space in {need['directory']}: needs about {format_bytes(required)}, "
+                    f"{format_bytes(max(available, 0))} available"
+                )
+        for device, need in needs.items():
+            self.available[device] -= need["outputs"] + (need["f16"] if self.keep_f16 else 0)
+        return None
+
+    def intermediate_headroom(self, devices: List[int]) -> Optional[int]:
+        """Space left for F16 files that exist at the same time once all admitted outputs are written"""
+        left = [self.available[device] for device in devices if device in self.available]
+        return max(0, min(left)) if left else None
@@ -0,0 +1,356 @@
+import os
+import sys
+import json
+import time
+import shutil
+import struct
+import resource
+import tempfile
+import argparse
+import threading
+from typing import List, Dict, Tuple
+import numpy as np
+from tabulate import tabulate
+import converter
+from events import EventRecorder
+from fingerprint import FingerprintIndex
+from process_runner import ProcessRunner
+from fake_quantize import CPU_PASSES_ENV, WRITE_DELAY_ENV, FSYNC_ENV
+
+# Flux geometry at a few scales: hidden size, double blocks, single blocks. "full" matches flux1-dev (~12B parameters)
+PRESETS = {
+    "tiny": (256, 2, 4),
+    "small": (768, 4, 8),
+    "medium": (1536, 8, 16),
+    "full": (3072, 19, 38),
+}
+
+# Numbers compared against the baseline, and whether a larger value is an improvement
+METRICS = {
+    "wall_seconds": False,
+    "peak_rss_mb": False,
+    "child_peak_rss_mb": False,
+    "disk_high_water_mb": False,
+}
+
+SAFETENSORS_DTYPES = {"BF16": 2, "F16": 2, "F32": 4}
+
+def flux_tensors(hidden: int, double_blocks: int, single_blocks: int) -> Dict[str, Tuple[int, ...]]:
+    """Names and shapes of a Flux transformer checkpoint in the original (non-diffusers) layout"""
+    mlp = hidden * 4
+    head_dim = 128
+    tensors = {}
+
+    def linear(name: str, out_features: int, in_features: int) -> None:
+        tensors[f"{name}.weight"] = (out_features, in_features)
+        tensors[f"{name}.bias"] = (out_features,)
+
+    linear("img_in", hidden, 64)
+    linear("txt_in", hidden, 4096)
+    for embedder, in_features in (("time_in", 256), ("vector_in", 768), ("guidance_in", 256)):
+        linear(f"{embedder}.in_layer", hidden, in_features)
+        linear(f"{embedder}.out_layer", hidden, hidden)
+    for i in range(double_blocks):
+        for stream in ("img", "txt"):
+            block = f"double_blocks.{i}.{stream}"
+            linear(f"{block}_mod.lin", 6 * hidden, hidden)
+            linear(f"{block}_attn.qkv", 3 * hidden, hidden)
+            tensors[f"{block}_attn.norm.query_norm.scale"] = (head_dim,)
+            tensors[f"{block}_attn.norm.key_norm.scale"] = (head_dim,)
+            linear(f"{block}_attn.proj", hidden, hidden)
+            linear(f"{block}_mlp.0", mlp, hidden)
+            linear(f"{block}_mlp.2", hidden, mlp)
+    for i in range(single_blocks):
+        block = f"single_blocks.{i}"
+        linear(f"{block}.linear1", 3 * hidden + mlp, hidden)
+        linear(f"{block}.linear2", hidden, hidden + mlp)
+        tensors[f"{block}.norm.query_norm.scale"] = (head_dim,)
+        tensors[f"{block}.norm.key_norm.scale"] = (head_dim,)
+        linear(f"{block}.modulation.lin", 3 * hidden, hidden)
+    linear("final_layer.linear", 64, hidden)
+    linear("final_layer.adaLN_modulation.1", 2 * hidden, hidden)
+    return tensors
+
+def weight_pattern(dtype: str, seed: int, nbytes: int = 4 * 1024 ** 2) -> bytes:
+    """Bytes of normally distributed weights (std 0.02, like trained Flux layers) to tile into tensors"""
+    values = np.random.default_rng(seed).normal(0.0, 0.02, nbytes // SAFETENSORS_DTYPES[dtype]).astype(np.float32)
+    if dtype == "BF16":
+        return (values.view(np.uint32) >> 16).astype(np.uint16).tobytes()
+    if dtype == "F16":
+        return values.astype(np.float16).tobytes()
+    return values.tobytes()
+
+def write_checkpoint(path: str, tensors: Dict[str, Tuple[int, ...]], dtype: str = "BF16", seed: int = 0) -> int:
+    """Write a synthetic safetensors file, streaming the data so any scale fits in memory; returns its size"""
+    element_size = SAFETENSORS_DTYPES[dtype]
+    header = {"__metadata__": {"format": "pt"}}
+    offset = 0
+    for name, shape in tensors.items():
+        nbytes = int(np.prod(shape)) * element_size
+        header[name] = {"dtype": dtype, "shape": list(shape), "data_offsets": [offset, offset + nbytes]}
+        offset += nbytes
+    encoded = json.dumps(header).encode("utf-8")
+    # Tensor data starts 8-byte aligned, as the reference writer does
+    encoded += b" " * (-len(encoded) % 8)
+
+    pattern = weight_pattern(dtype, seed)
+    temp = path + ".part"
+    with open(temp, "wb") as f:
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        position = 0
+        for info in header.values():
+            if "data_offsets" not in info:
+                continue
+            remaining = info["data_offsets"][1] - info["data_offsets"][0]
+            while remaining:
+                piece = pattern[position:position + remaining]
+                f.write(piece)
+                remaining -= len(piece)
+                position = (position + len(piece)) % len(pattern)
+    os.replace(temp, path)
+    return os.path.getsize(path)
+
+def tree_bytes(path: str) -> int:
+    """Allocated size of everything under path, counting hard-linked files once"""
+    seen = set()
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                st = os.stat(os.path.join(root, name))
+            except OSError:
+                # Renamed or removed while walking
+                continue
+            if (st.st_dev, st.st_ino) in seen:
+                continue
+            seen.add((st.st_dev, st.st_ino))
+            total += st.st_blocks * 512 if hasattr(st, "st_blocks") else st.st_size
+    return total
+
+class DiskSampler:
+    """Polls the size of a directory in the background and keeps its high-water mark above the starting size"""
+
+    def __init__(self, path: str, interval: float = 0.1):
+        self.path = path
+        self.interval = interval
+        self.start = tree_bytes(path)
+        self.peak = self.start
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="disk-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while True:
+            self.peak = max(self.peak, tree_bytes(self.path))
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self) -> "DiskSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, tree_bytes(self.path))
+
+    @property
+    def high_water(self) -> int:
+        return self.peak - self.start
+
+def self_peak_rss() -> int:
+    """Peak RSS in bytes of this process, which runs the exports"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return usage if sys.platform == "darwin" else usage * 1024
+
+def fake_quantize_command(directory: str) -> str:
+    """Executable that runs fake_quantize.py with this interpreter, passed where llama-quantize would be"""
+    path = os.path.join(directory, "llama-quantize")
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_quantize.py")
+    with open(path, "w") as f:
+        f.write(f"#!/bin/sh\nexec \"{sys.executable}\" \"{script}\" \"$@\"\n")
+    os.chmod(path, 0o755)
+    return path
+
+def make_models(args, models_dir: str) -> List[str]:
+    """Synthetic checkpoints for the run, reused when a previous run already wrote them"""
+    hidden, double_blocks, single_blocks = PRESETS[args.scale]
+    hidden = args.hidden or hidden
+    double_blocks = args.double_blocks if args.double_blocks is not None else double_blocks
+    single_blocks = args.single_blocks if args.single_blocks is not None else single_blocks
+    tensors = flux_tensors(hidden, double_blocks, single_blocks)
+    os.makedirs(models_dir, exist_ok=True)
+    paths = []
+    for i in range(args.models):
+        path = os.path.join(models_dir, f"flux-{hidden}x{double_blocks}x{single_blocks}-{args.dtype}-{i}.safetensors")
+        if not os.path.exists(path):
+            print(f"Writing synthetic checkpoint {path}")
+            # A different seed per model keeps content fingerprints apart, so nothing is deduplicated
+            write_checkpoint(path, tensors, args.dtype, seed=i)
+        paths.append(path)
+    return paths
+
+def run_once(args, models: List[str], workdir: str, llama_quantize: str) -> Dict:
+    out_dir = os.path.join(workdir, "out")
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir)
+    # A fresh index each run so fingerprinting is timed the same way every time
+    index_path = os.path.join(workdir, "fingerprints.sqlite")
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+    events = EventRecorder()
+    start = time.time()
+    # Intermediates are written next to the inputs, so the whole work directory is watched
+    with DiskSampler(workdir, args.sample_interval) as disk:
+        plan = converter.generate_conversion_plan(models, args.formats, fingerprints=FingerprintIndex(index_path), output_dir=out_dir)
+        planned = time.time()
+        converter.process_models(
+            plan,
+            os.path.dirname(os.path.abspath(__file__)),
+            llama_quantize,
+            output_dir=out_dir,
+            max_workers=args.max_workers,
+            threads_per_job=args.threads_per_job or None,
+            pipeline=args.pipeline,
+            native_export=True,
+            direct=not args.no_direct,
+            events=events,
+            check_disk_space=False,
+            runner=ProcessRunner(),
+            export_threads=args.export_threads or os.cpu_count() or 1
+        )
+    end = time.time()
+
+    keys = ["stage", "runs", "failed", "mb_in", "mb_out", "seconds", "mb_per_s"]
+    stages = {}
+    for row in events.summary():
+        stage = dict(zip(keys, row))
+        name = stage.pop("stage")
+        stages[name] = {key: float(value) for key, value in stage.items()}
+    return {
+        "wall_seconds": end - start,
+        "plan_seconds": planned - start,
+        "stages": stages,
+        "failed_outputs": sum(1 for item in plan for out in item["outputs"] if out.get("status") == "failed"),
+        "peak_rss_mb": self_peak_rss() / 1024 ** 2,
+        # RUSAGE_CHILDREN would include the memory each child inherited from this process before exec
+        "child_peak_rss_mb": max((record.get("peak_rss") or 0 for record in events.stages if record["stage"] == "quantize"), default=0) / 1024 ** 2,
+        "disk_high_water_mb": disk.high_water / 1024 ** 2,
+    }
+
+def flatten(result: Dict) -> Dict[str, Tuple[float, bool]]:
+    """Comparable numbers of a result: value and whether higher is better"""
+    values = {name: (result[name], higher) for name, higher in METRICS.items() if name in result}
+    for stage, totals in result.get("stages", {}).items():
+        values[f"{stage} MB/s"] = (totals["mb_per_s"], True)
+    return values
+
+def compare(result: Dict, baseline: Dict, tolerance: float) -> Tuple[List[List], List[str]]:
+    """Table of result against baseline and the metrics that got worse by more than tolerance"""
+    rows = []
+    regressions = []
+    current = flatten(result)
+    for name, (before, higher) in flatten(baseline).items():
+        if name not in current:
+            continue
+        after = current[name][0]
+        change = (after - before) / before if before else 0.0
+        worse = -change if higher else change
+        verdict = "REGRESSION" if worse > tolerance else ("better" if worse < -tolerance else "ok")
+        if verdict == "REGRESSION":
+            regressions.append(name)
+        rows.append([name, f"{before:.2f}", f"{after:.2f}", f"{change * 100:+.1f}%", verdict])
+    return rows, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the conversion pipeline on synthetic Flux checkpoints with a stand-in llama-quantize")
+    parser.add_argument("--scale", choices=list(PRESETS), default="tiny", help="Model geometry preset (full is flux1-dev size, ~24 GB in BF16)")
+    parser.add_argument("--hidden", type=int, help="Override the hidden size (a multiple of 256)")
+    parser.add_argument("--double-blocks", type=int, help="Override the number of double blocks")
+    parser.add_argument("--single-blocks", type=int, help="Override the number of single blocks")
+    parser.add_argument("--dtype", choices=list(SAFETENSORS_DTYPES), default="BF16", help="Data type of the synthetic checkpoints")
+    parser.add_argument("--models", type=int, default=1, help="Number of distinct checkpoints to convert")
+    parser.add_argument("--formats", nargs="+", default=["Q8_0", "Q4_K_S", "Q5_K_S"], help="Output formats")
+    parser.add_argument("--max-workers", type=int, default=1, help="Quantizations to run in parallel (0 = one per CPU core)")
+    parser.add_argument("--threads-per-job", type=int, default=0, help="Threads given to each quantization (0 = split the cores evenly)")
+    parser.add_argument("--pipeline", action="store_true", help="Overlap exports and quantizations")
+    parser.add_argument("--no-direct", action="store_true", help="Quantize every format, even those the exporter can write directly")
+    parser.add_argument("--export-threads", type=int, default=0, help="Threads converting export chunks (0 = one per CPU core)")
+    parser.add_argument("--cpu-passes", type=float, default=1.0, help="Stand-in quantizer CPU cost: times every input byte is hashed")
+    parser.add_argument("--write-delay", type=float, default=0.0, help="Stand-in quantizer IO cost: seconds slept per MB written")
+    parser.add_argument("--fsync", action="store_true", help="Stand-in quantizer flushes its output to disk")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs to make; the fastest is reported")
+    parser.add_argument("--workdir", help="Directory for checkpoints and outputs, kept between runs (default: a temporary directory)")
+    parser.add_argument("--sample-interval", type=float, default=0.1, help="Seconds between disk usage samples")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative change that counts as a regression")
+    parser.add_argument("--save-baseline", help="Write this run's results to a JSON file")
+    parser.add_argument("--json", help="Write this run's results and the comparison to a JSON file")
+    args = parser.parse_args()
+
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="flux-gguf-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    os.environ[CPU_PASSES_ENV] = str(args.cpu_passes)
+    os.environ[WRITE_DELAY_ENV] = str(args.write_delay)
+    os.environ[FSYNC_ENV] = "1" if args.fsync else "0"
+
+    try:
+        models = make_models(args, os.path.join(workdir, "models"))
+        llama_quantize = fake_quantize_command(workdir)
+        runs = []
+        for i in range(max(1, args.repeat)):
+            print(f"\n=== Run {i + 1}/{max(1, args.repeat)} ===")
+            runs.append(run_once(args, models, workdir, llama_quantize))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result = min(runs, key=lambda run: run["wall_seconds"])
+    result["config"] = {
+        "scale": args.scale, "models": [os.path.basename(path) for path in models], "formats": args.formats,
+        "max_workers": args.max_workers, "threads_per_job": args.threads_per_job, "pipeline": args.pipeline,
+        "direct": not args.no_direct, "cpu_passes": args.cpu_passes, "write_delay": args.write_delay,
+        "cpus": os.cpu_count(), "python": sys.version.split()[0],
+    }
+
+    table_data = [[name, int(t["runs"]), int(t["failed"]), f"{t['mb_in']:.1f}", f"{t['mb_out']:.1f}", f"{t['seconds']:.2f}", f"{t['mb_per_s']:.1f}"] for name, t in result["stages"].items()]
+    print("\n" + tabulate(table_data, headers=["Stage", "Runs", "Failed", "MB In", "MB Out", "Seconds", "MB/s"], tablefmt="grid"))
+    print(tabulate([
+        ["Wall time", f"{result['wall_seconds']:.2f} s"],
+        ["Planning (fingerprints)", f"{result['plan_seconds']:.2f} s"],
+        ["Peak RSS (harness and exports)", f"{result['peak_rss_mb']:.0f} MB"],
+        ["Peak RSS (quantize processes, sampled)", f"{result['child_peak_rss_mb']:.0f} MB"],
+        ["Disk high-water mark", f"{result['disk_high_water_mb']:.0f} MB"],
+        ["Failed outputs", result["failed_outputs"]],
+    ], tablefmt="grid"))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config", {}).get("models") != result["config"]["models"] or baseline.get("config", {}).get("formats") != args.formats:
+            print("Warning: the baseline was recorded with a different model set or formats")
+        rows, regressions = compare(result, baseline, args.tolerance)
+        print(f"\nAgainst baseline {args.baseline} (tolerance {args.tolerance * 100:.0f}%):")
+        print(tabulate(rows, headers=["Metric", "Baseline", "Now", "Change", ""], tablefmt="grid"))
+        result["regressions"] = regressions
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if result["failed_outputs"]:
+        print(f"Error: {result['failed_outputs']} output(s) failed")
+        sys.exit(1)
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
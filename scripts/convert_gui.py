@@ -4,10 +4,17 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from typing import List, Dict
 import converter
+from f16_cache import F16Cache
+from fingerprint import default_index
+from validation import ValidationCache, expected_outputs
+from journal import JobJournal, default_journal_path
+from events import open_recorder
+from process_runner import ProcessRunner
+from telemetry import TelemetrySampler, format_status
+from event_bus import EventBus
+from watch import FolderWatcher
+from progress import format_eta
 import threading
-import queue
-import psutil
-import GPUtil
 from datetime import datetime
 from tabulate import tabulate
 
@@ -15,15 +22,27 @@ class ConverterGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Flux GGUF Converter")
-        self.root.geometry("1000x600")  # Increased height
+        self.root.geometry("1000x780")  # Increased height
         self.root.resizable(False, False)
         
-        # Initialize queue for thread communication
-        self.queue = queue.Queue()
+        # Latest progress from the conversion thread, applied on the Tk thread at most gui_fps times a second
+        self.bus = EventBus()
         
         # Load saved preferences
         self.config_file = os.path.join(os.path.dirname(__file__), "config.json")
         self.load_config()
+        self.frame_ms = int(1000 / max(1, self.config.get("gui_fps", 10)))
+        self.frame_scheduled = False
+        self.task_rows = {}
+        
+        # Input checks run on a worker and are cached until a file changes
+        self.validation_cache = ValidationCache()
+        self.validation = None
+        self.validation_id = 0
+        self.validating = False
+        
+        # Source fingerprints, so unchanged models are recognized without rehashing them
+        self.fingerprints = default_index()
         
         # Initialize variables
         self.selected_files = []
@@ -32,61 +51,47 @@ class ConverterGUI:
         self.is_converting = False
         self.keep_f16 = tk.BooleanVar(value=self.config.get("keep_f16", False))
         self.output_path = tk.StringVar(value=self.config.get("output_path", ""))
+        self.max_workers = tk.IntVar(value=self.config.get("max_workers", 1))
+        self.threads_per_job = tk.IntVar(value=self.config.get("threads_per_job", 0))
+        self.pipeline = tk.BooleanVar(value=self.config.get("pipeline", False))
+        self.resume = tk.BooleanVar(value=False)
+        self.watch_enabled = tk.BooleanVar(value=self.config.get("watch_enabled", False))
+        self.watch_folder = tk.StringVar(value=self.config.get("watch_folder", ""))
+        # Files the watcher found that wait for the running conversion to finish
+        self.watch_pending = []
+        self.watch_stop = None
+        self.watching = False
+        self.quiet_batch = False
+        
+        # Every stage is journaled so an interrupted batch can be resumed
+        self.journal = JobJournal(default_journal_path())
+        
+        # Starts every child process, so Cancel (or closing the window) can stop them all
+        self.runner = ProcessRunner(nice=self.config.get("process_nice", 0) or None)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         self.create_widgets()
         self.load_saved_formats()
         
-        # Start monitoring system resources
-        self.start_monitoring()
-        
-    def start_monitoring(self):
-        """Start monitoring system resources in a separate thread"""
-        def monitor():
-            last_cpu = -1
-            last_gpu = -1
-            last_memory = ""
-            
-            while True:
-                try:
-                    # Get CPU usage
-                    cpu_percent = psutil.cpu_percent(interval=1)
-                    
-                    # Get GPU usage if available
-                    try:
-                        gpus = GPUtil.getGPUs()
-                        if gpus:
-                            gpu_percent = gpus[0].load * 100
-                            gpu_memory = f"{gpus[0].memoryUsed}MB/{gpus[0].memoryTotal}MB"
-                        else:
-                            gpu_percent = 0
-                            gpu_memory = "N/A"
-                    except:
-                        gpu_percent = 0
-                        gpu_memory = "N/A"
-                    
-                    # Only update if values have changed
-                    if (cpu_percent != last_cpu or 
-                        gpu_percent != last_gpu or 
-                        gpu_memory != last_memory):
-                        
-                        # Update last values
-                        last_cpu = cpu_percent
-                        last_gpu = gpu_percent
-                        last_memory = gpu_memory
-                        
-                        # Update status with system info
-                        status_text = f"CPU: {cpu_percent}% | GPU: {gpu_percent:.1f}% ({gpu_memory})"
-                        if hasattr(self, 'system_status'):
-                            self.system_status.config(text=status_text)
-                    
-                except Exception as e:
-                    print(f"Error monitoring system: {e}")
-                
-                # Sleep for a short time without blocking the GUI
-                threading.Event().wait(1)
-                
-        # Start monitoring in a daemon thread
-        threading.Thread(target=monitor, daemon=True).start()
+        # Pick up watching where the last session left it
+        if self.watch_enabled.get():
+            if os.path.isdir(self.watch_folder.get()):
+                self.start_watch(self.watch_folder.get())
+            else:
+                self.watch_enabled.set(False)
+        
+        # Samples CPU, RAM, GPU and every running child into a ring buffer of recent history
+        self.telemetry = TelemetrySampler(
+            self.runner,
+            interval=self.config.get("telemetry_interval", 1.0),
+            history=self.config.get("telemetry_history", 600)
+        ).start()
+        self.update_system_status()
+        
+    def update_system_status(self):
+        """Show the latest resource sample; runs on the Tk thread, which owns the widgets"""
+        self.system_status.config(text=format_status(self.telemetry.latest()))
+        self.root.after(int(self.telemetry.interval * 1000), self.update_system_status)
         
     def create_widgets(self):
         # Main container
@@ -103,6 +108,7 @@ class ConverterGUI:
         
         self.path_text = tk.Text(file_frame, height=6, yscrollcommand=text_scroll.set)
         self.path_text.pack(fill=tk.X, pady=5)
+        self.path_text.tag_configure("invalid", foreground="red")
         text_scroll.config(command=self.path_text.yview)
         
         # Button frame
@@ -239,6 +245,65 @@ class ConverterGUI:
             command=self.save_settings
         ).pack(side=tk.LEFT)
         
+        ttk.Checkbutton(
+            f16_frame,
+            text="Export next F16 while quantizing",
+            variable=self.pipeline,
+            command=self.save_settings
+        ).pack(side=tk.LEFT, padx=(10, 0))
+        
+        ttk.Checkbutton(
+            f16_frame,
+            text="Resume interrupted batch",
+            variable=self.resume
+        ).pack(side=tk.LEFT, padx=(10, 0))
+        
+        # Parallel quantization settings (0 threads = split the cores evenly)
+        workers_frame = ttk.Frame(f16_frame)
+        workers_frame.pack(side=tk.RIGHT)
+        
+        ttk.Label(workers_frame, text="Parallel quantizations:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Spinbox(
+            workers_frame,
+            from_=1,
+            to=64,
+            width=5,
+            textvariable=self.max_workers,
+            command=self.save_settings
+        ).pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Label(workers_frame, text="Threads per job (0 = auto):").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Spinbox(
+            workers_frame,
+            from_=0,
+            to=256,
+            width=5,
+            textvariable=self.threads_per_job,
+            command=self.save_settings
+        ).pack(side=tk.LEFT)
+        
+        # Watch folder: new or changed models are converted as soon as they are fully written
+        watch_frame = ttk.Frame(settings_frame)
+        watch_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Checkbutton(
+            watch_frame,
+            text="Watch folder for new models:",
+            variable=self.watch_enabled,
+            command=self.toggle_watch
+        ).pack(side=tk.LEFT, padx=(0, 5))
+        
+        ttk.Entry(
+            watch_frame,
+            textvariable=self.watch_folder
+        ).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        
+        ttk.Button(
+            watch_frame,
+            text="Browse",
+            command=self.browse_watch_folder
+        ).pack(side=tk.RIGHT)
+        
         # Convert button frame (always at bottom)
         convert_frame = ttk.Frame(main_frame)
         convert_frame.pack(fill=tk.X, pady=(0, 2))
@@ -250,7 +315,17 @@ class ConverterGUI:
             command=self.start_conversion,
             style="Large.TButton"
         )
-        self.convert_button.pack(fill=tk.X, pady=2)
+        self.convert_button.pack(side=tk.LEFT, fill=tk.X, expand=True, pady=2)
+        
+        # Cancel button, stops the running batch and kills its child processes
+        self.cancel_button = ttk.Button(
+            convert_frame,
+            text="Cancel",
+            command=self.cancel_conversion,
+            style="Large.TButton",
+            state="disabled"
+        )
+        self.cancel_button.pack(side=tk.LEFT, padx=(5, 0), pady=2)
         
         # Progress frame
         progress_frame = ttk.Frame(main_frame)
@@ -265,6 +340,14 @@ class ConverterGUI:
         )
         self.progress_bar.pack(fill=tk.X, pady=2)
         
+        # One row per export or quantization, so parallel jobs can be followed separately
+        columns = ("task", "state", "progress", "rate", "eta")
+        self.task_table = ttk.Treeview(progress_frame, columns=columns, show="headings", height=5)
+        for column, heading, width in zip(columns, ("Job", "State", "Progress", "Speed", "ETA"), (520, 90, 90, 110, 90)):
+            self.task_table.heading(column, text=heading)
+            self.task_table.column(column, width=width, anchor=tk.W if column == "task" else tk.CENTER)
+        self.task_table.pack(fill=tk.X, pady=2)
+        
         # Status frame
         status_frame = ttk.Frame(main_frame)
         status_frame.pack(fill=tk.X, pady=(0, 2))
@@ -281,32 +364,85 @@ class ConverterGUI:
         style = ttk.Style()
         style.configure("Large.TButton", font=("Helvetica", 12))
         
+    def schedule_frame(self):
+        """Make sure one check_queue is pending"""
+        if not self.frame_scheduled:
+            self.frame_scheduled = True
+            self.root.after(self.frame_ms, self.check_queue)
+    
     def check_queue(self):
-        """Check for messages from the conversion thread"""
+        """Apply what the conversion and validation threads reported since the last frame"""
+        self.frame_scheduled = False
         try:
-            while True:
-                msg = self.queue.get_nowait()
-                if msg["type"] == "progress":
-                    self.progress_var.set(msg["progress"])
-                    self.status_label.config(text=msg["message"])
-                elif msg["type"] == "complete":
+            state, messages = self.bus.drain()
+            progress = state.pop("progress", None)
+            if progress is not None:
+                value, message = progress
+                self.progress_var.set(value)
+                self.status_label.config(text=message)
+            for (_, task), update in state.items():
+                self.update_task_row(task, update)
+        
+            for msg in messages:
+                if msg["type"] == "complete":
                     self.is_converting = False
                     self.convert_button.config(state="normal")
+                    self.cancel_button.config(state="disabled")
                     self.status_label.config(text="Conversion completed successfully!")
-                    messagebox.showinfo("Success", "Conversion completed successfully!")
+                    # Watched batches finish unattended, so they only report in the status line
+                    if not self.quiet_batch:
+                        messagebox.showinfo("Success", "Conversion completed successfully!")
+                    self.start_watch_batch()
+                elif msg["type"] == "cancelled":
+                    self.is_converting = False
+                    self.convert_button.config(state="normal")
+                    self.cancel_button.config(state="disabled")
+                    self.status_label.config(text="Conversion cancelled")
                 elif msg["type"] == "error":
                     self.is_converting = False
                     self.convert_button.config(state="normal")
-                    self.status_label.config(text="Conversion failed!")
-                    messagebox.showerror("Error", msg["text"])
-        except queue.Empty:
-            pass
+                    self.cancel_button.config(state="disabled")
+                    self.status_label.config(text="Conversion failed!" if not self.quiet_batch else f"Conversion failed: {msg['text']}")
+                    if not self.quiet_batch:
+                        messagebox.showerror("Error", msg["text"])
+                    self.start_watch_batch()
+                elif msg["type"] == "watch_ready":
+                    self.watch_ready(msg["files"])
+                elif msg["type"] == "validated":
+                    self.apply_validation(msg)
+                elif msg["type"] == "validation_done":
+                    self.finish_validation(msg)
         finally:
-            if self.is_converting:
-                self.root.after(100, self.check_queue)
+            # An error while applying updates must not stop the frames
+            if self.is_converting or self.validating or self.watching:
+                self.schedule_frame()
+    
+    def update_task_row(self, task, update):
+        """Add or refresh a job's row; fields missing from the update keep their last value"""
+        row = self.task_rows.setdefault(task, {"state": "", "progress": 0.0, "rate": None, "eta": None})
+        row["state"] = update.get("task_state") or row["state"]
+        if update.get("task_progress") is not None:
+            row["progress"] = update["task_progress"]
+        if row["state"] == "running":
+            row["rate"] = update.get("rate", row["rate"])
+            row["eta"] = update.get("eta", row["eta"])
+        else:
+            row["rate"] = row["eta"] = None
+        values = (
+            task,
+            row["state"],
+            f"{row['progress']:.0f}%",
+            f"{row['rate']:.1f} MB/s" if row["rate"] else "",
+            format_eta(row["eta"]) if row["eta"] is not None else ""
+        )
+        if self.task_table.exists(task):
+            self.task_table.item(task, values=values)
+        else:
+            self.task_table.insert("", tk.END, iid=task, values=values)
+            self.task_table.see(task)
                 
     def start_conversion(self):
-        if self.is_converting:
+        if self.is_converting or (self.validation and self.validation["then_convert"] and self.validating):
             return
             
         # Get files from text area
@@ -320,11 +456,6 @@ class ConverterGUI:
             messagebox.showerror("Error", "Please add at least one input file")
             return
             
-        # Validate files before proceeding
-        if not self.validate_files():
-            messagebox.showerror("Error", "Please fix invalid files before proceeding")
-            return
-            
         selected_formats = [
             fmt for fmt, var in self.format_vars.items()
             if var.get()
@@ -334,28 +465,186 @@ class ConverterGUI:
             messagebox.showerror("Error", "Please select at least one output format")
             return
             
+        # Validate files before proceeding; the conversion starts once every file checked out
+        self.convert_button.config(state="disabled")
+        self.validate_files(then_convert=True)
+        
+    def conversion_settings(self):
+        """Plain values of the conversion settings; ValueError if a number field is empty or invalid"""
+        # Tk variables may only be read on this thread, so the worker gets plain values
+        try:
+            max_workers = self.max_workers.get()
+            threads_per_job = self.threads_per_job.get()
+        except tk.TclError:
+            raise ValueError("Parallel quantizations and threads per job must be whole numbers")
+        if max_workers < 1 or threads_per_job < 0:
+            raise ValueError("Parallel quantizations must be at least 1 and threads per job at least 0")
+        output_dir = self.output_path.get()
+        if output_dir == "Leave empty to use input file's directory":
+            output_dir = ""
+        return {
+            "output_dir": output_dir or None,
+            "keep_f16": self.keep_f16.get(),
+            "max_workers": max_workers,
+            "threads_per_job": threads_per_job or None,
+            "pipeline": self.pipeline.get(),
+            "resume": self.resume.get()
+        }
+        
+    def begin_conversion(self, files, selected_formats, quiet=False):
+        # Settings are read before any state changes, so an invalid entry leaves the GUI usable
+        try:
+            settings = self.conversion_settings()
+        except ValueError as e:
+            self.convert_button.config(state="normal")
+            if quiet:
+                # Watched files are tried again with the next batch
+                self.watch_pending.extend(path for path in files if path not in self.watch_pending)
+                self.status_label.config(text=f"Conversion not started: {e}")
+            else:
+                messagebox.showerror("Error", str(e))
+            return
+        
         # Disable convert button and start conversion thread
         self.is_converting = True
+        self.quiet_batch = quiet
         self.convert_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.runner.reset()
         self.progress_var.set(0)
+        self.task_rows = {}
+        self.task_table.delete(*self.task_table.get_children())
         self.status_label.config(text="Starting conversion...")
         
         # Start conversion thread
         self.conversion_thread = threading.Thread(
             target=self.conversion_worker,
-            args=(files, selected_formats),
+            args=(files, selected_formats, settings),
             daemon=True
         )
         self.conversion_thread.start()
         
         # Start checking queue
-        self.check_queue()
+        self.schedule_frame()
+        
+    def cancel_conversion(self):
+        if not self.is_converting or self.runner.cancelled:
+            return
+        self.cancel_button.config(state="disabled")
+        self.status_label.config(text="Cancelling, stopping running processes...")
+        # Killing process trees waits for them to exit, so keep it off the Tk thread
+        threading.Thread(target=self.runner.cancel, daemon=True).start()
+    
+    def toggle_watch(self):
+        if not self.watch_enabled.get():
+            self.stop_watch()
+            self.status_label.config(text="Stopped watching")
+            self.save_settings()
+            return
+        folder = self.watch_folder.get()
+        if not os.path.isdir(folder):
+            folder = filedialog.askdirectory(title="Select Folder to Watch")
+            if not folder:
+                self.watch_enabled.set(False)
+                return
+            self.watch_folder.set(folder)
+        self.save_settings()
+        self.start_watch(folder)
+        
+    def browse_watch_folder(self):
+        folder = filedialog.askdirectory(title="Select Folder to Watch")
+        if folder:
+            self.watch_folder.set(folder)
+            if self.watch_enabled.get():
+                # Restart on the new folder
+                self.stop_watch()
+                self.start_watch(folder)
+            self.save_settings()
         
-    def conversion_worker(self, files, selected_formats):
-        """Worker thread for conversion process"""
+    def start_watch(self, folder):
+        """Poll folder on a worker thread and post every model that has finished being written"""
+        self.stop_watch()
+        stop = self.watch_stop = threading.Event()
+        watcher = FolderWatcher(
+            folder,
+            recursive=self.config.get("watch_recursive", False),
+            interval=self.config.get("watch_interval", 5),
+            stable_seconds=self.config.get("watch_stable_seconds", 10)
+        )
+        
+        def run():
+            try:
+                while not stop.is_set():
+                    ready = []
+                    for path in watcher.poll():
+                        error = self.validation_cache.check_input(path)
+                        if error:
+                            print(f"Skipping watched file {path}: {error}")
+                        else:
+                            ready.append(path)
+                    if ready:
+                        self.bus.post({"type": "watch_ready", "files": ready})
+                    watcher.wait(stop)
+            except Exception as e:
+                print(f"Error watching {folder}: {e}")
+            finally:
+                watcher.close()
+        
+        threading.Thread(target=run, name="watch", daemon=True).start()
+        self.watching = True
+        self.status_label.config(text=f"Watching {folder} for new models")
+        self.schedule_frame()
+        
+    def stop_watch(self):
+        if self.watch_stop is not None:
+            self.watch_stop.set()
+            self.watch_stop = None
+        self.watching = False
+        self.watch_pending = []
+        
+    def watch_ready(self, files):
+        """List newly found models and queue them for conversion"""
+        if not self.watching:
+            return
+        current = self.path_text.get("1.0", tk.END).strip()
+        listed = set(current.split("\n")) if current else set()
+        added = [path for path in files if path not in listed]
+        if added:
+            self.path_text.insert(tk.END, ("\n" if current else "") + "\n".join(added))
+        self.watch_pending.extend(path for path in files if path not in self.watch_pending)
+        self.start_watch_batch()
+        
+    def start_watch_batch(self):
+        """Convert the watched files found so far, unless a conversion or validation is running"""
+        if not self.watching or not self.watch_pending or self.is_converting or self.validating:
+            return
+        selected_formats = [fmt for fmt, var in self.format_vars.items() if var.get()]
+        if not selected_formats:
+            self.status_label.config(text="New models found; select at least one output format to convert them")
+            return
+        files, self.watch_pending = self.watch_pending, []
+        # generate_conversion_plan marks outputs that already exist, so only missing ones are converted
+        self.begin_conversion(files, selected_formats, quiet=True)
+        
+    def on_close(self):
+        # Child processes run in their own process groups and would outlive the window
+        if self.is_converting:
+            self.runner.cancel()
+        self.telemetry.stop()
+        self.stop_watch()
+        self.root.destroy()
+    
+    def conversion_worker(self, files, selected_formats, settings):
+        """Worker thread for conversion process; settings were read from the widgets on the Tk thread"""
         try:
             paths = converter.get_base_paths()
-            plan = converter.generate_conversion_plan(files, selected_formats)
+            
+            plan = converter.generate_conversion_plan(
+                files,
+                selected_formats,
+                fingerprints=self.fingerprints,
+                output_dir=settings["output_dir"]
+            )
             
             # Display conversion plan in console
             print("\nConversion Plan:")
@@ -368,18 +657,24 @@ class ConverterGUI:
                     ])
             print(tabulate(table_data, headers=["Input Model", "Output Format"], tablefmt="grid"))
             
-            # Get output directory, if specified
-            output_dir = self.output_path.get()
-            if output_dir == "Leave empty to use input file's directory":
-                output_dir = ""
+            # Optional persistent F16 cache shared across runs
+            f16_cache = None
+            if self.config.get("f16_cache_dir"):
+                f16_cache = F16Cache(
+                    self.config["f16_cache_dir"],
+                    max_bytes=int(self.config.get("f16_cache_gb", 0) * 1024 ** 3) or None,
+                    fingerprints=self.fingerprints
+                )
+            
+            # Stage timings; also streamed as JSON lines when event_log names a file or socket
+            events = open_recorder(self.config.get("event_log"))
+            self.telemetry.reset_totals()
             
             def progress_callback(progress_info):
-                """Handle progress updates"""
-                self.queue.put({
-                    "type": "progress",
-                    "progress": progress_info["progress"],
-                    "message": progress_info["message"]
-                })
+                """Handle progress updates; only the latest per job reaches the screen"""
+                self.bus.update("progress", (progress_info["progress"], progress_info["message"]))
+                if progress_info.get("task"):
+                    self.bus.update(("task", progress_info["task"]), progress_info)
             
             # Process models
             converter.process_models(
@@ -387,9 +682,36 @@ class ConverterGUI:
                 paths["convert_script_dir"],
                 paths["llama_quantize_exe"],
                 progress_callback=progress_callback,
-                output_dir=output_dir if output_dir else None,
-                keep_f16=self.keep_f16.get()
+                output_dir=settings["output_dir"],
+                keep_f16=settings["keep_f16"],
+                max_workers=settings["max_workers"],
+                threads_per_job=settings["threads_per_job"],
+                pipeline=settings["pipeline"],
+                max_intermediate_bytes=int(self.config.get("max_intermediate_gb", 0) * 1024 ** 3) or None,
+                native_export=self.config.get("native_export", True),
+                direct=self.config.get("direct_export", True),
+                f16_cache=f16_cache,
+                journal=self.journal,
+                resume=settings["resume"],
+                events=events,
+                check_disk_space=self.config.get("check_disk_space", True),
+                min_free_bytes=int(self.config.get("min_free_gb", 1) * 1024 ** 3),
+                memory_aware=self.config.get("memory_aware", True),
+                memory_reserve_bytes=int(self.config.get("memory_reserve_gb", 2) * 1024 ** 3),
+                runner=self.runner,
+                process_timeout=self.config.get("process_timeout_minutes", 0) * 60 or None,
+                pin_cores=self.config.get("pin_cores", False),
+                numa=self.config.get("numa", False),
+                export_buffer_bytes=int(self.config.get("export_buffer_mb", 8) * 1024 ** 2),
+                read_ahead=self.config.get("export_read_ahead", 2),
+                export_threads=self.config.get("export_threads", 0) or None
             )
+            events.close()
+            
+            print("\nStage Timings:")
+            print(events.summary_table())
+            print("\nResource Usage:")
+            print(self.telemetry.summary_table())
             
             # Display final output files list
             print("\nOutput Files (one per line):")
@@ -397,19 +719,15 @@ class ConverterGUI:
                 for output in item["outputs"]:
                     print(output["output"])
             
-            self.queue.put({"type": "complete"})
+            self.bus.post({"type": "cancelled" if self.runner.cancelled else "complete"})
             
         except Exception as e:
-            self.queue.put({"type": "error", "text": str(e)})
+            self.bus.post({"type": "error", "text": str(e)})
             
     def update_progress(self, processed, total):
         """Update progress in the GUI"""
         progress = (processed / total) * 100
-        self.queue.put({
-            "type": "progress",
-            "value": progress,
-            "text": f"Processing output {processed}/{total} ({progress:.1f}%)"
-        })
+        self.bus.update("progress", (progress, f"Processing output {processed}/{total} ({progress:.1f}%)"))
         
     def load_config(self):
         if os.path.exists(self.config_file):
@@ -419,7 +737,35 @@ class ConverterGUI:
             self.config = {
                 "selected_formats": {},
                 "keep_f16": False,
-                "output_path": ""
+                "output_path": "",
+                "max_workers": 1,
+                "threads_per_job": 0,
+                "pipeline": False,
+                "max_intermediate_gb": 0,
+                "native_export": True,
+                "direct_export": True,
+                "f16_cache_dir": "",
+                "f16_cache_gb": 0,
+                "event_log": "",
+                "check_disk_space": True,
+                "min_free_gb": 1,
+                "memory_aware": True,
+                "memory_reserve_gb": 2,
+                "process_timeout_minutes": 0,
+                "process_nice": 0,
+                "pin_cores": False,
+                "numa": False,
+                "export_buffer_mb": 8,
+                "export_read_ahead": 2,
+                "export_threads": 0,
+                "telemetry_interval": 1.0,
+                "telemetry_history": 600,
+                "gui_fps": 10,
+                "watch_enabled": False,
+                "watch_folder": "",
+                "watch_recursive": False,
+                "watch_interval": 5,
+                "watch_stable_seconds": 10
             }
             self.save_config()
             
@@ -431,7 +777,35 @@ class ConverterGUI:
                 for fmt, var in self.format_vars.items()
             },
             "keep_f16": self.keep_f16.get(),
-            "output_path": self.output_path.get()
+            "output_path": self.output_path.get(),
+            "max_workers": self.max_workers.get(),
+            "threads_per_job": self.threads_per_job.get(),
+            "pipeline": self.pipeline.get(),
+            "max_intermediate_gb": self.config.get("max_intermediate_gb", 0),
+            "native_export": self.config.get("native_export", True),
+            "direct_export": self.config.get("direct_export", True),
+            "f16_cache_dir": self.config.get("f16_cache_dir", ""),
+            "f16_cache_gb": self.config.get("f16_cache_gb", 0),
+            "event_log": self.config.get("event_log", ""),
+            "check_disk_space": self.config.get("check_disk_space", True),
+            "min_free_gb": self.config.get("min_free_gb", 1),
+            "memory_aware": self.config.get("memory_aware", True),
+            "memory_reserve_gb": self.config.get("memory_reserve_gb", 2),
+            "process_timeout_minutes": self.config.get("process_timeout_minutes", 0),
+            "process_nice": self.config.get("process_nice", 0),
+            "pin_cores": self.config.get("pin_cores", False),
+            "numa": self.config.get("numa", False),
+            "export_buffer_mb": self.config.get("export_buffer_mb", 8),
+            "export_read_ahead": self.config.get("export_read_ahead", 2),
+            "export_threads": self.config.get("export_threads", 0),
+            "telemetry_interval": self.config.get("telemetry_interval", 1.0),
+            "telemetry_history": self.config.get("telemetry_history", 600),
+            "gui_fps": self.config.get("gui_fps", 10),
+            "watch_enabled": self.watch_enabled.get(),
+            "watch_folder": self.watch_folder.get(),
+            "watch_recursive": self.config.get("watch_recursive", False),
+            "watch_interval": self.config.get("watch_interval", 5),
+            "watch_stable_seconds": self.config.get("watch_stable_seconds", 10)
         }
         with open(self.config_file, 'w') as f:
             json.dump(config, f, indent=4)
@@ -451,9 +825,13 @@ class ConverterGUI:
             current_text = self.path_text.get("1.0", tk.END).strip()
             new_files = "\n".join(files)
             
-            # Combine with existing text, avoiding duplicates
+            # Combine with existing text, avoiding duplicates (including symlinks to a listed file)
             all_files = set(current_text.split("\n") if current_text else [])
-            all_files.update(files)
+            seen = {os.path.realpath(path) for path in all_files}
+            for path in files:
+                if os.path.realpath(path) not in seen:
+                    seen.add(os.path.realpath(path))
+                    all_files.add(path)
             
             # Update text area with all files
             self.path_text.delete("1.0", tk.END)
@@ -462,82 +840,131 @@ class ConverterGUI:
             # Validate the files
             self.validate_files()
                 
-    def validate_files(self):
-        text = self.path_text.get("1.0", tk.END).strip()
-        if not text:
+    def validate_files(self, then_convert=False):
+        """Check the listed files on a worker thread; results stream in through check_queue.
+        
+        A new validation supersedes one still running. With then_convert the
+        conversion starts once every file turned out valid.
+        """
+        lines = self.path_text.get("1.0", "end-1c").split("\n")
+        # Line number of each path, to mark invalid ones in the text area
+        entries = [(number, line.strip()) for number, line in enumerate(lines, start=1) if line.strip()]
+        if not entries:
             self.status_label.config(text="No files to validate")
-            return False
-            
-        # Split into lines and clean up
-        paths = [line.strip() for line in text.split('\n') if line.strip()]
-        
-        valid_files = []
-        invalid_files = []
-        existing_outputs = []
+            if then_convert:
+                self.convert_button.config(state="normal")
+            return
         
         # Get selected formats for output validation
         selected_formats = [
             fmt for fmt, var in self.format_vars.items()
             if var.get()
         ]
-        
-        for file in paths:
-            file = file.strip()
-            if not file:
-                continue
-                
-            if not os.path.exists(file):
-                invalid_files.append(f"{file} (File not found)")
-                continue
-                
-            # Check for supported extensions
-            ext = os.path.splitext(file)[1].lower()
-            if ext not in ['.safetensors', '.pth', '.pt', '.bin']:
-                invalid_files.append(f"{file} (Unsupported format: {ext})")
-                continue
-                
-            valid_files.append(file)
-            
-            # Check for existing outputs if formats are selected
-            if selected_formats:
-                f16_model = file.replace(".safetensors", "-F16.gguf")
-                for fmt in selected_formats:
-                    output_model = f16_model.replace("-F16.gguf", f"-{fmt}.gguf")
-                    
-                    # If output directory is specified, modify the path
-                    output_dir = self.output_path.get()
-                    if output_dir and output_dir != "Leave empty to use input file's directory":
-                        output_model = os.path.join(output_dir, os.path.basename(output_model))
-                    
-                    if os.path.exists(output_model) and os.path.getsize(output_model) > 0:
-                        existing_outputs.append(f"{os.path.basename(file)} -> {fmt}")
-        
-        # Update status and show warnings
+        output_dir = self.output_path.get()
+        if output_dir == "Leave empty to use input file's directory":
+            output_dir = ""
+        
+        if self.validating and self.validation["then_convert"] and not then_convert:
+            # The superseded validation would have started the conversion
+            self.convert_button.config(state="normal")
+        self.validation_id += 1
+        self.validation = {
+            "id": self.validation_id,
+            "files": [path for _, path in entries],
+            "formats": selected_formats,
+            "then_convert": then_convert,
+            "done": 0,
+            "valid": 0,
+            "invalid": [],
+            "existing": []
+        }
+        self.validating = True
+        self.path_text.tag_remove("invalid", "1.0", tk.END)
+        self.status_label.config(text=f"Validating {len(entries)} files...")
+        threading.Thread(
+            target=self.validation_worker,
+            args=(self.validation_id, entries, selected_formats, output_dir or None),
+            daemon=True
+        ).start()
+        self.schedule_frame()
+        
+    def validation_worker(self, validation_id, entries, selected_formats, output_dir):
+        """Check each input and its existing outputs, posting one result per file"""
+        for number, path in entries:
+            if validation_id != self.validation_id:
+                # Superseded by a newer validation
+                return
+            try:
+                error = self.validation_cache.check_input(path)
+            except Exception as e:
+                error = str(e)
+            existing = []
+            if error is None and selected_formats:
+                # Only compare source fingerprints the index already has; hashing every input here would be slow
+                record = self.fingerprints.lookup(path) if path.lower().endswith(".safetensors") else None
+                fingerprint = record["content_hash"] if record else None
+                for fmt, output_model in expected_outputs(path, selected_formats, output_dir).items():
+                    if self.validation_cache.output_exists(output_model, fmt, fingerprint):
+                        existing.append(fmt)
+            self.bus.post({"type": "validated", "id": validation_id, "line": number, "path": path, "error": error, "existing": existing})
+        self.bus.post({"type": "validation_done", "id": validation_id})
+        
+    def validation_status(self):
+        validation = self.validation
         status_parts = []
-        if valid_files:
-            status_parts.append(f"{len(valid_files)} valid files")
-        if invalid_files:
-            status_parts.append(f"{len(invalid_files)} invalid files")
-        if existing_outputs:
-            status_parts.append(f"{len(existing_outputs)} existing outputs")
-            
-        self.status_label.config(text=", ".join(status_parts))
+        if validation["valid"]:
+            status_parts.append(f"{validation['valid']} valid files")
+        if validation["invalid"]:
+            status_parts.append(f"{len(validation['invalid'])} invalid files")
+        if validation["existing"]:
+            status_parts.append(f"{len(validation['existing'])} existing outputs")
+        return ", ".join(status_parts)
+        
+    def apply_validation(self, msg):
+        """Count one file's result and mark its line if it is invalid"""
+        validation = self.validation
+        if validation is None or msg["id"] != validation["id"]:
+            return
+        validation["done"] += 1
+        if msg["error"]:
+            validation["invalid"].append(f"{msg['path']} ({msg['error']})")
+            # The text may have been edited since; only mark the line if it still holds this path
+            start, end = f"{msg['line']}.0", f"{msg['line']}.end"
+            if self.path_text.get(start, end).strip() == msg["path"]:
+                self.path_text.tag_add("invalid", start, end)
+        else:
+            validation["valid"] += 1
+            validation["existing"].extend(f"{os.path.basename(msg['path'])} -> {fmt}" for fmt in msg["existing"])
+        self.status_label.config(text=f"Validating {validation['done']}/{len(validation['files'])}: {self.validation_status()}")
+        
+    def finish_validation(self, msg):
+        validation = self.validation
+        if validation is None or msg["id"] != validation["id"]:
+            return
+        self.validating = False
+        self.status_label.config(text=self.validation_status())
         
         # Show warnings
         warnings = []
-        if invalid_files:
-            warnings.append("The following files were invalid:\n" + "\n".join(invalid_files))
-        if existing_outputs:
-            warnings.append("The following outputs already exist and will be skipped:\n" + "\n".join(existing_outputs))
+        if validation["invalid"]:
+            warnings.append("The following files were invalid:\n" + "\n".join(validation["invalid"]))
+        if validation["existing"]:
+            warnings.append("The following outputs already exist and will be skipped:\n" + "\n".join(validation["existing"]))
             
         if warnings:
             messagebox.showwarning(
                 "Validation Results",
                 "\n\n".join(warnings)
             )
-            return len(invalid_files) == 0  # Return True if no invalid files
         
-        return True
+        if validation["then_convert"]:
+            if validation["invalid"]:
+                self.convert_button.config(state="normal")
+                messagebox.showerror("Error", "Please fix invalid files before proceeding")
+            else:
+                self.begin_conversion(validation["files"], validation["formats"])
+        # Watched files that arrived during validation
+        self.start_watch_batch()
                 
     def clear_files(self):
         self.path_text.delete("1.0", tk.END)
@@ -580,6 +1007,9 @@ class ConverterGUI:
     def save_settings(self):
         self.config["keep_f16"] = self.keep_f16.get()
         self.config["output_path"] = self.output_path.get()
+        self.config["max_workers"] = self.max_workers.get()
+        self.config["threads_per_job"] = self.threads_per_job.get()
+        self.config["pipeline"] = self.pipeline.get()
         if self.config["output_path"] == "Leave empty to use input file's directory":
             self.config["output_path"] = ""
         self.save_config()
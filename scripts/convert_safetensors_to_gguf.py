@@ -1,17 +1,37 @@
 import os
-import subprocess
 import sys
+import json
+import signal
 import argparse
+import threading
 from typing import List, Dict
 from tabulate import tabulate
+import converter
+from fingerprint import default_index
+from journal import JobJournal, default_journal_path
+from events import open_recorder
+from process_runner import ProcessRunner
+from telemetry import TelemetrySampler
 
-def run_command(command: str, working_dir: str = None) -> None:
-    try:
-        print(f"Running command: {command}")
-        subprocess.run(command, shell=True, cwd=working_dir, stdout=sys.stdout, stderr=sys.stderr, text=True, bufsize=1, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Command failed with error: {str(e)}")
-        sys.exit(1)
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Process exit codes; each job in the summary gets the code matching its own status
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_PARTIAL = 3
+EXIT_CANCELLED = 130
+
+JOB_EXIT_CODES = {"ok": EXIT_OK, "partial": EXIT_PARTIAL, "failed": EXIT_FAILED, "cancelled": EXIT_CANCELLED}
+
+# The process exit code is that of the worst job
+EXIT_SEVERITY = [EXIT_OK, EXIT_PARTIAL, EXIT_CANCELLED, EXIT_FAILED]
+
+# Manifest keys that set process_models options (command-line flags take precedence)
+MANIFEST_OPTIONS = ["max_workers", "threads_per_job", "pipeline", "keep_f16", "max_intermediate_gb", "min_free_gb", "memory_reserve_gb", "timeout_minutes", "nice", "pin_cores", "numa"]
 
 def get_absolute_path(path: str) -> str:
     return os.path.abspath(path)
@@ -37,96 +57,231 @@ def get_output_formats() -> List[str]:
         formats.append(fmt)
     return formats
 
-def generate_conversion_plan(input_models: List[str], output_formats: List[str]) -> List[Dict]:
+def load_manifest(path: str) -> Dict:
+    """Read a JSON or YAML manifest; YAML needs PyYAML installed"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ValueError("YAML manifests need PyYAML (pip install pyyaml), or use a .json manifest")
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+
+    # Relative paths are resolved against the manifest's own directory
+    return parse_manifest(manifest, os.path.dirname(os.path.abspath(path)), path)
+
+def parse_manifest(manifest, base_dir: str, source: str = "manifest") -> Dict:
+    """Validate manifest data into jobs and process_models options"""
+    # A bare list is shorthand for {"jobs": [...]}, a single job needs no list at all
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    elif isinstance(manifest, dict) and "jobs" not in manifest and (manifest.get("input") or manifest.get("inputs")):
+        manifest = dict(manifest, jobs=[{key: manifest[key] for key in ("input", "inputs") if key in manifest}])
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("jobs"), list):
+        raise ValueError(f"{source} must contain a list of jobs")
+
+    resolve = lambda p: os.path.normpath(os.path.join(base_dir, os.path.expanduser(p)))
+
+    jobs = []
+    for idx, job in enumerate(manifest["jobs"], 1):
+        if isinstance(job, str):
+            job = {"input": job}
+        if not isinstance(job, dict):
+            raise ValueError(f"Job {idx} in {source} must be a path or an object")
+        inputs = job.get("inputs") or ([job["input"]] if job.get("input") else [])
+        formats = job.get("formats") or manifest.get("formats")
+        output_dir = job.get("output_dir") or manifest.get("output_dir")
+        if not inputs or not formats:
+            raise ValueError(f"Job {idx} in {source} needs an input and at least one format")
+        jobs.append({
+            "inputs": [resolve(p) for p in inputs],
+            "formats": list(formats),
+            "output_dir": resolve(output_dir) if output_dir else None
+        })
+
+    options = {key: manifest[key] for key in MANIFEST_OPTIONS if key in manifest}
+    return {"jobs": jobs, "options": options}
+
+def build_plan(jobs: List[Dict]) -> List[Dict]:
+    # Each job may have its own output directory, so its outputs are resolved here
+    # rather than through process_models' single output_dir
+    fingerprints = default_index()
     plan = []
-    for model in input_models:
-        f16_model = model.replace(".safetensors", "-F16.gguf")
-        for fmt in output_formats:
-            output_model = f16_model.replace("-F16.gguf", f"-{fmt}.gguf")
-            plan.append({
-                "input": model,
-                "f16": f16_model,
-                "output": output_model,
-                "format": fmt
-            })
+    for job in jobs:
+        plan.extend(converter.generate_conversion_plan(job["inputs"], job["formats"], fingerprints=fingerprints, output_dir=job["output_dir"]))
     return plan
 
 def display_plan(plan: List[Dict]) -> None:
     # Display table format
     table_data = []
     for item in plan:
-        table_data.append([
-            item["input"],
-            item["format"],
-            item["output"]
-        ])
-    
+        for output in item["outputs"]:
+            table_data.append([
+                item["input"],
+                output["format"],
+                output["output"],
+                "exists" if output["exists"] else ""
+            ])
+
     print("\nConversion Plan:")
-    print(tabulate(table_data, headers=["Input Model", "Output Format", "Output Path"], tablefmt="grid"))
-    
+    print(tabulate(table_data, headers=["Input Model", "Output Format", "Output Path", "Status"], tablefmt="grid"))
+
     # Display clean output list
     print("\nOutput Files (one per line):")
     for item in plan:
-        print(item["output"])
+        for output in item["outputs"]:
+            print(output["output"])
 
-def process_models(plan: List[Dict], convert_script_dir: str, llama_quantize_exe: str) -> None:
-    processed_f16 = set()
-    
+def display_summary(plan: List[Dict]) -> int:
+    """Print every job's result and return the process exit code"""
+    table_data = []
+    exit_code = EXIT_OK
     for item in plan:
-        input_model = item["input"]
-        f16_model = item["f16"]
-        output_model = item["output"]
-        fmt = item["format"]
-        
-        # Convert to F16 if not already done
-        if f16_model not in processed_f16:
-            convert_command = f'python "{os.path.join(convert_script_dir, "convert.py")}" --src "{input_model}"'
-            run_command(convert_command, working_dir=convert_script_dir)
-            processed_f16.add(f16_model)
-        
-        # Quantize to desired format
-        quantize_command = f'"{llama_quantize_exe}" "{f16_model}" "{output_model}" {fmt}'
-        run_command(quantize_command)
-        
-        # Clean up F16 if it's the last output for this input
-        if not any(p["f16"] == f16_model and p["output"] != output_model for p in plan):
-            if os.path.exists(f16_model):
-                os.remove(f16_model)
-                print(f"Deleted intermediate file: {f16_model}")
-
-def get_base_paths() -> Dict[str, str]:
-    # Get the directory where this script is located
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    # Go up one level to get the base directory
-    base_dir = os.path.dirname(script_dir)
-    
-    return {
-        "base_dir": base_dir,
-        "convert_script_dir": os.path.join(base_dir, "llama.cpp"),
-        "llama_quantize_exe": os.path.join(base_dir, "build", "bin", "Debug", "llama-quantize.exe")
-    }
+        status = converter.job_status(item)
+        code = JOB_EXIT_CODES[status]
+        failed = [f"{out['format']}: {out.get('error', 'failed')}" for out in item["outputs"] if out["status"] in ("failed", "cancelled")]
+        table_data.append([item["input"], status, code, "\n".join(failed)])
+        exit_code = max(exit_code, code, key=EXIT_SEVERITY.index)
+
+    print("\nSummary:")
+    print(tabulate(table_data, headers=["Input Model", "Status", "Exit Code", "Errors"], tablefmt="grid"))
+    return exit_code
+
+def write_report(path: str, plan: List[Dict], telemetry: TelemetrySampler = None) -> None:
+    report = converter.plan_report(plan)
+    totals = telemetry.report()["jobs"] if telemetry is not None else {}
+    for entry in report:
+        entry["exit_code"] = JOB_EXIT_CODES[entry["status"]]
+        for out in entry["outputs"]:
+            # Quantize processes are labelled "<model file> <format>"
+            resources = totals.get(f"{os.path.basename(entry['input'])} {out['format']}")
+            if resources:
+                out["resources"] = resources
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
 
 def main():
     parser = argparse.ArgumentParser(description="Convert safetensor models to GGUF format with multiple quantization options")
     parser.add_argument("--inputs", nargs="+", help="Input model paths")
     parser.add_argument("--outputs", nargs="+", help="Output quantization formats")
+    parser.add_argument("--output-dir", help="Directory for the output files (default: next to each input)")
+    parser.add_argument("--manifest", help="JSON or YAML file listing jobs (inputs, formats, output_dir) to run headless")
+    parser.add_argument("--max-workers", type=int, help="Quantizations to run in parallel (0 = one per CPU core)")
+    parser.add_argument("--threads-per-job", type=int, help="Threads given to each llama-quantize job (0 = split the cores evenly)")
+    parser.add_argument("--pin-cores", action="store_true", help="Pin each parallel quantization to its own set of cores, with one thread per core")
+    parser.add_argument("--numa", action="store_true", help="Like --pin-cores, keeping each core set on a single NUMA node")
+    parser.add_argument("--pipeline", action="store_true", help="Export the next model's F16 while the current one is quantized")
+    parser.add_argument("--keep-f16", action="store_true", help="Keep the intermediate F16 files")
+    parser.add_argument("--min-free-gb", type=float, help="Disk space to leave free; jobs that would cut into it are skipped (default: 1)")
+    parser.add_argument("--no-space-check", action="store_true", help="Start every job without estimating whether its outputs fit on disk")
+    parser.add_argument("--memory-reserve-gb", type=float, help="RAM to keep available; exports and quantizations wait while less is free (default: 2)")
+    parser.add_argument("--timeout-minutes", type=float, help="Stop any llama-quantize/convert.py run that takes longer than this")
+    parser.add_argument("--nice", type=int, help="Priority adjustment for child processes (positive = lower priority)")
+    parser.add_argument("--report", help="Write per-job results as JSON to this file")
+    parser.add_argument("--telemetry", help="Write sampled CPU/RAM/GPU history and per-process totals as JSON to this file")
+    parser.add_argument("--telemetry-interval", type=float, default=1.0, help="Seconds between resource samples")
+    parser.add_argument("--events", help="Stream JSON-lines stage events to a file, tcp://host:port or unix:///path")
+    parser.add_argument("--journal", default=default_journal_path(), help="Journal file recording each finished stage")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted batch from the journal instead of starting over")
     args = parser.parse_args()
 
-    # Get input models and output formats
-    input_models = args.inputs if args.inputs else get_input_models()
-    output_formats = args.outputs if args.outputs else get_output_formats()
+    options = {}
+    if args.manifest:
+        try:
+            manifest = load_manifest(args.manifest)
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not read manifest: {str(e)}")
+            sys.exit(EXIT_USAGE)
+        jobs = manifest["jobs"]
+        options = manifest["options"]
+    else:
+        # Get input models and output formats; never prompt when run unattended (e.g. from cron)
+        interactive = sys.stdin.isatty()
+        input_models = args.inputs if args.inputs else (get_input_models() if interactive else [])
+        output_formats = args.outputs if args.outputs else (get_output_formats() if interactive else [])
+        if not input_models or not output_formats:
+            print("Error: Both input models and output formats are required")
+            sys.exit(EXIT_USAGE)
+        output_dir = get_absolute_path(args.output_dir) if args.output_dir else None
+        jobs = [{"inputs": [get_absolute_path(p) for p in input_models], "formats": output_formats, "output_dir": output_dir}]
 
-    if not input_models or not output_formats:
-        print("Error: Both input models and output formats are required")
-        sys.exit(1)
+    # Command-line flags override the manifest
+    if args.max_workers is not None:
+        options["max_workers"] = args.max_workers
+    if args.threads_per_job is not None:
+        options["threads_per_job"] = args.threads_per_job
+    if args.pipeline:
+        options["pipeline"] = True
+    if args.keep_f16:
+        options["keep_f16"] = True
+    if args.pin_cores:
+        options["pin_cores"] = True
+    if args.numa:
+        options["numa"] = True
+    if args.min_free_gb is not None:
+        options["min_free_gb"] = args.min_free_gb
+    if args.timeout_minutes is not None:
+        options["timeout_minutes"] = args.timeout_minutes
+    if args.nice is not None:
+        options["nice"] = args.nice
+    if args.memory_reserve_gb is not None:
+        options["memory_reserve_gb"] = args.memory_reserve_gb
+    max_intermediate_gb = options.pop("max_intermediate_gb", 0)
 
     # Generate and display conversion plan
-    plan = generate_conversion_plan(input_models, output_formats)
+    plan = build_plan(jobs)
     display_plan(plan)
 
-    # Process all models
-    paths = get_base_paths()
-    process_models(plan, paths["convert_script_dir"], paths["llama_quantize_exe"])
+    # Process all models with the shared conversion engine, journaling and timing every stage
+    events = open_recorder(args.events)
+    runner = ProcessRunner(nice=options.get("nice"))
+    # History is bounded to the last hour of samples; per-process totals cover the whole batch
+    telemetry = TelemetrySampler(runner, interval=args.telemetry_interval, history=int(3600 / args.telemetry_interval)).start()
+    
+    def cancel(signum, frame):
+        # Killing process trees waits for them to exit, so don't block the handler
+        print("\nCancelling, stopping running processes...")
+        threading.Thread(target=runner.cancel, daemon=True).start()
+    
+    signal.signal(signal.SIGINT, cancel)
+    signal.signal(signal.SIGTERM, cancel)
+    
+    paths = converter.get_base_paths()
+    converter.process_models(
+        plan,
+        paths["convert_script_dir"],
+        paths["llama_quantize_exe"],
+        progress_callback=lambda info: print(f"[{info['progress']:5.1f}%] {info['message']}"),
+        max_workers=options.get("max_workers", 1),
+        threads_per_job=options.get("threads_per_job") or None,
+        pipeline=options.get("pipeline", False),
+        max_intermediate_bytes=int(max_intermediate_gb * 1024 ** 3) or None,
+        keep_f16=options.get("keep_f16", False),
+        journal=JobJournal(args.journal),
+        resume=args.resume,
+        events=events,
+        check_disk_space=not args.no_space_check,
+        min_free_bytes=int(options.get("min_free_gb", 1) * 1024 ** 3),
+        memory_reserve_bytes=int(options.get("memory_reserve_gb", 2) * 1024 ** 3),
+        runner=runner,
+        process_timeout=options.get("timeout_minutes", 0) * 60 or None,
+        pin_cores=options.get("pin_cores", False),
+        numa=options.get("numa", False)
+    )
+    events.close()
+    telemetry.stop()
+    
+    print("\nStage Timings:")
+    print(events.summary_table())
+    print("\nResource Usage:")
+    print(telemetry.summary_table())
+
+    if args.report:
+        write_report(args.report, plan, telemetry)
+    if args.telemetry:
+        with open(args.telemetry, "w", encoding="utf-8") as f:
+            json.dump(telemetry.report(), f, indent=4)
+    sys.exit(display_summary(plan))
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -1,40 +1,135 @@
 import os
-import subprocess
+import queue
 import sys
-from typing import List, Dict, Callable
-import gguf
-
-def run_command(command: str, working_dir: str = None) -> None:
-    try:
-        print(f"Running command: {command}")
-        subprocess.run(command, shell=True, cwd=working_dir, stdout=sys.stdout, stderr=sys.stderr, text=True, bufsize=1, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Command failed with error: {str(e)}")
-        raise
+import threading
+from contextlib import nullcontext
+from typing import List, Dict, Callable, Optional
+from scheduler import QuantizeScheduler, ByteBudget
+from safetensors_utils import estimate_f16_bytes
+from gguf_export import export_gguf, export_gguf_formats, DIRECT_FORMATS, DEFAULT_BUFFER_BYTES, DEFAULT_READ_AHEAD, DEFAULT_CAST_THREADS
+from f16_cache import F16Cache
+from fingerprint import FingerprintIndex
+from journal import JobJournal, job_id, F16_STARTED, F16_DONE, QUANT_DONE, CLEANUP_DONE
+from gguf_check import is_output_fresh, partial_path, publish, discard, PARTIAL_SUFFIX
+from events import EventRecorder, file_size
+from progress import StageProgress, line_handler
+from admission import DiskAdmission, estimate_job, device_of
+from memory import MemoryAdmission, estimate_export_memory, estimate_quantize_memory
+from process_runner import ProcessRunner, ConversionCancelled
+from placement import format_cpulist
+from dedup import content_key, same_file, link_file
 
 def get_absolute_path(path: str) -> str:
     return os.path.abspath(path)
 
-def generate_conversion_plan(input_models: List[str], output_formats: List[str]) -> List[Dict]:
+def temp_path_for(path: str, tag: str = None) -> str:
+    # Cache staging files already carry the partial suffix and are published by the cache
+    return path if path.endswith(PARTIAL_SUFFIX) else partial_path(path, tag)
+
+def generate_conversion_plan(input_models: List[str], output_formats: List[str], fingerprints: FingerprintIndex = None, output_dir: str = None) -> List[Dict]:
     plan = []
     for model in input_models:
         f16_model = model.replace(".safetensors", "-F16.gguf")
+        
+        # Content fingerprint of the source; answered from the index while the file is unchanged
+        fingerprint = None
+        if fingerprints is not None and os.path.exists(model):
+            fingerprint = fingerprints.fingerprint(model)
+        
         outputs = []
         for fmt in output_formats:
             output_model = f16_model.replace("-F16.gguf", f"-{fmt}.gguf")
+            if output_dir:
+                output_model = os.path.join(output_dir, os.path.basename(output_model))
             outputs.append({
                 "format": fmt,
                 "output": output_model,
-                "exists": os.path.exists(output_model) and os.path.getsize(output_model) > 0
+                # Complete, of the right type and built from this exact source
+                "exists": is_output_fresh(output_model, fmt, fingerprint)
             })
-        plan.append({
+        item = {
             "input": model,
             "f16": f16_model,
             "outputs": outputs
-        })
+        }
+        if fingerprint is not None:
+            item["fingerprint"] = fingerprint
+        plan.append(item)
     return plan
 
-def process_models(plan: List[Dict], convert_script_dir: str, llama_quantize_exe: str, progress_callback: Callable[[], None] = None, output_dir: str = None, keep_f16: bool = False) -> None:
+def f16_output(item: Dict, direct_outputs: List[Dict]) -> Optional[str]:
+    """Path of a requested F16 output, fresh or about to be written, that can serve as the quantize input"""
+    for out in item["outputs"]:
+        if out["format"] == "F16" and (out["exists"] or any(out is direct for direct in direct_outputs)):
+            return out["output"]
+    return None
+
+def fail_pending(item: Dict, error: str, status: str = "failed") -> None:
+    # Shared outputs belong to duplicates of this model but are made from its export
+    for output in item["outputs"] + item.get("shared_outputs", []):
+        if output.get("status") == "pending":
+            output["status"] = status
+            output["error"] = error
+
+def job_status(item: Dict) -> str:
+    """Overall result of a plan item: ok, partial, failed or cancelled"""
+    statuses = [output.get("status", "pending") for output in item["outputs"]]
+    if "cancelled" in statuses and "failed" not in statuses:
+        return "cancelled"
+    if all(status in ("done", "skipped") for status in statuses):
+        return "ok"
+    if not any(status == "done" for status in statuses):
+        return "failed"
+    return "partial"
+
+def plan_report(plan: List[Dict]) -> List[Dict]:
+    """Per-item results of a processed plan, suitable for JSON"""
+    report = []
+    for item in plan:
+        report.append({
+            "input": item["input"],
+            "fingerprint": item.get("fingerprint"),
+            "status": job_status(item),
+            "outputs": [
+                {key: out[key] for key in ("format", "output", "status", "error", "linked_from") if key in out}
+                for out in item["outputs"]
+            ]
+        })
+    return report
+
+def apply_journal(plan: List[Dict], journal: JobJournal, output_dir: str = None) -> None:
+    """Mark work an interrupted run already finished, so resuming doesn't redo it"""
+    states = journal.load()
+    for item in plan:
+        state = states.get(job_id(item))
+        if state is None:
+            continue
+        fingerprint = item.get("fingerprint")
+        for output in item["outputs"]:
+            output_model = output["output"]
+            if output_dir:
+                output_model = os.path.join(output_dir, os.path.basename(output_model))
+            recorded = state["quants"].get(output["format"])
+            if recorded and os.path.abspath(recorded) == os.path.abspath(output_model) and is_output_fresh(output_model, output["format"], fingerprint):
+                output["exists"] = True
+        # Only reuse an F16 that was finished, never cleaned up and is still intact;
+        # cache entries are found through the cache itself
+        if state["f16"] and not state["cleaned"] and not state["f16_cached"] and is_output_fresh(state["f16"], None, fingerprint):
+            item["resume_f16"] = state["f16"]
+
+def process_models(plan: List[Dict], convert_script_dir: str, llama_quantize_exe: str, progress_callback: Callable[[], None] = None, output_dir: str = None, keep_f16: bool = False, max_workers: int = 1, threads_per_job: int = None, pipeline: bool = False, pipeline_depth: int = 1, max_intermediate_bytes: int = None, native_export: bool = True, direct: bool = True, f16_cache: F16Cache = None, journal: JobJournal = None, resume: bool = False, events: EventRecorder = None, check_disk_space: bool = True, min_free_bytes: int = 0, memory_aware: bool = True, memory_reserve_bytes: int = 0, runner: ProcessRunner = None, process_timeout: float = None, pin_cores: bool = False, numa: bool = False, export_buffer_bytes: int = DEFAULT_BUFFER_BYTES, read_ahead: int = DEFAULT_READ_AHEAD, export_threads: int = DEFAULT_CAST_THREADS, partial_tag: str = None) -> None:
+    if runner is None:
+        runner = ProcessRunner()
+    if events is None:
+        events = EventRecorder()
+    if resume and journal is not None:
+        apply_journal(plan, journal, output_dir)
+    
+    # Every output ends up "skipped", "done" or "failed" so callers can report per job
+    for item in plan:
+        for output in item["outputs"]:
+            output["status"] = "skipped" if output["exists"] else "pending"
+    
     # Count only non-existing outputs for progress
     total_conversions = sum(1 for item in plan for output in item["outputs"] if not output["exists"])
     if total_conversions == 0:
@@ -46,98 +141,453 @@ def process_models(plan: List[Dict], convert_script_dir: str, llama_quantize_exe
                 "total": 0
             })
         return
-        
+    
+    events.emit("run_start", jobs=len(plan), outputs=total_conversions)
     current_conversion = 0
+    # Quantizations run on worker threads, so progress updates must be serialized
+    progress_lock = threading.RLock()
+    scheduler = QuantizeScheduler(max_workers=max_workers, threads_per_job=threads_per_job, pin_cores=pin_cores, numa=numa)
+    # Holds back exports and quantizations while available RAM is short
+    memory = MemoryAdmission(memory_reserve_bytes) if memory_aware else None
     
-    def update_progress(message: str, progress: float = None):
+    def reserve_memory(nbytes: int, message: str):
+        if memory is None:
+            return nullcontext()
+        return memory.reserve(nbytes, on_wait=lambda: update_progress(f"Waiting for free memory: {message}"))
+    
+    # Fraction done of each output that is still being written, keyed by id(output)
+    fractions = {}
+    
+    def update_progress(message: str, progress: float = None, **details):
         if progress_callback:
-            if progress is None:
-                progress = (current_conversion / total_conversions) * 100
-            progress_callback({
-                "message": message,
-                "progress": progress,
-                "current": current_conversion,
-                "total": total_conversions
-            })
+            with progress_lock:
+                if progress is None:
+                    progress = ((current_conversion + sum(fractions.values())) / total_conversions) * 100 if total_conversions else 100
+                info = {
+                    "message": message,
+                    "progress": progress,
+                    "current": current_conversion,
+                    "total": total_conversions
+                }
+                info.update(details)
+                progress_callback(info)
     
-    for model_idx, item in enumerate(plan, 1):
+    def tracker(message: str, outputs: List[Dict], total_mb: float = 0.0, task: str = None) -> Callable[..., None]:
+        """Progress callback for one stage; its fraction counts towards each of outputs.
+
+        With a task name, updates also carry the stage's own progress, so callers
+        can show one row per running export or quantization.
+        """
+        stage_progress = StageProgress(total_mb=total_mb)
+        
+        def on_progress(current: int, total: int, mb_in: float = 0.0, mb_out: float = 0.0) -> None:
+            if not stage_progress.update(current, total, mb_in, mb_out):
+                return
+            with progress_lock:
+                for out in outputs:
+                    fractions[id(out)] = stage_progress.fraction
+                details = {"task": task, "task_state": "running", "task_progress": stage_progress.fraction * 100} if task else {}
+                update_progress(
+                    f"{message} ({stage_progress.describe()})",
+                    rate=stage_progress.rate,
+                    eta=stage_progress.eta,
+                    **details
+                )
+        return on_progress
+    
+    def finish_fraction(output: Dict) -> None:
+        with progress_lock:
+            fractions.pop(id(output), None)
+    
+    def journal_record(item: Dict, stage: str, **fields) -> None:
+        if journal is not None:
+            journal.record(job_id(item), stage, **fields)
+    
+    def export_stage(model_idx: int, item: Dict, direct_outputs: List[Dict], needs_f16: bool) -> bool:
+        nonlocal current_conversion
+        runner.check_cancelled()
         input_model = item["input"]
         f16_model = item["f16"]
-        outputs = item["outputs"]
         model_name = os.path.basename(input_model)
         
-        # Skip if all outputs for this model already exist
-        if all(output["exists"] for output in outputs):
-            update_progress(f"Skipping model {model_idx}/{len(plan)}, all outputs exist: {model_name}")
-            continue
+        # An interrupted run already finished this model's F16 and never cleaned it up
+        if needs_f16 and item.get("resume_f16"):
+            update_progress(f"Resuming with existing F16 file for model {model_idx}/{len(plan)}: {model_name}")
+            print(f"\nResuming with existing F16: {item['resume_f16']}")
+            item["f16"] = f16_model = item["resume_f16"]
+            needs_f16 = False
+        
+        # A requested F16 output doubles as the quantize input, wherever it is written;
+        # one that is already fresh is read as it is, never rewritten
+        requested_f16 = f16_output(item, direct_outputs)
+        if needs_f16 and requested_f16 is not None:
+            item["f16"] = f16_model = requested_f16
+            if not any(out["output"] == requested_f16 for out in direct_outputs):
+                print(f"\nUsing existing F16 output: {requested_f16}")
+                needs_f16 = False
+        
+        # Reuse a cached F16 when the source hasn't changed, unless the F16 is itself a requested output
+        f16_target = f16_model
+        if needs_f16 and f16_cache is not None and not any(out["output"] == f16_model for out in direct_outputs):
+            update_progress(f"Checking F16 cache for model {model_idx}/{len(plan)}: {model_name}")
+            cache_key = f16_cache.key_for(input_model, item.get("fingerprint"))
+            f16_cache.acquire(cache_key)
+            item["f16_cache_key"] = cache_key
+            cached = f16_cache.get(cache_key)
+            if cached:
+                update_progress(f"Using cached F16 file for model {model_idx}/{len(plan)}: {model_name}")
+                print(f"\nUsing cached F16: {cached}")
+                events.emit("cache_hit", job=job_id(item), input=input_model, path=cached)
+                item["f16"] = f16_model = cached
+                needs_f16 = False
+            else:
+                f16_target = f16_cache.staging_path(cache_key)
+        
+        # Everything is written under a temporary name and renamed into place once complete,
+        # so a crash never leaves a file that looks finished
+        writes = {out["output"]: out["format"] for out in direct_outputs}
+        if needs_f16 and f16_target not in writes:
+            # Always F16, so the intermediate never depends on where the outputs go
+            writes[f16_target] = "F16"
+        temp_paths = {path: temp_path_for(path, partial_tag) for path in writes}
+        # Progress row of this export, e.g. "model.safetensors Q8_0, F16"
+        export_task = f"{model_name} " + ", ".join(fmt or "F16" for fmt in writes.values())
+        fingerprint = item.get("fingerprint")
+        if needs_f16:
+            journal_record(item, F16_STARTED, input=input_model)
+        
+        # Timed as one stage: a single pass writes every direct output and the F16
+        stage_name = "direct_export" if direct_outputs else "f16_export"
+        timed = events.stage(job_id(item), stage_name, bytes_in=file_size(input_model), outputs=list(writes), input=input_model) if writes else nullcontext({})
+        native = bool(direct_outputs) or (native_export and input_model.endswith(".safetensors"))
+        export_memory = estimate_export_memory(input_model, native, export_buffer_bytes, export_threads) if writes else 0
+        with reserve_memory(export_memory, model_name), timed as record:
+            try:
+                if direct_outputs:
+                    # One streaming pass writes the direct formats and, if needed, the F16 intermediate
+                    fmts = ", ".join(out["format"] for out in direct_outputs)
+                    message = f"Writing {fmts} directly for model {model_idx}/{len(plan)}: {model_name}"
+                    update_progress(message, task=export_task, task_state="running", task_progress=0.0)
+                    print(f"\nWriting {fmts} directly from: {input_model}")
+                    for out in direct_outputs:
+                        os.makedirs(os.path.dirname(out["output"]), exist_ok=True)
+                    on_progress = cancellable(tracker(message, direct_outputs, file_size(input_model) / 1024 ** 2, export_task))
+                    export_gguf_formats(input_model, {temp_paths[path]: fmt for path, fmt in writes.items()}, progress=lambda i, n, name: on_progress(i, n), source_fingerprint=fingerprint, buffer_bytes=export_buffer_bytes, read_ahead=read_ahead, threads=export_threads)
+                elif needs_f16:
+                    # Recreate the F16 file from the source to ensure correct architecture
+                    message = f"Converting model {model_idx}/{len(plan)} to F16 as an intermediate step: {model_name}"
+                    update_progress(message, task=export_task, task_state="running", task_progress=0.0)
+                    print(f"\nConverting to F16: {input_model}")
+                    # The F16 isn't an output itself, so it reports rate and ETA without moving the bar
+                    on_progress = cancellable(tracker(message, [], file_size(input_model) / 1024 ** 2, export_task))
+                    if native_export and input_model.endswith(".safetensors"):
+                        # Stream the tensors straight into a GGUF in this process
+                        export_gguf(input_model, temp_paths[f16_target], "F16", progress=lambda i, n, name: on_progress(i, n), source_fingerprint=fingerprint, buffer_bytes=export_buffer_bytes, read_ahead=read_ahead, threads=export_threads)
+                    else:
+                        convert_argv = [sys.executable, os.path.join(convert_script_dir, "convert.py"), "--src", input_model, "--dst", temp_paths[f16_target]]
+                        runner.run(convert_argv, cwd=convert_script_dir, timeout=process_timeout, on_line=line_handler(on_progress), stats=record, label=export_task)
             
-        try:
-            # Always recreate F16 file to ensure correct architecture
-            update_progress(f"Converting model {model_idx}/{len(plan)} to F16 as an intermediate step: {model_name}")
-            print(f"\nConverting to F16: {input_model}")
-            convert_command = f'python "{os.path.join(convert_script_dir, "convert.py")}" --src "{input_model}" --dst "{f16_model}"'
-            run_command(convert_command, working_dir=convert_script_dir)
+                for path, temp in temp_paths.items():
+                    if temp != path and os.path.exists(temp):
+                        publish(temp, path)
+            except Exception:
+                for temp in temp_paths.values():
+                    discard(temp)
+                for out in direct_outputs:
+                    finish_fraction(out)
+                if writes:
+                    update_progress(f"Export stopped for model {model_idx}/{len(plan)}: {model_name}", task=export_task, task_state="cancelled" if runner.cancelled else "failed")
+                raise
+        
+        if writes:
+            update_progress(f"Export finished for model {model_idx}/{len(plan)}: {model_name}", task=export_task, task_state="done", task_progress=100.0)
+        for out in direct_outputs:
+            finish_fraction(out)
+            out["status"] = "done"
+            journal_record(item, QUANT_DONE, format=out["format"], output=out["output"])
+            with progress_lock:
+                current_conversion += 1
+                update_progress(f"Completed {out['format']} direct export for model {model_idx}/{len(plan)}: {model_name}")
+        
+        # Verify F16 file exists and has size
+        if needs_f16 and (not os.path.exists(f16_target) or os.path.getsize(f16_target) == 0):
+            fail_pending(item, "F16 file not found or empty")
+            update_progress(f"Error: F16 file not found or empty for model {model_idx}/{len(plan)}: {model_name}")
+            print(f"Error: F16 file not found or empty: {f16_target}")
+            return False
+        
+        if needs_f16 and f16_target != f16_model:
+            item["f16"] = f16_cache.put(item["f16_cache_key"], f16_target)
+            print(f"Cached F16 file: {item['f16']}")
+        if needs_f16 or item["f16"] != f16_model:
+            journal_record(item, F16_DONE, path=item["f16"], cached="f16_cache_key" in item)
+        return True
+    
+    def release_f16(item: Dict) -> None:
+        cache_key = item.pop("f16_cache_key", None)
+        if cache_key:
+            f16_cache.release(cache_key)
+    
+    def quantize_outputs(model_idx: int, item: Dict, pending: List[Dict]) -> None:
+        input_model = item["input"]
+        f16_model = item["f16"]
+        outputs = item["outputs"]
+        model_name = os.path.basename(input_model)
+        if not pending:
+            return
+        
+        def quantize(output: Dict, nthreads: int, cpus: List[int] = None) -> None:
+            runner.check_cancelled()
+            fmt = output["format"]
+            output_model = output["output"]
             
-            # Verify F16 file exists and has size
-            if not os.path.exists(f16_model) or os.path.getsize(f16_model) == 0:
-                update_progress(f"Error: F16 file not found or empty for model {model_idx}/{len(plan)}: {model_name}")
-                print(f"Error: F16 file not found or empty: {f16_model}")
-                continue
+            # Create output directory if it doesn't exist
+            os.makedirs(os.path.dirname(output_model), exist_ok=True)
             
-            # Process all quantizations for this input file
-            need_f16 = False
-            for output in outputs:
-                fmt = output["format"]
-                output_model = output["output"]
-                
-                # Skip if output already exists
-                if output["exists"]:
-                    update_progress(f"Skipping existing {fmt} output for model {model_idx}/{len(plan)}: {model_name}")
-                    continue
-                    
-                # If output_dir is specified, modify the output path
-                if output_dir:
-                    output_model = os.path.join(output_dir, os.path.basename(output_model))
-                    output["output"] = output_model  # Update the plan
-                
+            message = f"Quantizing model {model_idx}/{len(plan)} to {fmt}: {model_name}"
+            task = f"{model_name} {fmt}"
+            update_progress(message, task=task, task_state="running", task_progress=0.0)
+            pinned = f", cores {format_cpulist(cpus)}" if cpus else ""
+            print(f"\nQuantizing to {fmt} ({nthreads} threads{pinned}): {output_model}")
+            # Quantize to desired format; all outputs read the same F16 so they can run side by side
+            temp_model = partial_path(output_model, partial_tag)
+            quantize_argv = [llama_quantize_exe, f16_model, temp_model, fmt, nthreads]
+            with reserve_memory(estimate_quantize_memory(input_model), f"{model_name} {fmt}"), events.stage(job_id(item), "quantize", bytes_in=file_size(f16_model), outputs=[output_model], input=input_model, format=fmt, threads=nthreads, sample_rss=False) as record:
                 try:
-                    # Create output directory if it doesn't exist
-                    os.makedirs(os.path.dirname(output_model), exist_ok=True)
-                    
-                    update_progress(f"Quantizing model {model_idx}/{len(plan)} to {fmt}: {model_name}")
-                    print(f"\nQuantizing to {fmt}: {output_model}")
-                    # Quantize to desired format
-                    quantize_command = f'"{llama_quantize_exe}" "{f16_model}" "{output_model}" {fmt}'
-                    run_command(quantize_command)
-                    
-                    # Update progress
-                    current_conversion += 1
-                    update_progress(f"Completed {fmt} quantization for model {model_idx}/{len(plan)}: {model_name}")
-                    
-                    # Mark if we need F16 (it's one of our desired outputs)
-                    if fmt == "F16":
-                        need_f16 = True
-                        
-                except Exception as e:
-                    update_progress(f"Error creating {fmt} output for model {model_idx}/{len(plan)}: {model_name}")
-                    print(f"Error creating {fmt} output: {str(e)}")
-                    continue
+                    runner.run(quantize_argv, timeout=process_timeout, affinity=cpus, on_line=line_handler(tracker(message, [output], task=task)), stats=record, label=task)
+                    publish(temp_model, output_model)
+                except Exception:
+                    discard(temp_model)
+                    raise
+        
+        def quantize_done(output: Dict, error: Exception) -> None:
+            nonlocal current_conversion
+            fmt = output["format"]
+            finish_fraction(output)
+            if error is not None:
+                output["status"] = "cancelled" if isinstance(error, ConversionCancelled) else "failed"
+                output["error"] = str(error)
+                update_progress(f"Error creating {fmt} output for model {model_idx}/{len(plan)}: {model_name}", task=f"{model_name} {fmt}", task_state=output["status"])
+                print(f"Error creating {fmt} output: {str(error)}")
+                return
             
-            # Clean up F16 if:
-            # 1. We're not keeping F16 files AND
-            # 2. F16 isn't one of the desired outputs AND
-            # 3. At least one quantization was successful
-            should_keep = keep_f16 or need_f16 or "F16" in [out["format"] for out in outputs]
-            if not should_keep and any(os.path.exists(out["output"]) for out in outputs):
-                if os.path.exists(f16_model):
+            output["status"] = "done"
+            journal_record(item, QUANT_DONE, format=fmt, output=output["output"])
+            
+            # Update progress
+            with progress_lock:
+                current_conversion += 1
+                update_progress(f"Completed {fmt} quantization for model {model_idx}/{len(plan)}: {model_name}", task=f"{model_name} {fmt}", task_state="done", task_progress=100.0)
+        
+        # Process all quantizations for this input file
+        scheduler.run(pending, quantize, quantize_done)
+        
+        # Clean up F16 if:
+        # 1. We're not keeping F16 files AND
+        # 2. The F16 file isn't itself one of the desired outputs or a cache entry AND
+        # 3. At least one quantization was successful (all of them when journaling,
+        #    so a resumed run can reuse the F16 for the ones that failed)
+        should_keep = keep_f16 or "f16_cache_key" in item or any(out["output"] == f16_model for out in outputs + item.get("shared_outputs", []))
+        succeeded = [os.path.exists(out["output"]) for out in pending]
+        if not should_keep and (all(succeeded) if journal is not None else any(succeeded)):
+            if os.path.exists(f16_model):
+                with events.stage(job_id(item), "cleanup", bytes_in=file_size(f16_model), input=input_model):
                     os.remove(f16_model)
-                    update_progress(f"Cleaned up intermediate F16 file for model {model_idx}/{len(plan)}: {model_name}")
-                    print(f"Deleted intermediate file: {f16_model}")
-                    
-        except Exception as e:
-            update_progress(f"Error processing model {model_idx}/{len(plan)}: {model_name}")
-            print(f"Error processing {input_model}: {str(e)}")
+                journal_record(item, CLEANUP_DONE, path=f16_model)
+                update_progress(f"Cleaned up intermediate F16 file for model {model_idx}/{len(plan)}: {model_name}")
+                print(f"Deleted intermediate file: {f16_model}")
+    
+    def run_totals() -> Dict:
+        statuses = [output["status"] for item in plan for output in item["outputs"]]
+        return {status: statuses.count(status) for status in ("done", "skipped", "failed", "cancelled")}
+    
+    def cancellable(on_progress: Callable[..., None]) -> Callable[..., None]:
+        """Wrap an in-process progress callback so cancelling stops the export at the next tensor"""
+        def wrapped(*args, **kwargs) -> None:
+            runner.check_cancelled()
+            on_progress(*args, **kwargs)
+        return wrapped
+    
+    def report_error(model_idx: int, item: Dict, e: Exception) -> None:
+        if isinstance(e, ConversionCancelled):
+            fail_pending(item, str(e), status="cancelled")
+            update_progress(f"Cancelled model {model_idx}/{len(plan)}: {os.path.basename(item['input'])}")
+            return
+        fail_pending(item, str(e))
+        update_progress(f"Error processing model {model_idx}/{len(plan)}: {os.path.basename(item['input'])}")
+        print(f"Error processing {item['input']}: {str(e)}")
+    
+    def can_direct(item: Dict, output: Dict) -> bool:
+        return direct and native_export and item["input"].endswith(".safetensors") and output["format"] in DIRECT_FORMATS
+    
+    def link_duplicates() -> None:
+        """Give every copy of a model the outputs made from its first copy"""
+        nonlocal current_conversion
+        for model_idx, item, output, source in links:
+            fmt = output["format"]
+            model_name = os.path.basename(item["input"])
+            if source["status"] not in ("done", "skipped"):
+                output["status"] = "cancelled" if source["status"] == "cancelled" else "failed"
+                output["error"] = f"{fmt} output of {source['output']} was not made: {source.get('error', source['status'])}"
+                continue
+            try:
+                if same_file(source["output"], output["output"]):
+                    method = "same file"
+                else:
+                    method = link_file(source["output"], output["output"], partial_tag)
+            except OSError as e:
+                output["status"] = "failed"
+                output["error"] = str(e)
+                update_progress(f"Error linking {fmt} output for model {model_idx}/{len(plan)}: {model_name}")
+                print(f"Error linking {source['output']} to {output['output']}: {e}")
+                continue
+            output["status"] = "done"
+            output["linked_from"] = source["output"]
+            journal_record(item, QUANT_DONE, format=fmt, output=output["output"])
+            events.emit("linked", job=job_id(item), input=item["input"], source=source["output"], output=output["output"], method=method)
+            print(f"Linked {output['output']} from {source['output']} ({method})")
+            with progress_lock:
+                current_conversion += 1
+                update_progress(f"Linked {fmt} output for model {model_idx}/{len(plan)} from the same model's: {model_name}")
+    
+    # One work entry per distinct model, keyed by content: copies and symlinks of a
+    # checkpoint share one export, and their outputs are linked from its results
+    entries = {}
+    links = []
+    for model_idx, item in enumerate(plan, 1):
+        model_name = os.path.basename(item["input"])
+        key = content_key(item)
+        primary = entries.get(key)
+        
+        # Skip if all outputs for this model already exist
+        if all(output["exists"] for output in item["outputs"]):
+            update_progress(f"Skipping model {model_idx}/{len(plan)}, all outputs exist: {model_name}")
+            if primary is None:
+                entries[key] = (model_idx, item, [], [])
+            continue
+        
+        pending = []
+        for output in item["outputs"]:
+            # Skip if output already exists
+            if output["exists"]:
+                update_progress(f"Skipping existing {output['format']} output for model {model_idx}/{len(plan)}: {model_name}")
+                continue
+            
+            # If output_dir is specified, modify the output path
+            if output_dir:
+                output["output"] = os.path.join(output_dir, os.path.basename(output["output"]))  # Update the plan
+            pending.append(output)
+        
+        if primary is not None:
+            item["duplicate_of"] = primary[1]["input"]
+            print(f"\nSame model as {primary[1]['input']}, sharing its conversion: {item['input']}")
+            for output in pending:
+                source = next((out for out in primary[1]["outputs"] if out["format"] == output["format"]), None)
+                if source is not None:
+                    links.append((model_idx, item, output, source))
+                else:
+                    # A format only this copy asks for is made from the first copy's export
+                    primary[2 if can_direct(primary[1], output) else 3].append(output)
+                    primary[1].setdefault("shared_outputs", []).append(output)
+            continue
+        
+        # Formats the native exporter can write need neither the F16 intermediate nor llama-quantize
+        direct_outputs = [out for out in pending if can_direct(item, out)]
+        quant_outputs = [out for out in pending if out not in direct_outputs]
+        entries[key] = (model_idx, item, direct_outputs, quant_outputs)
+    work = [entry for entry in entries.values() if entry[2] or entry[3]]
+    
+    # Admission: only start jobs whose outputs and F16 intermediate fit on disk,
+    # instead of failing partway with a full disk
+    f16_devices = []
+    if check_disk_space:
+        # Cached F16 files stay on disk just like kept ones
+        admission = DiskAdmission(min_free_bytes, keep_f16=keep_f16 or f16_cache is not None)
+        admitted = []
+        for model_idx, item, direct_outputs, quant_outputs in work:
+            f16_path = None
+            # A requested F16 output is counted once, as an output
+            if quant_outputs and not item.get("resume_f16") and f16_output(item, direct_outputs) is None:
+                f16_path = f16_cache.cache_dir if f16_cache is not None else item["f16"]
+            try:
+                needs = estimate_job(item, direct_outputs + quant_outputs, f16_path)
+            except OSError:
+                # Missing input and the like; the job reports its own error when it runs
+                admitted.append((model_idx, item, direct_outputs, quant_outputs))
+                continue
+            reason = admission.admit(needs)
+            if reason:
+                fail_pending(item, reason)
+                total_conversions -= len(direct_outputs) + len(quant_outputs)
+                update_progress(f"Skipping model {model_idx}/{len(plan)}: {reason}")
+                print(f"Skipping {item['input']}: {reason}")
+                continue
+            if f16_path:
+                f16_devices.append(device_of(f16_path)[0])
+            admitted.append((model_idx, item, direct_outputs, quant_outputs))
+        work = admitted
+    
+    if not pipeline:
+        for model_idx, item, direct_outputs, quant_outputs in work:
+            try:
+                if export_stage(model_idx, item, direct_outputs, bool(quant_outputs)):
+                    quantize_outputs(model_idx, item, quant_outputs)
+            except Exception as e:
+                report_error(model_idx, item, e)
+            finally:
+                release_f16(item)
+        link_duplicates()
+        events.emit("run_end", **run_totals())
+        return
+    
+    # Pipelined mode: a producer thread exports F16 files ahead of the quantizer.
+    # The stage queue bounds how far ahead it may run and the byte budget bounds
+    # how much intermediate F16 data may sit on disk at once.
+    intermediate_limit = max_intermediate_bytes
+    if check_disk_space:
+        # F16 files exported ahead must also fit next to every admitted output
+        headroom = admission.intermediate_headroom(f16_devices)
+        if headroom is not None:
+            intermediate_limit = min(intermediate_limit or headroom, max(headroom, 1))
+    budget = ByteBudget(intermediate_limit)
+    stage = queue.Queue(maxsize=max(1, pipeline_depth))
+    
+    def produce() -> None:
+        for model_idx, item, direct_outputs, quant_outputs in work:
+            f16_bytes = estimate_f16_bytes(item["input"]) if quant_outputs else 0
+            budget.acquire(f16_bytes)
+            ok = False
+            try:
+                ok = export_stage(model_idx, item, direct_outputs, bool(quant_outputs))
+            except Exception as e:
+                report_error(model_idx, item, e)
+            if not ok:
+                budget.release(f16_bytes)
+                release_f16(item)
+            stage.put((model_idx, item, quant_outputs, f16_bytes, ok))
+        stage.put(None)
+    
+    producer = threading.Thread(target=produce, name="f16-export", daemon=True)
+    producer.start()
+    
+    while True:
+        entry = stage.get()
+        if entry is None:
+            break
+        model_idx, item, quant_outputs, f16_bytes, ok = entry
+        if not ok:
             continue
+        try:
+            quantize_outputs(model_idx, item, quant_outputs)
+        except Exception as e:
+            report_error(model_idx, item, e)
+        finally:
+            budget.release(f16_bytes)
+            release_f16(item)
+    
+    producer.join()
+    link_duplicates()
+    events.emit("run_end", **run_totals())
 
 def get_base_paths() -> Dict[str, str]:
     # Get the directory where this script is located (scripts/)
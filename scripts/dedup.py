@@ -0,0 +1,57 @@
+import os
+import shutil
+from typing import Dict
+from gguf_check import partial_path, publish, discard
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Linux ioctl that makes a file share another file's extents (btrfs, XFS, bcachefs, ...)
+FICLONE = 0x40049409
+
+def content_key(item: Dict) -> str:
+    """Identity of a plan item's model: its content fingerprint, else the resolved path"""
+    return item.get("fingerprint") or os.path.realpath(item["input"])
+
+def same_file(a: str, b: str) -> bool:
+    return os.path.realpath(a) == os.path.realpath(b)
+
+def _reflink(src: str, dst: str) -> bool:
+    if fcntl is None:
+        return False
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return True
+        except OSError:
+            return False
+
+def link_file(src: str, dst: str, tag: str = None) -> str:
+    """Make dst a copy of the finished file src as cheaply as the filesystem allows.
+
+    Tries a reflink (independent copy-on-write file), then a hard link, then a
+    full copy, and returns which one was used. dst appears atomically, like
+    every other output.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    temp = partial_path(dst, tag)
+    discard(temp)
+    try:
+        if _reflink(src, temp):
+            method = "reflink"
+        else:
+            discard(temp)
+            try:
+                os.link(src, temp)
+                method = "hard link"
+            except OSError:
+                # Different filesystems, or links not supported
+                shutil.copyfile(src, temp)
+                method = "copy"
+        publish(temp, dst)
+    except Exception:
+        discard(temp)
+        raise
+    return method
@@ -0,0 +1,190 @@
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import threading
+from typing import Dict
+from tabulate import tabulate
+import converter
+from fingerprint import default_index
+from journal import JobJournal
+from job_queue import JobQueue, FINAL_STATES
+from process_runner import ProcessRunner
+from convert_safetensors_to_gguf import load_manifest
+
+def default_worker_name() -> str:
+    # Unique per process, so several workers can run on one machine
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def default_journal_dir(queue: str) -> str:
+    # Next to the queue, so a job retried on another machine finds its earlier stages
+    return os.path.splitext(os.path.abspath(queue))[0] + "-journals"
+
+def job_journal(args, job: Dict) -> JobJournal:
+    """Journal of one job; only the worker holding the claim appends to it"""
+    return JobJournal(os.path.join(args.journal_dir or default_journal_dir(args.queue), f"job-{job['id']}.jsonl"))
+
+def submit(args) -> None:
+    """Coordinator: turn the plan into queued jobs"""
+    if args.manifest:
+        jobs = load_manifest(args.manifest)["jobs"]
+    elif args.inputs and args.outputs:
+        output_dir = os.path.abspath(args.output_dir) if args.output_dir else None
+        jobs = [{"inputs": [os.path.abspath(p) for p in args.inputs], "formats": args.outputs, "output_dir": output_dir}]
+    else:
+        print("Error: Either --manifest or both --inputs and --outputs are required")
+        sys.exit(2)
+
+    job_queue = JobQueue(args.queue)
+    fingerprints = default_index()
+    ids = []
+    for job in jobs:
+        plan = converter.generate_conversion_plan(job["inputs"], job["formats"], fingerprints=fingerprints, output_dir=job["output_dir"])
+        ids.extend(job_queue.submit(plan, job["output_dir"]))
+    print(f"Queued {len(ids)} job(s) in {args.queue}")
+
+def run_job(job: Dict, args, runner: ProcessRunner) -> Dict:
+    """Convert one claimed job with the shared engine and return its plan item"""
+    paths = converter.get_base_paths()
+    formats = [out["format"] for out in job["outputs"]]
+    plan = converter.generate_conversion_plan([job["input"]], formats, fingerprints=default_index(), output_dir=job["output_dir"])
+    converter.process_models(
+        plan,
+        paths["convert_script_dir"],
+        paths["llama_quantize_exe"],
+        progress_callback=lambda info: print(f"[{args.name} job {job['id']}] [{info['progress']:5.1f}%] {info['message']}"),
+        keep_f16=args.keep_f16,
+        max_workers=args.max_workers,
+        threads_per_job=args.threads_per_job or None,
+        journal=job_journal(args, job),
+        # A job claimed again after its worker died picks up that worker's finished stages
+        resume=job["attempts"] > 1,
+        runner=runner,
+        pin_cores=args.pin_cores,
+        numa=args.numa,
+        # A child of an earlier claim may still be writing; never share its temporary files
+        partial_tag=f"{args.name}-{job['attempts']}"
+    )
+    return plan[0]
+
+def worker(args) -> None:
+    """Worker daemon: claim jobs, convert them and heartbeat until stopped"""
+    job_queue = JobQueue(args.queue)
+    # Children die with the worker, so a requeued job never races a leftover llama-quantize
+    runner = ProcessRunner(die_with_parent=True)
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        print(f"\n[{args.name}] Stopping, a running job goes back to the queue...")
+        stopping.set()
+        threading.Thread(target=runner.cancel, daemon=True).start()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    print(f"[{args.name}] Waiting for jobs in {args.queue}")
+    while not stopping.is_set():
+        requeued = job_queue.requeue_stale(args.stale_after)
+        if requeued:
+            print(f"[{args.name}] Requeued {requeued} job(s) from workers that stopped responding")
+
+        job = job_queue.claim(args.name)
+        if job is None:
+            if args.exit_when_empty:
+                break
+            stopping.wait(args.poll)
+            continue
+
+        print(f"[{args.name}] Claimed job {job['id']} (attempt {job['attempts']}): {job['input']}")
+        runner.reset()
+        done = threading.Event()
+
+        def beat(job_id=job["id"]) -> None:
+            while not done.wait(args.heartbeat):
+                if not job_queue.heartbeat(job_id, args.name):
+                    # Requeued and claimed elsewhere; don't keep writing the same outputs
+                    print(f"[{args.name}] Lost the claim on job {job_id}, stopping it")
+                    runner.cancel()
+                    return
+
+        heartbeat = threading.Thread(target=beat, name="heartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            item = run_job(job, args, runner)
+        except Exception as e:
+            item = None
+            print(f"[{args.name}] Job {job['id']} failed: {e}")
+        finally:
+            done.set()
+            heartbeat.join()
+
+        if stopping.is_set():
+            job_queue.release(job["id"], args.name)
+            break
+        if item is None:
+            job_queue.finish(job["id"], args.name, "failed", [])
+            continue
+        status = converter.job_status(item)
+        status = "done" if status == "ok" else status
+        result = converter.plan_report([item])[0]["outputs"]
+        if job_queue.finish(job["id"], args.name, status, result):
+            print(f"[{args.name}] Job {job['id']} {status}")
+    print(f"[{args.name}] Worker stopped")
+
+def status(args) -> None:
+    job_queue = JobQueue(args.queue)
+    table_data = []
+    for job in job_queue.jobs():
+        age = f"{time.time() - job['heartbeat']:.0f}s ago" if job["status"] == "running" and job["heartbeat"] else ""
+        formats = ", ".join(out["format"] for out in job["outputs"])
+        table_data.append([job["id"], job["input"], formats, job["status"], job["worker"] or "", job["attempts"], age])
+    print(tabulate(table_data, headers=["Job", "Input Model", "Formats", "Status", "Worker", "Attempts", "Heartbeat"], tablefmt="grid"))
+    print(", ".join(f"{name}: {count}" for name, count in sorted(job_queue.counts().items())))
+
+def requeue(args) -> None:
+    job_queue = JobQueue(args.queue)
+    count = job_queue.requeue_stale(args.stale_after)
+    count += job_queue.requeue(args.states or [])
+    print(f"Requeued {count} job(s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Share GGUF conversions between several machines through a job queue file")
+    parser.add_argument("--queue", required=True, help="SQLite queue file, on storage every worker can reach")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit_parser = commands.add_parser("submit", help="Queue conversions")
+    submit_parser.add_argument("--inputs", nargs="+", help="Input model paths")
+    submit_parser.add_argument("--outputs", nargs="+", help="Output quantization formats")
+    submit_parser.add_argument("--output-dir", help="Directory for the output files (default: next to each input)")
+    submit_parser.add_argument("--manifest", help="JSON or YAML manifest, as for convert_safetensors_to_gguf.py")
+    submit_parser.set_defaults(func=submit)
+
+    worker_parser = commands.add_parser("worker", help="Claim and convert queued jobs until stopped")
+    worker_parser.add_argument("--name", default=default_worker_name(), help="Worker name shown in the queue (default: host-pid)")
+    worker_parser.add_argument("--poll", type=float, default=10, help="Seconds between checks of an empty queue")
+    worker_parser.add_argument("--heartbeat", type=float, default=15, help="Seconds between heartbeats")
+    worker_parser.add_argument("--stale-after", type=float, default=120, help="Requeue jobs whose worker hasn't heartbeated for this many seconds")
+    worker_parser.add_argument("--exit-when-empty", action="store_true", help="Stop once the queue has no more jobs")
+    worker_parser.add_argument("--max-workers", type=int, default=1, help="Quantizations to run in parallel (0 = one per CPU core)")
+    worker_parser.add_argument("--threads-per-job", type=int, default=0, help="Threads given to each llama-quantize job (0 = split the cores evenly)")
+    worker_parser.add_argument("--pin-cores", action="store_true", help="Pin each parallel quantization to its own set of cores")
+    worker_parser.add_argument("--numa", action="store_true", help="Like --pin-cores, keeping each core set on a single NUMA node")
+    worker_parser.add_argument("--keep-f16", action="store_true", help="Keep the intermediate F16 files")
+    worker_parser.add_argument("--journal-dir", help="Shared folder for the per-job journals that let a retried job resume (default: next to the queue file)")
+    worker_parser.set_defaults(func=worker)
+
+    status_parser = commands.add_parser("status", help="Show every job")
+    status_parser.set_defaults(func=status)
+
+    requeue_parser = commands.add_parser("requeue", help="Requeue stale jobs, and optionally finished ones")
+    requeue_parser.add_argument("--stale-after", type=float, default=120, help="Requeue running jobs without a heartbeat for this many seconds")
+    requeue_parser.add_argument("--states", nargs="+", choices=FINAL_STATES, help="Also requeue jobs that ended in these states")
+    requeue_parser.set_defaults(func=requeue)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
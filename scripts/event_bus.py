@@ -0,0 +1,33 @@
+import threading
+from collections import deque
+from typing import List, Dict, Tuple, Hashable, Any
+
+class EventBus:
+    """Hand-off from worker threads to the GUI thread that coalesces state updates.
+
+    update() keeps only the latest value per key, so a worker reporting every
+    tensor costs a dict assignment and the GUI applies at most one change per
+    key per frame, however fast updates arrive. post() queues messages that
+    must all be delivered in order, such as completion and errors.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: Dict[Hashable, Any] = {}
+        self._messages = deque()
+
+    def update(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._state[key] = value
+
+    def post(self, message: Dict) -> None:
+        with self._lock:
+            self._messages.append(message)
+
+    def drain(self) -> Tuple[Dict[Hashable, Any], List[Dict]]:
+        """Latest value of every key updated since the last drain, and the queued messages"""
+        with self._lock:
+            state, self._state = self._state, {}
+            messages = list(self._messages)
+            self._messages.clear()
+        return state, messages
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import socket
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Optional
+import psutil
+from tabulate import tabulate
+from memory import PeakRssSampler
+
+def file_size(path: Optional[str]) -> int:
+    return os.path.getsize(path) if path and os.path.exists(path) else 0
+
+class EventSink:
+    """Newline-delimited JSON written to a file, a TCP socket (tcp://host:port) or a Unix socket (unix:///path)"""
+
+    def __init__(self, target: str):
+        self.target = target
+        self._lock = threading.Lock()
+        self._socket = None
+        self._file = None
+        if target.startswith("tcp://"):
+            host, _, port = target[len("tcp://"):].rpartition(":")
+            self._socket = socket.create_connection((host, int(port)), timeout=10)
+        elif target.startswith("unix://"):
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(target[len("unix://"):])
+        else:
+            directory = os.path.dirname(os.path.abspath(target))
+            os.makedirs(directory, exist_ok=True)
+            self._file = open(target, "a", encoding="utf-8")
+
+    def write(self, event: Dict) -> None:
+        line = json.dumps(event) + "\n"
+        with self._lock:
+            if self._socket is not None:
+                self._socket.sendall(line.encode("utf-8"))
+            elif self._file is not None:
+                self._file.write(line)
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._socket is not None:
+                self._socket.close()
+                self._socket = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class EventRecorder:
+    """Collects timed stage events for a run and optionally streams them to a sink.
+
+    A broken sink is dropped with a warning; it never fails the conversion.
+    """
+
+    def __init__(self, sink: Optional[EventSink] = None):
+        self.sink = sink
+        self.stages: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields) -> Dict:
+        entry = {"event": event, "time": time.time()}
+        entry.update(fields)
+        if self.sink is not None:
+            try:
+                self.sink.write(entry)
+            except OSError as e:
+                print(f"Event stream {self.sink.target} failed, no longer sending events: {e}")
+                self.sink = None
+        return entry
+
+    @contextmanager
+    def stage(self, job: str, stage: str, bytes_in: int = 0, outputs: List[str] = None, sample_rss: bool = True, **fields):
+        """Time one stage of a job; bytes out are the sizes of outputs once the stage has finished.
+
+        The yielded dict may be updated inside the block, e.g. with outputs only known later.
+        With sample_rss, this process's RSS is sampled while the stage runs and its
+        peak recorded; stages whose child process records its own peak can skip it.
+        """
+        record = {"job": job, "stage": stage, "bytes_in": bytes_in, "outputs": list(outputs or [])}
+        record.update(fields)
+        sampler = PeakRssSampler(os.getpid(), tree=False).start() if sample_rss else None
+        start = time.time()
+        self.emit("stage_start", start=start, **{k: v for k, v in record.items() if k != "outputs"})
+        exit_code = 0
+        error = None
+        try:
+            yield record
+        except Exception as e:
+            exit_code = getattr(e, "returncode", None) or 1
+            error = str(e)
+            raise
+        finally:
+            end = time.time()
+            peak = None
+            if sampler is not None:
+                # The last sample may be up to an interval old, so the RSS at the end counts too
+                peak = max(sampler.stop(), psutil.Process().memory_info().rss)
+            outputs = record.pop("outputs")
+            record.update({
+                "bytes_out": sum(file_size(path) for path in outputs) if exit_code == 0 else 0,
+                "start": start,
+                "end": end,
+                "duration": end - start,
+                "exit_code": exit_code,
+                # Stages that ran a child process record its own peak instead
+                "peak_rss": record.get("peak_rss") or peak
+            })
+            if error is not None:
+                record["error"] = error
+            with self._lock:
+                self.stages.append(record)
+            self.emit("stage_end", **record)
+
+    def summary(self) -> List[List]:
+        """Per-stage totals: count, MB in, MB out, seconds and throughput of the larger side"""
+        totals = {}
+        for record in self.stages:
+            stage = totals.setdefault(record["stage"], {"count": 0, "failed": 0, "bytes_in": 0, "bytes_out": 0, "seconds": 0.0})
+            stage["count"] += 1
+            stage["failed"] += record["exit_code"] != 0
+            stage["bytes_in"] += record["bytes_in"]
+            stage["bytes_out"] += record["bytes_out"]
+            stage["seconds"] += record["duration"]
+
+        rows = []
+        for name, stage in totals.items():
+            mb_in = stage["bytes_in"] / 1024 ** 2
+            mb_out = stage["bytes_out"] / 1024 ** 2
+            rate = max(mb_in, mb_out) / stage["seconds"] if stage["seconds"] > 0 else 0.0
+            rows.append([name, stage["count"], stage["failed"], f"{mb_in:.1f}", f"{mb_out:.1f}", f"{stage['seconds']:.1f}", f"{rate:.1f}"])
+        return rows
+
+    def summary_table(self) -> str:
+        return tabulate(self.summary(), headers=["Stage", "Runs", "Failed", "MB In", "MB Out", "Seconds", "MB/s"], tablefmt="grid")
+
+    def close(self) -> None:
+        if self.sink is not None:
+            self.sink.close()
+
+def open_recorder(target: Optional[str] = None) -> EventRecorder:
+    """Recorder streaming to target if given; an unreachable target only disables streaming"""
+    sink = None
+    if target:
+        try:
+            sink = EventSink(target)
+        except OSError as e:
+            print(f"Could not open event stream {target}: {e}")
+    return EventRecorder(sink)
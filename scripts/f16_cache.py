@@ -0,0 +1,98 @@
+import os
+import hashlib
+import shutil
+import threading
+from typing import List, Optional
+from gguf_export import EXPORT_VERSION
+from fingerprint import FingerprintIndex, content_hash
+
+class F16Cache:
+    """Persistent store of F16 intermediates keyed by source content and converter version.
+
+    Entries are plain `<key>.gguf` files. Their mtime is bumped on every hit, so
+    eviction removes the least recently used ones first.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None, fingerprints: FingerprintIndex = None):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes if max_bytes and max_bytes > 0 else None
+        self.fingerprints = fingerprints
+        self._lock = threading.Lock()
+        self._in_use = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key_for(self, source: str, source_hash: Optional[str] = None) -> str:
+        if source_hash is None:
+            source_hash = self.fingerprints.fingerprint(source) if self.fingerprints else content_hash(source)
+        return hashlib.sha256(f"{source_hash}:{EXPORT_VERSION}".encode()).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.gguf")
+
+    def staging_path(self, key: str) -> str:
+        # Written next to the final entry so publishing it is an atomic rename
+        return os.path.join(self.cache_dir, f"{key}.gguf.part")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.path_for(key)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        os.utime(path)
+        return path
+
+    def put(self, key: str, f16_path: str) -> str:
+        """Move a finished F16 file into the cache and return its cached path"""
+        path = self.path_for(key)
+        if os.path.abspath(f16_path) != path:
+            try:
+                os.replace(f16_path, path)
+            except OSError:
+                # Different filesystem
+                shutil.move(f16_path, path)
+        os.utime(path)
+        self.evict()
+        return path
+
+    def acquire(self, key: str) -> None:
+        """Protect an entry from eviction while it is being read"""
+        with self._lock:
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            count = self._in_use.get(key, 0) - 1
+            if count > 0:
+                self._in_use[key] = count
+            else:
+                self._in_use.pop(key, None)
+        self.evict()
+
+    def entries(self) -> List[str]:
+        """Cached files, least recently used first"""
+        paths = [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".gguf")
+        ]
+        return sorted(paths, key=os.path.getmtime)
+
+    def evict(self) -> None:
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            entries = self.entries()
+            total = sum(os.path.getsize(path) for path in entries)
+            for path in entries:
+                if total <= self.max_bytes:
+                    break
+                key = os.path.basename(path)[:-len(".gguf")]
+                if key in self._in_use:
+                    continue
+                size = os.path.getsize(path)
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"Could not evict cached F16 file {path}: {e}")
+                    continue
+                total -= size
+                print(f"Evicted cached F16 file: {path}")
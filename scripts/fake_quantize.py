@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import gguf
+from gguf_check import FORMAT_FILE_TYPES, SOURCE_FINGERPRINT_KEY
+
+# Stand-in for llama-quantize used by benchmark.py. It takes the same arguments
+# (input, output, format, threads), reads every tensor, burns a tunable amount of
+# CPU and writes a structurally valid GGUF of the quantized size. The tensor data
+# is filler, so its outputs are only good for timing.
+
+# Bytes hashed per byte of input (CPU cost) and seconds slept per MB written (slow storage)
+CPU_PASSES_ENV = "FAKE_QUANTIZE_CPU_PASSES"
+WRITE_DELAY_ENV = "FAKE_QUANTIZE_WRITE_DELAY"
+FSYNC_ENV = "FAKE_QUANTIZE_FSYNC"
+
+def quant_type(fmt: str) -> gguf.GGMLQuantizationType:
+    """Main tensor type of an output format, e.g. Q4_K for Q4_K_S"""
+    name = fmt.upper()
+    for candidate in (name, name.rsplit("_", 1)[0]):
+        if candidate in gguf.GGMLQuantizationType.__members__:
+            return gguf.GGMLQuantizationType[candidate]
+    raise ValueError(f"Unknown format: {fmt}")
+
+def tensor_type(tensor, qtype: gguf.GGMLQuantizationType) -> gguf.GGMLQuantizationType:
+    """Type llama-quantize would give the tensor: full precision ones stay, rows must split into blocks"""
+    if tensor.tensor_type == gguf.GGMLQuantizationType.F32:
+        return tensor.tensor_type
+    block_size = gguf.GGML_QUANT_SIZES[qtype][0]
+    return qtype if int(tensor.shape[0]) % block_size == 0 else gguf.GGMLQuantizationType.F16
+
+def tensor_nbytes(shape, qtype: gguf.GGMLQuantizationType) -> int:
+    block_size, type_size = gguf.GGML_QUANT_SIZES[qtype]
+    return int(np.prod(shape)) // block_size * type_size
+
+def burn(data: bytes, passes: float) -> None:
+    """Hash data passes times over; hashlib releases the GIL on large buffers, so threads scale"""
+    whole, fraction = divmod(passes, 1)
+    for _ in range(int(whole)):
+        hashlib.sha256(data).digest()
+    if fraction:
+        hashlib.sha256(data[:int(len(data) * fraction)]).digest()
+
+def quantize(src: str, dst: str, fmt: str, nthreads: int, cpu_passes: float, write_delay: float, fsync: bool) -> None:
+    reader = gguf.GGUFReader(src)
+    qtype = quant_type(fmt)
+    arch_field = reader.get_field(gguf.Keys.General.ARCHITECTURE)
+    arch = arch_field.contents() if arch_field is not None else "flux"
+
+    writer = gguf.GGUFWriter(path=None, arch=arch)
+    writer.add_quantization_version(gguf.GGML_QUANT_VERSION)
+    writer.add_file_type(FORMAT_FILE_TYPES.get(fmt.upper(), gguf.LlamaFileType.MOSTLY_F16))
+    fingerprint = reader.get_field(SOURCE_FINGERPRINT_KEY)
+    if fingerprint is not None:
+        writer.add_string(SOURCE_FINGERPRINT_KEY, fingerprint.contents())
+
+    plan = []
+    for tensor in reader.tensors:
+        out_type = tensor_type(tensor, qtype)
+        # GGUF stores dimensions innermost first; the writer expects them outermost first
+        shape = tuple(int(dim) for dim in reversed(tensor.shape))
+        nbytes = tensor_nbytes(shape, out_type)
+        writer.add_tensor_info(tensor.name, shape, np.float32, nbytes, raw_dtype=out_type)
+        plan.append((tensor, out_type, shape, nbytes))
+
+    filler = np.random.default_rng(0).integers(0, 256, max(nbytes for _, _, _, nbytes in plan), dtype=np.uint8)
+    writer.open_output_file(dst)
+    writer.write_header_to_file()
+    writer.write_kv_data_to_file()
+    writer.write_ti_data_to_file()
+
+    total = len(plan)
+    with ThreadPoolExecutor(max_workers=nthreads) as pool:
+        for index, (tensor, out_type, shape, nbytes) in enumerate(plan, start=1):
+            data = memoryview(tensor.data).cast("B")
+            step = max(1, -(-len(data) // nthreads))
+            list(pool.map(lambda start: burn(data[start:start + step], cpu_passes), range(0, len(data), step)))
+            writer.write_tensor_data(filler[:nbytes])
+            if write_delay:
+                time.sleep(write_delay * nbytes / 1024 ** 2)
+            dims = ", ".join(f"{dim:5d}" for dim in tensor.shape)
+            print(
+                f"[{index:4d}/{total:4d}] {tensor.name:>40s} - [{dims}], type = {tensor.tensor_type.name.lower():>6s}, "
+                f"converting to {out_type.name.lower()} .. size = {tensor.n_bytes / 1024 ** 2:8.2f} MiB -> {nbytes / 1024 ** 2:8.2f} MiB",
+                flush=True
+            )
+
+    if fsync:
+        writer.fout[0].flush()
+        os.fsync(writer.fout[0].fileno())
+    writer.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="llama-quantize stand-in for benchmarks: valid GGUF layout, filler tensor data")
+    parser.add_argument("input", help="F16 GGUF to read")
+    parser.add_argument("output", help="GGUF to write")
+    parser.add_argument("format", help="Output format, e.g. Q4_K_S")
+    parser.add_argument("nthreads", nargs="?", type=int, default=os.cpu_count() or 1, help="Threads sharing the CPU work")
+    parser.add_argument("--cpu-passes", type=float, default=float(os.environ.get(CPU_PASSES_ENV, 1.0)), help="Times every input byte is hashed (CPU cost)")
+    parser.add_argument("--write-delay", type=float, default=float(os.environ.get(WRITE_DELAY_ENV, 0.0)), help="Seconds to sleep per MB written (slow storage)")
+    parser.add_argument("--fsync", action="store_true", default=os.environ.get(FSYNC_ENV) == "1", help="Flush the output to disk before exiting")
+    args = parser.parse_args()
+
+    print(f"main: quantizing '{args.input}' to '{args.output}' as {args.format} using {args.nthreads} threads", flush=True)
+    start = time.time()
+    try:
+        quantize(args.input, args.output, args.format, max(1, args.nthreads), args.cpu_passes, args.write_delay, args.fsync)
+    except Exception as e:
+        print(f"main: failed to quantize model from '{args.input}': {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"main: quantize time = {(time.time() - start) * 1000:10.2f} ms", flush=True)
+
+if __name__ == "__main__":
+    main()
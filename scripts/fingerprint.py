@@ -0,0 +1,109 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+# Large chunks keep hashlib (which releases the GIL) busy on every worker thread
+HASH_CHUNK_SIZE = 64 * 1024 * 1024
+
+def header_hash(path: str) -> str:
+    """Hash of the leading length field and JSON header of a safetensors file"""
+    with open(path, "rb") as f:
+        prefix = f.read(8)
+        header_size = int.from_bytes(prefix, "little") if len(prefix) == 8 else 0
+        # Non-safetensors files just get their first chunk hashed
+        if not path.endswith(".safetensors") or header_size > 100 * 1024 * 1024:
+            header_size = 1024 * 1024
+        return hashlib.sha256(prefix + f.read(header_size)).hexdigest()
+
+def _hash_chunk(path: str, offset: int, length: int) -> bytes:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        f.seek(offset)
+        remaining = length
+        while remaining > 0:
+            block = f.read(min(remaining, 8 * 1024 * 1024))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.digest()
+
+def content_hash(path: str, workers: Optional[int] = None) -> str:
+    """Chunked hash of the whole file; chunks are hashed in parallel and combined in order"""
+    size = os.path.getsize(path)
+    offsets = range(0, max(size, 1), HASH_CHUNK_SIZE)
+    workers = workers or min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = pool.map(lambda offset: _hash_chunk(path, offset, HASH_CHUNK_SIZE), offsets)
+        combined = hashlib.sha256(size.to_bytes(8, "little"))
+        for digest in digests:
+            combined.update(digest)
+    return combined.hexdigest()
+
+class FingerprintIndex:
+    """SQLite index of file fingerprints.
+
+    Each row records size, mtime and header hash next to the full content hash,
+    so an unchanged file is answered from the index without reading its data.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+                "header_hash TEXT, content_hash TEXT, updated REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.realpath(path)
+
+    def lookup(self, path: str) -> Optional[Dict]:
+        """Stored record for path if its size and mtime still match, without reading the file"""
+        st = os.stat(path)
+        with self._lock, closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT size, mtime_ns, header_hash, content_hash FROM files WHERE path = ?",
+                (self._key(path),)
+            ).fetchone()
+        if row is None or row[0] != st.st_size or row[1] != st.st_mtime_ns:
+            return None
+        return {"size": row[0], "mtime_ns": row[1], "header_hash": row[2], "content_hash": row[3]}
+
+    def quick(self, path: str) -> Dict:
+        """Size, mtime and header hash; only the header is read"""
+        st = os.stat(path)
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "header_hash": header_hash(path)}
+
+    def fingerprint(self, path: str) -> str:
+        """Content hash of path, recomputed only when size, mtime or header changed"""
+        record = self.lookup(path)
+        quick = self.quick(path)
+        if record is not None and record["header_hash"] == quick["header_hash"]:
+            return record["content_hash"]
+
+        digest = content_hash(path)
+        # Don't record a hash for a file that changed while we were reading it
+        st = os.stat(path)
+        if st.st_size != quick["size"] or st.st_mtime_ns != quick["mtime_ns"]:
+            return digest
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, header_hash, content_hash, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(path), quick["size"], quick["mtime_ns"], quick["header_hash"], digest, time.time())
+            )
+        return digest
+
+def default_index() -> FingerprintIndex:
+    return FingerprintIndex(os.path.join(os.path.dirname(os.path.abspath(__file__)), "fingerprints.sqlite"))
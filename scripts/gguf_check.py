@@ -0,0 +1,80 @@
+import os
+from typing import Optional
+import gguf
+
+# Metadata key the exporter stamps into every GGUF it writes; llama-quantize copies it to its outputs
+SOURCE_FINGERPRINT_KEY = "flux_gguf.source_fingerprint"
+
+# general.file_type llama.cpp records for each output format (COPY keeps the input's type)
+FORMAT_FILE_TYPES = {
+    "Q2_K": gguf.LlamaFileType.MOSTLY_Q2_K,
+    "Q2_K_S": gguf.LlamaFileType.MOSTLY_Q2_K_S,
+    "Q3_K_S": gguf.LlamaFileType.MOSTLY_Q3_K_S,
+    "Q3_K_M": gguf.LlamaFileType.MOSTLY_Q3_K_M,
+    "Q3_K_L": gguf.LlamaFileType.MOSTLY_Q3_K_L,
+    "Q4_0": gguf.LlamaFileType.MOSTLY_Q4_0,
+    "Q4_1": gguf.LlamaFileType.MOSTLY_Q4_1,
+    "Q4_K": gguf.LlamaFileType.MOSTLY_Q4_K_M,
+    "Q4_K_S": gguf.LlamaFileType.MOSTLY_Q4_K_S,
+    "Q4_K_M": gguf.LlamaFileType.MOSTLY_Q4_K_M,
+    "Q5_0": gguf.LlamaFileType.MOSTLY_Q5_0,
+    "Q5_1": gguf.LlamaFileType.MOSTLY_Q5_1,
+    "Q5_K": gguf.LlamaFileType.MOSTLY_Q5_K_M,
+    "Q5_K_S": gguf.LlamaFileType.MOSTLY_Q5_K_S,
+    "Q5_K_M": gguf.LlamaFileType.MOSTLY_Q5_K_M,
+    "Q6_K": gguf.LlamaFileType.MOSTLY_Q6_K,
+    "Q8_0": gguf.LlamaFileType.MOSTLY_Q8_0,
+    "F16": gguf.LlamaFileType.MOSTLY_F16,
+    "BF16": gguf.LlamaFileType.MOSTLY_BF16,
+    "F32": gguf.LlamaFileType.ALL_F32,
+}
+
+# Suffix for files that are still being written; they are renamed into place when complete
+PARTIAL_SUFFIX = ".part"
+
+def partial_path(path: str, tag: Optional[str] = None) -> str:
+    """Temporary name of path; a tag keeps writers that may overlap (e.g. retried jobs) apart"""
+    return f"{path}.{tag}{PARTIAL_SUFFIX}" if tag else path + PARTIAL_SUFFIX
+
+def publish(partial: str, path: str) -> None:
+    """Atomically move a finished file to its final name"""
+    os.replace(partial, path)
+
+def discard(partial: str) -> None:
+    if os.path.exists(partial):
+        try:
+            os.remove(partial)
+        except OSError as e:
+            print(f"Could not remove partial file {partial}: {e}")
+
+def _field_value(reader: gguf.GGUFReader, key: str):
+    field = reader.get_field(key)
+    return field.contents() if field is not None else None
+
+def is_output_fresh(path: str, fmt: Optional[str] = None, fingerprint: Optional[str] = None) -> bool:
+    """True if path is a complete GGUF of the expected type built from the expected source.
+
+    Outputs without a recorded fingerprint (written by older versions) are
+    accepted as long as they are structurally complete.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return False
+    try:
+        reader = gguf.GGUFReader(path)
+    except Exception:
+        # Truncated tensor data or a damaged header/tensor table
+        return False
+
+    size = os.path.getsize(path)
+    if not reader.tensors or any(t.data_offset + t.n_bytes > size for t in reader.tensors):
+        return False
+
+    expected_type = FORMAT_FILE_TYPES.get(fmt)
+    file_type = _field_value(reader, gguf.Keys.General.FILE_TYPE)
+    if expected_type is not None and file_type is not None and file_type != expected_type:
+        return False
+
+    recorded = _field_value(reader, SOURCE_FINGERPRINT_KEY)
+    if fingerprint is not None and recorded is not None and recorded != fingerprint:
+        return False
+    return True
@@ -0,0 +1,445 @@
+import os
+import mmap
+import queue
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Callable, Iterator, Optional
+import numpy as np
+import gguf
+from gguf_check import SOURCE_FINGERPRINT_KEY
+from safetensors_utils import read_header_and_offset, tensor_entries, num_elements
+
+# Bump whenever the exported tensors change, so cached F16 files are rebuilt
+EXPORT_VERSION = "1"
+
+# Same thresholds as the ComfyUI-GGUF convert.py this replaces
+QUANTIZATION_THRESHOLD = 1024
+MAX_TENSOR_DIMS = 4
+
+# Checkpoints saved by ComfyUI bundle the unet under one of these prefixes
+MODEL_PREFIXES = ["model.diffusion_model.", "model."]
+
+FLUX_KEYS_DETECT = ["double_blocks.0.img_attn.proj.weight"]
+FLUX_KEYS_BANNED = ["transformer_blocks.0.attn.norm_added_k.weight"]
+
+FILE_TYPES = {
+    "F16": gguf.LlamaFileType.MOSTLY_F16,
+    "BF16": gguf.LlamaFileType.MOSTLY_BF16,
+    "F32": gguf.LlamaFileType.ALL_F32,
+    "Q8_0": gguf.LlamaFileType.MOSTLY_Q8_0,
+}
+
+# Formats that can be written straight from the source without llama-quantize
+DIRECT_FORMATS = list(FILE_TYPES)
+
+# Size of the cast buffers, allocated once per export; memory stays flat however large the model
+DEFAULT_BUFFER_BYTES = 8 * 1024 * 1024
+
+# Tensors whose file pages are requested from the OS ahead of the one being converted
+DEFAULT_READ_AHEAD = 2
+
+# Chunk lengths are a multiple of this, so chunks hold whole blocks of every quantized type
+CHUNK_ALIGN = 256
+
+# Threads casting chunks in parallel; NumPy releases the GIL while it works on them
+DEFAULT_CAST_THREADS = os.cpu_count() or 1
+
+# Tensors whose chunks may be queued at once, so workers don't idle between tensors
+TENSORS_IN_FLIGHT = 2
+
+def _e4m3fn_table() -> np.ndarray:
+    # Decode every possible float8_e4m3fn byte once; casting is then a table lookup
+    table = np.zeros(256, dtype=np.float32)
+    for b in range(256):
+        sign = -1.0 if b & 0x80 else 1.0
+        exp = (b >> 3) & 0xF
+        mant = b & 0x7
+        if exp == 0xF and mant == 0x7:
+            table[b] = np.nan
+        elif exp == 0:
+            table[b] = sign * (mant / 8.0) * 2.0 ** -6
+        else:
+            table[b] = sign * (1.0 + mant / 8.0) * 2.0 ** (exp - 7)
+    return table.astype(np.float16)
+
+E4M3FN_TO_F16 = _e4m3fn_table()
+
+def select_tensors(header: Dict) -> Dict[str, Dict]:
+    """Map output tensor names to their safetensors entries, dropping non-unet weights"""
+    entries = tensor_entries(header)
+    prefix = None
+    for pfx in MODEL_PREFIXES:
+        if any(name.startswith(pfx) for name in entries):
+            prefix = pfx
+            break
+
+    tensors = {}
+    for name, info in entries.items():
+        if prefix:
+            if not name.startswith(prefix):
+                continue
+            name = name[len(prefix):]
+        tensors[name] = info
+    return tensors
+
+def detect_arch(tensors: Dict[str, Dict]) -> str:
+    if any(key in tensors for key in FLUX_KEYS_BANNED):
+        raise ValueError("Diffusers-format Flux checkpoints are not supported, convert them to the original layout first")
+    if all(key in tensors for key in FLUX_KEYS_DETECT):
+        return "flux"
+    raise ValueError("Unknown model architecture, expected a Flux transformer checkpoint")
+
+def target_type(name: str, info: Dict, out_type: str) -> gguf.GGMLQuantizationType:
+    n_params = num_elements(info["shape"])
+    if out_type == "F32" or (info["dtype"] in ("F32", "BF16") and (len(info["shape"]) == 1 or n_params <= QUANTIZATION_THRESHOLD)):
+        # Norms, biases and tiny tensors stay in full precision
+        return gguf.GGMLQuantizationType.F32
+    if out_type == "Q8_0":
+        block_size = gguf.GGML_QUANT_SIZES[gguf.GGMLQuantizationType.Q8_0][0]
+        if len(info["shape"]) == 1 or info["shape"][-1] % block_size != 0:
+            # Rows that don't split into whole blocks can't be quantized
+            return gguf.GGMLQuantizationType.F16
+    return gguf.GGMLQuantizationType[out_type]
+
+def to_float32(data: np.ndarray, src_dtype: str) -> np.ndarray:
+    if src_dtype == "BF16":
+        # BF16 is the upper half of an F32, so widening is a shift
+        return (data.astype(np.uint32) << 16).view(np.float32)
+    if src_dtype == "F8_E4M3":
+        return E4M3FN_TO_F16[data].astype(np.float32)
+    if src_dtype == "F8_E5M2":
+        # E5M2 is the upper byte of an F16
+        return (data.astype(np.uint16) << 8).view(np.float16).astype(np.float32)
+    return data.astype(np.float32)
+
+# Raw element type of each supported source dtype; BF16 and FP8 are decoded by hand
+RAW_DTYPES = {
+    "F32": np.float32, "F16": np.float16, "BF16": np.uint16,
+    "F8_E4M3": np.uint8, "F8_E5M2": np.uint8,
+}
+
+def bf16_to_f16(src: np.ndarray, out: np.ndarray, work: np.ndarray) -> None:
+    """Write the F16 bits of BF16 src into out (uint16) with integer ops only.
+
+    Rounds like an F32 -> F16 cast: to nearest even for F16 subnormals,
+    to infinity past the F16 range, keeping NaN payloads. work is an int32
+    scratch buffer at least as long as src.
+    """
+    w = work[:src.size]
+    np.bitwise_and(src, 0x7FFF, out=w)
+    # Exponents that fit an F16 normal: rebias and move the 7 mantissa bits up, exactly
+    w -= 0x3800
+    small = np.flatnonzero(w < 0x80)
+    large = np.flatnonzero(w >= 0x0F80)
+    w <<= 3
+    np.copyto(out, w, casting="unsafe")
+    if small.size:
+        # F16 subnormals and zeros: shift the significand into place, rounding half to even
+        bits = (src[small] & 0x7FFF).astype(np.int32)
+        exp = bits >> 7
+        significand = (bits & 0x7F) | 0x80
+        shift = np.clip(110 - exp, -2, 24)
+        right = np.maximum(shift, 0)
+        result = np.where(shift < 0, significand << np.maximum(-shift, 0), significand >> right)
+        rest = significand & ((1 << right) - 1)
+        half = np.where(right > 0, 1 << np.maximum(right - 1, 0), 1 << 30)
+        result += (rest > half) | ((rest == half) & (result & 1 == 1))
+        result[exp == 0] = 0
+        out[small] = result
+    if large.size:
+        # Past the F16 range: infinity, or NaN with the payload kept
+        bits = src[large] & 0x7FFF
+        out[large] = np.where(bits >= 0x7F80, 0x7C00 | ((bits & 0x7F) << 3), 0x7C00)
+    out |= src & 0x8000
+
+class Mapping:
+    """Memory-mapped file whose pages can be prefetched and dropped explicitly"""
+
+    def __init__(self, mapped: mmap.mmap):
+        self._mmap = mapped
+        self._base = np.frombuffer(mapped, dtype=np.uint8)
+        self._address = self._base.ctypes.data
+
+    def _advise(self, option_name: str, start: int, length: int) -> None:
+        option = getattr(mmap, option_name, None)
+        if option is None or length <= 0:
+            return
+        # madvise needs a page-aligned start
+        aligned = start - start % mmap.PAGESIZE
+        self._mmap.madvise(option, aligned, min(length + start - aligned, len(self._mmap) - aligned))
+
+    def release(self, data: np.ndarray) -> None:
+        """Drop the pages behind a view from this process; they stay in the page cache"""
+        if data.base is not None and data.nbytes:
+            self._advise("MADV_DONTNEED", data.ctypes.data - self._address, data.nbytes)
+
+    def close(self) -> None:
+        self._base = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # A view is still referenced (e.g. by a traceback); the mapping closes once it is collected
+            pass
+
+class MappedSource(Mapping):
+    """Read-only mapping of a safetensors file.
+
+    Tensors are views into one mapping, so nothing is read until it is used.
+    Where the OS supports it, pages are prefetched ahead of use and dropped
+    from this process once converted, keeping resident memory flat.
+    """
+
+    def __init__(self, path: str, data_start: int):
+        with open(path, "rb") as f:
+            super().__init__(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        self.data_start = data_start
+
+    def tensor(self, info: Dict) -> np.ndarray:
+        """Flat view of one tensor"""
+        raw_dtype = RAW_DTYPES.get(info["dtype"])
+        if raw_dtype is None:
+            raise ValueError(f"Unsupported tensor dtype {info['dtype']}")
+        begin, end = info["data_offsets"]
+        if end == begin:
+            return np.zeros(num_elements(info["shape"]), dtype=raw_dtype)
+        return self._base[self.data_start + begin:self.data_start + end].view(raw_dtype)
+
+    def prefetch(self, info: Dict) -> None:
+        begin, end = info["data_offsets"]
+        self._advise("MADV_WILLNEED", self.data_start + begin, end - begin)
+
+class MappedOutput(Mapping):
+    """A GGUF file preallocated after its header, with tensor data filled in place"""
+
+    def __init__(self, writer: gguf.GGUFWriter, sizes: List[int]):
+        # The header, KV data and tensor table are already written; tensor data starts aligned after them
+        f = writer.fout[0]
+        writer.write_padding(f, f.tell())
+        path, start = f.name, f.tell()
+        writer.close()
+        self.offsets = []
+        for nbytes in sizes:
+            self.offsets.append(start)
+            start += writer.ggml_pad(nbytes, writer.data_alignment)
+        self.sizes = sizes
+        with open(path, "r+b") as f:
+            if hasattr(os, "posix_fallocate"):
+                # A full disk then fails here, not with SIGBUS while writing through the mapping
+                os.posix_fallocate(f.fileno(), 0, start)
+            else:
+                f.truncate(start)
+            super().__init__(mmap.mmap(f.fileno(), start))
+
+    def region(self, index: int) -> np.ndarray:
+        """Bytes of one tensor, as a writable view"""
+        return self._base[self.offsets[index]:self.offsets[index] + self.sizes[index]]
+
+    def release(self, data: np.ndarray) -> None:
+        # Dirty pages must reach the file before they can be dropped
+        start = data.ctypes.data - self._address
+        aligned = start - start % mmap.PAGESIZE
+        if data.nbytes:
+            self._mmap.flush(aligned, data.nbytes + start - aligned)
+        super().release(data)
+
+    def close(self) -> None:
+        self._mmap.flush()
+        super().close()
+
+def read_tensors(source: MappedSource, tensors: Dict[str, Dict], read_ahead: int = DEFAULT_READ_AHEAD) -> Iterator[Tuple[str, Dict, np.ndarray]]:
+    """Read stage: yield (GGUF name, entry, flat mapped data) one tensor at a time, prefetching the next read_ahead"""
+    items = list(tensors.items())
+    ahead = 0
+    for i, (name, info) in enumerate(items):
+        while ahead < min(len(items), i + 1 + read_ahead):
+            source.prefetch(items[ahead][1])
+            ahead += 1
+        yield name, info, source.tensor(info)
+
+def chunk_elements(buffer_bytes: int) -> int:
+    # Sized for the widest intermediate, F32
+    return max(CHUNK_ALIGN, buffer_bytes // 4 // CHUNK_ALIGN * CHUNK_ALIGN)
+
+class ChunkCaster:
+    """Converts source chunks straight into output regions, with scratch buffers reused for every chunk"""
+
+    def __init__(self, buffer_bytes: int = DEFAULT_BUFFER_BYTES):
+        self.chunk = chunk_elements(buffer_bytes)
+        self.f32 = np.empty(self.chunk, dtype=np.float32)
+        self.work = np.empty(self.chunk, dtype=np.int32)
+
+    def widen(self, data: np.ndarray, src_dtype: str) -> np.ndarray:
+        """F32 values of a source chunk"""
+        if src_dtype == "F32":
+            return data
+        out = self.f32[:data.size]
+        if src_dtype == "BF16":
+            # BF16 is the upper half of an F32, so widening is a shift
+            bits = out.view(np.uint32)
+            np.copyto(bits, data)
+            bits <<= 16
+        elif src_dtype == "F16":
+            np.copyto(out, data)
+        else:
+            np.copyto(out, to_float32(data, src_dtype))
+        return out
+
+    def cast_into(self, data: np.ndarray, src_dtype: str, qtype: gguf.GGMLQuantizationType, out: np.ndarray, as_float32: Callable[[], np.ndarray]) -> None:
+        """Convert a source chunk into out, the chunk's bytes in the output"""
+        if (qtype, src_dtype) in ((gguf.GGMLQuantizationType.F16, "F16"), (gguf.GGMLQuantizationType.BF16, "BF16"), (gguf.GGMLQuantizationType.F32, "F32")):
+            np.copyto(out.view(data.dtype), data)
+        elif qtype == gguf.GGMLQuantizationType.F16 and src_dtype == "BF16":
+            bf16_to_f16(data, out.view(np.uint16), self.work)
+        elif qtype == gguf.GGMLQuantizationType.F16 and src_dtype == "F8_E4M3":
+            np.take(E4M3FN_TO_F16, data, out=out.view(np.float16))
+        elif qtype == gguf.GGMLQuantizationType.F16:
+            np.copyto(out.view(np.float16), as_float32(), casting="same_kind")
+        elif qtype == gguf.GGMLQuantizationType.F32:
+            np.copyto(out.view(np.float32), as_float32())
+        else:
+            np.copyto(out, gguf.quants.quantize(as_float32(), qtype).view(np.uint8).reshape(-1))
+
+    def convert(self, data: np.ndarray, src_dtype: str, targets: List[Tuple[gguf.GGMLQuantizationType, np.ndarray]]) -> None:
+        """Convert one chunk for every output (qtype, region) pair"""
+        widened = None
+
+        def as_float32() -> np.ndarray:
+            # Shared by every output that needs F32 values of this chunk
+            nonlocal widened
+            if widened is None:
+                widened = self.widen(data, src_dtype)
+            return widened
+
+        for qtype, out in targets:
+            self.cast_into(data, src_dtype, qtype, out, as_float32)
+
+def chunk_bytes(qtype: gguf.GGMLQuantizationType, start: int, stop: int) -> slice:
+    """Byte range of elements start:stop in a tensor of qtype"""
+    block_size, type_size = gguf.GGML_QUANT_SIZES[qtype]
+    return slice(start // block_size * type_size, stop // block_size * type_size)
+
+def default_out_type(tensors: Dict[str, Dict]) -> str:
+    # Like convert.py: keep BF16 checkpoints in BF16, everything else becomes F16
+    first = next(iter(tensors.values()))
+    return "BF16" if first["dtype"] == "BF16" else "F16"
+
+def export_gguf(src: str, dst: str, out_type: Optional[str] = None, progress: Callable[[int, int, str], None] = None, source_fingerprint: Optional[str] = None, buffer_bytes: int = DEFAULT_BUFFER_BYTES, read_ahead: int = DEFAULT_READ_AHEAD, threads: int = DEFAULT_CAST_THREADS) -> None:
+    """Write src as an F16/BF16 GGUF, streaming one tensor at a time"""
+    export_gguf_formats(src, {dst: out_type}, progress=progress, source_fingerprint=source_fingerprint, buffer_bytes=buffer_bytes, read_ahead=read_ahead, threads=threads)
+
+def export_gguf_formats(src: str, targets: Dict[str, Optional[str]], progress: Callable[[int, int, str], None] = None, source_fingerprint: Optional[str] = None, buffer_bytes: int = DEFAULT_BUFFER_BYTES, read_ahead: int = DEFAULT_READ_AHEAD, threads: int = DEFAULT_CAST_THREADS) -> None:
+    """Write several GGUF files (dst -> output type) from src in a single streaming pass"""
+    header, data_start = read_header_and_offset(src)
+    tensors = select_tensors(header)
+    if not tensors:
+        raise ValueError(f"No tensors found in {src}")
+    arch = detect_arch(tensors)
+    targets = {dst: out_type or default_out_type(tensors) for dst, out_type in targets.items()}
+    for out_type in targets.values():
+        if out_type not in FILE_TYPES:
+            raise ValueError(f"Unsupported output type {out_type}, expected one of {', '.join(FILE_TYPES)}")
+
+    writers = []
+    for dst, out_type in targets.items():
+        writer = gguf.GGUFWriter(path=None, arch=arch)
+        writer.add_quantization_version(gguf.GGML_QUANT_VERSION)
+        writer.add_file_type(FILE_TYPES[out_type])
+        if source_fingerprint:
+            # Lets later runs tell whether this output (and its quants) came from the current source
+            writer.add_string(SOURCE_FINGERPRINT_KEY, source_fingerprint)
+
+        # First pass: tensor table only, computed from the header
+        qtypes, sizes = [], []
+        for name, info in tensors.items():
+            if len(info["shape"]) > MAX_TENSOR_DIMS:
+                raise ValueError(f"Tensor {name} has more than {MAX_TENSOR_DIMS} dimensions")
+            qtype = target_type(name, info, out_type)
+            block_size, type_size = gguf.GGML_QUANT_SIZES[qtype]
+            nbytes = num_elements(info["shape"]) // block_size * type_size
+            # The shape is given in elements, so any non-uint8 dtype keeps it as-is
+            writer.add_tensor_info(name, tuple(info["shape"]), np.float32, nbytes, raw_dtype=qtype)
+            qtypes.append(qtype)
+            sizes.append(nbytes)
+        writers.append((dst, writer, qtypes, sizes))
+
+    threads = max(1, threads or DEFAULT_CAST_THREADS)
+    # One set of scratch buffers per thread
+    casters = queue.Queue()
+    for _ in range(threads):
+        casters.put(ChunkCaster(buffer_bytes))
+    chunk = chunk_elements(buffer_bytes)
+    source, outputs = None, []
+    pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="cast")
+
+    def convert_chunk(data: np.ndarray, src_dtype: str, targets: List[Tuple[gguf.GGMLQuantizationType, np.ndarray]]) -> None:
+        caster = casters.get()
+        try:
+            caster.convert(data, src_dtype, targets)
+        finally:
+            casters.put(caster)
+        source.release(data)
+        for output, (_, region) in zip(outputs, targets):
+            output.release(region)
+
+    try:
+        for dst, writer, _, sizes in writers:
+            writer.write_header_to_file(path=dst)
+            writer.write_kv_data_to_file()
+            writer.write_ti_data_to_file()
+            outputs.append(MappedOutput(writer, sizes))
+
+        # Second pass: read -> cast -> write. Each tensor is split into chunks that
+        # the pool converts straight into the mapped outputs, so the source is read
+        # once for every output and only the per-thread cast buffers stay allocated.
+        # Converted chunks are flushed and dropped from memory as they complete
+        source = MappedSource(src, data_start)
+        in_flight = deque()
+
+        def finish_oldest() -> None:
+            index, name, futures = in_flight.popleft()
+            for future in futures:
+                future.result()
+            if progress:
+                progress(index + 1, len(tensors), name)
+
+        for i, (name, info, data) in enumerate(read_tensors(source, tensors, read_ahead)):
+            regions = [output.region(i) for output in outputs]
+            tensor_qtypes = [qtypes[i] for _, _, qtypes, _ in writers]
+            futures = []
+            for start in range(0, data.size, chunk):
+                stop = min(start + chunk, data.size)
+                targets = [(qtype, region[chunk_bytes(qtype, start, stop)]) for qtype, region in zip(tensor_qtypes, regions)]
+                futures.append(pool.submit(convert_chunk, data[start:stop], info["dtype"], targets))
+            in_flight.append((i, name, futures))
+            del data
+            while len(in_flight) >= TENSORS_IN_FLIGHT:
+                finish_oldest()
+        while in_flight:
+            finish_oldest()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        in_flight = None
+        if source is not None:
+            source.close()
+        for output in outputs:
+            output.close()
+        for _, writer, _, _ in writers:
+            writer.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a Flux safetensors model to an F16/BF16/F32/Q8_0 GGUF file")
+    parser.add_argument("--src", required=True, help="Input .safetensors model")
+    parser.add_argument("--dst", help="Output .gguf path (default: <src>-F16.gguf)")
+    parser.add_argument("--type", choices=list(FILE_TYPES), help="Output type (default: BF16 for BF16 models, otherwise F16)")
+    parser.add_argument("--buffer-mb", type=int, default=DEFAULT_BUFFER_BYTES // 1024 ** 2, help="Size of the cast buffers")
+    parser.add_argument("--read-ahead", type=int, default=DEFAULT_READ_AHEAD, help="Tensors to prefetch ahead of the one being converted")
+    parser.add_argument("--threads", type=int, default=DEFAULT_CAST_THREADS, help="Threads converting chunks in parallel")
+    args = parser.parse_args()
+
+    dst = args.dst or args.src.replace(".safetensors", "-F16.gguf")
+    export_gguf(args.src, dst, out_type=args.type, progress=lambda i, n, name: print(f"[{i:4d}/{n:4d}] {name}"), buffer_bytes=args.buffer_mb * 1024 ** 2, read_ahead=args.read_ahead, threads=args.threads)
+    print(f"Wrote {dst}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import json
+import time
+import sqlite3
+import threading
+from contextlib import closing
+from typing import List, Dict, Optional
+
+# Job states; "done", "partial", "failed" and "cancelled" are final and match converter.job_status
+QUEUED = "queued"
+RUNNING = "running"
+FINAL_STATES = ["done", "partial", "failed", "cancelled"]
+
+# A job whose worker stopped heartbeating is retried this many times in total before it is failed
+MAX_ATTEMPTS = 3
+
+class JobQueue:
+    """Conversion jobs shared by several machines through one SQLite file.
+
+    Each job is one plan item: an input model and the outputs still to produce.
+    Workers claim jobs inside an immediate transaction, so two workers never get
+    the same job, and keep them alive with heartbeats. The file must live on a
+    filesystem with working POSIX locks (NFSv4 with locking enabled, or local disk).
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, input TEXT, outputs TEXT, output_dir TEXT, "
+                "status TEXT, worker TEXT, attempts INTEGER DEFAULT 0, created REAL, "
+                "claimed REAL, heartbeat REAL, finished REAL, result TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job["outputs"] = json.loads(job["outputs"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def submit(self, plan: List[Dict], output_dir: Optional[str] = None) -> List[int]:
+        """Queue every plan item with outputs left to make; items already queued or running are skipped"""
+        ids = []
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for item in plan:
+                    outputs = [{"format": out["format"], "output": out["output"]} for out in item["outputs"] if not out["exists"]]
+                    if not outputs:
+                        continue
+                    encoded = json.dumps(outputs)
+                    active = conn.execute(
+                        "SELECT id FROM jobs WHERE input = ? AND outputs = ? AND status IN (?, ?)",
+                        (item["input"], encoded, QUEUED, RUNNING)
+                    ).fetchone()
+                    if active:
+                        continue
+                    cursor = conn.execute(
+                        "INSERT INTO jobs (input, outputs, output_dir, status, created) VALUES (?, ?, ?, ?, ?)",
+                        (item["input"], encoded, output_dir, QUEUED, time.time())
+                    )
+                    ids.append(cursor.lastrowid)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    def claim(self, worker: str) -> Optional[Dict]:
+        """Atomically take the oldest queued job"""
+        now = time.time()
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT id FROM jobs WHERE status = ? ORDER BY id LIMIT 1", (QUEUED,)).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, claimed = ?, heartbeat = ? WHERE id = ?",
+                    (RUNNING, worker, now, now, row["id"])
+                )
+                job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return self._job(job)
+
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        """Refresh a claim; False if the job was requeued and now belongs to someone else"""
+        with self._lock, closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE id = ? AND worker = ? AND status = ?",
+                (time.time(), job_id, worker, RUNNING)
+            )
+            return cursor.rowcount == 1
+
+    def finish(self, job_id: int, worker: str, status: str, result: List[Dict]) -> bool:
+        with self._lock, closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, finished = ?, result = ? WHERE id = ? AND worker = ? AND status = ?",
+                (status, time.time(), json.dumps(result), job_id, worker, RUNNING)
+            )
+            return cursor.rowcount == 1
+
+    def release(self, job_id: int, worker: str) -> None:
+        """Hand a claimed job back to the queue, e.g. when its worker shuts down"""
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, attempts = MAX(attempts - 1, 0) WHERE id = ? AND worker = ? AND status = ?",
+                (QUEUED, job_id, worker, RUNNING)
+            )
+
+    def requeue_stale(self, stale_after: float) -> int:
+        """Requeue running jobs without a heartbeat for stale_after seconds; fail those out of attempts"""
+        cutoff = time.time() - stale_after
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                failed = conn.execute(
+                    "UPDATE jobs SET status = 'failed', finished = ?, result = ? WHERE status = ? AND heartbeat < ? AND attempts >= ?",
+                    (time.time(), json.dumps([{"error": "Worker stopped responding"}]), RUNNING, cutoff, MAX_ATTEMPTS)
+                ).rowcount
+                requeued = conn.execute(
+                    "UPDATE jobs SET status = ?, worker = NULL WHERE status = ? AND heartbeat < ?",
+                    (QUEUED, RUNNING, cutoff)
+                ).rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return requeued + failed
+
+    def requeue(self, statuses: List[str]) -> int:
+        """Put finished jobs in the given states back in the queue with fresh attempts"""
+        if not statuses:
+            return 0
+        marks = ", ".join("?" for _ in statuses)
+        with self._lock, closing(self._connect()) as conn:
+            return conn.execute(
+                f"UPDATE jobs SET status = ?, worker = NULL, attempts = 0, finished = NULL, result = NULL WHERE status IN ({marks})",
+                [QUEUED] + list(statuses)
+            ).rowcount
+
+    def jobs(self) -> List[Dict]:
+        with self._lock, closing(self._connect()) as conn:
+            return [self._job(row) for row in conn.execute("SELECT * FROM jobs ORDER BY id")]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock, closing(self._connect()) as conn:
+            return {row["status"]: row["n"] for row in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
@@ -0,0 +1,68 @@
+import os
+import json
+import time
+import threading
+from typing import Dict
+
+# Stage names written to the journal, in the order a job passes through them
+F16_STARTED = "f16_started"
+F16_DONE = "f16_done"
+QUANT_DONE = "quant_done"
+CLEANUP_DONE = "cleanup_done"
+
+def default_journal_path() -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "journal.jsonl")
+
+def job_id(item: Dict) -> str:
+    """Stable identity of a plan item: the source fingerprint when known, else its path"""
+    return item.get("fingerprint") or os.path.abspath(item["input"])
+
+class JobJournal:
+    """Append-only JSON-lines record of every stage transition in a batch.
+
+    Each line is flushed and fsynced before the stage is considered done, so after
+    a crash the journal never claims more than actually happened.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, job: str, stage: str, **fields) -> None:
+        entry = {"time": time.time(), "job": job, "stage": stage}
+        entry.update(fields)
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def load(self) -> Dict[str, Dict]:
+        """Replay the journal into the latest state of every job"""
+        states = {}
+        if not os.path.exists(self.path):
+            return states
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write
+                    continue
+                state = states.setdefault(entry["job"], {"f16": None, "f16_cached": False, "quants": {}, "cleaned": False})
+                stage = entry["stage"]
+                if stage == F16_STARTED:
+                    # A new F16 supersedes whatever was recorded before
+                    state["f16"] = None
+                    state["cleaned"] = False
+                elif stage == F16_DONE:
+                    state["f16"] = entry.get("path")
+                    state["f16_cached"] = entry.get("cached", False)
+                elif stage == QUANT_DONE:
+                    state["quants"][entry["format"]] = entry.get("output")
+                elif stage == CLEANUP_DONE:
+                    state["cleaned"] = True
+        return states
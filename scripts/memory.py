@@ -0,0 +1,120 @@
+import os
+import threading
+from contextlib import contextmanager
+import psutil
+from safetensors_utils import read_header, num_elements
+from gguf_export import select_tensors, DEFAULT_BUFFER_BYTES, DEFAULT_CAST_THREADS
+
+# Interpreter/executable, libraries and GGUF metadata, on top of any tensor buffers
+STAGE_BASE_BYTES = 256 * 1024 * 1024
+
+def largest_tensor_elements(path: str) -> int:
+    """Element count of the biggest tensor in a safetensors model, or 0 if it can't be read"""
+    try:
+        tensors = select_tensors(read_header(path))
+    except (OSError, ValueError, KeyError, TypeError):
+        return 0
+    return max((num_elements(info["shape"]) for info in tensors.values()), default=0)
+
+def estimate_export_memory(path: str, native: bool = True, buffer_bytes: int = DEFAULT_BUFFER_BYTES, threads: int = DEFAULT_CAST_THREADS) -> int:
+    """Peak memory of writing an F16 or direct outputs from path"""
+    if not native:
+        # convert.py loads the whole state dict before writing
+        return os.path.getsize(path) + STAGE_BASE_BYTES if os.path.exists(path) else STAGE_BASE_BYTES
+    # The exporter converts fixed-size chunks whatever the model size: each cast
+    # thread's buffers plus the temporaries of quantizing one chunk to Q8_0/BF16
+    return buffer_bytes * 8 * max(1, threads or DEFAULT_CAST_THREADS) + STAGE_BASE_BYTES
+
+def estimate_quantize_memory(path: str) -> int:
+    """Peak memory of one llama-quantize run on the F16 made from path.
+
+    The F16 itself is memory-mapped and can be paged out, so only the per-tensor
+    F32 and quantized work buffers count.
+    """
+    return largest_tensor_elements(path) * 8 + STAGE_BASE_BYTES
+
+class MemoryAdmission:
+    """Holds back stages until their estimated peak memory fits in available RAM.
+
+    Available memory is re-read from psutil while waiting. Memory promised to
+    running stages is subtracted as well, since they may not have allocated it
+    yet. A stage is always admitted when nothing else is running, so an
+    estimate larger than the machine can't stall the batch.
+    """
+
+    def __init__(self, reserve_bytes: int = 0, poll_interval: float = 1.0):
+        self.reserve_bytes = max(0, reserve_bytes or 0)
+        self.poll_interval = poll_interval
+        self.held = 0
+        self.running = 0
+        self._cond = threading.Condition()
+
+    def _fits(self, nbytes: int) -> bool:
+        available = psutil.virtual_memory().available
+        return available - self.held - nbytes >= self.reserve_bytes
+
+    def acquire(self, nbytes: int, on_wait=None) -> None:
+        with self._cond:
+            waited = False
+            while self.running > 0 and not self._fits(nbytes):
+                if on_wait and not waited:
+                    on_wait()
+                waited = True
+                self._cond.wait(timeout=self.poll_interval)
+            self.held += nbytes
+            self.running += 1
+
+    def release(self, nbytes: int) -> None:
+        with self._cond:
+            self.held = max(0, self.held - nbytes)
+            self.running = max(0, self.running - 1)
+            self._cond.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes: int, on_wait=None):
+        self.acquire(nbytes, on_wait)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
+
+class PeakRssSampler:
+    """Samples the resident memory of a process, and all its descendants unless tree is off, on a background thread"""
+
+    def __init__(self, pid: int, interval: float = 0.5, tree: bool = True):
+        self.pid = pid
+        self.interval = interval
+        self.tree = tree
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"rss-{pid}", daemon=True)
+
+    def _sample(self) -> None:
+        try:
+            process = psutil.Process(self.pid)
+            processes = [process] + (process.children(recursive=True) if self.tree else [])
+        except psutil.Error:
+            return
+        total = 0
+        for proc in processes:
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                # Exited between listing and sampling
+                continue
+        self.peak = max(self.peak, total)
+
+    def _run(self) -> None:
+        while True:
+            self._sample()
+            if self._stop.wait(self.interval):
+                break
+
+    def start(self) -> "PeakRssSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> int:
+        self._stop.set()
+        self._thread.join()
+        return self.peak
@@ -0,0 +1,86 @@
+import os
+import glob
+import queue
+from typing import List, Optional
+
+def parse_cpulist(text: str) -> List[int]:
+    """Expand a kernel CPU list such as "0-3,8-11" """
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-")
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+def format_cpulist(cpus: List[int]) -> str:
+    """Inverse of parse_cpulist, for log messages"""
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(f"{first}-{last}" if first != last else str(first) for first, last in ranges)
+
+def allowed_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def numa_nodes() -> List[List[int]]:
+    """Allowed CPUs grouped by NUMA node; a single group where the topology isn't exposed"""
+    allowed = set(allowed_cpus())
+    nodes = []
+    for path in sorted(glob.glob("/sys/devices/system/node/node[0-9]*/cpulist")):
+        try:
+            with open(path) as f:
+                cpus = [cpu for cpu in parse_cpulist(f.read()) if cpu in allowed]
+        except (OSError, ValueError):
+            continue
+        if cpus:
+            nodes.append(cpus)
+    return nodes or [sorted(allowed)]
+
+def split_cores(cpus: List[int], parts: int) -> List[List[int]]:
+    """Split cpus into parts contiguous sets of near-equal size; sets repeat when there are more parts than cores"""
+    if parts <= len(cpus):
+        size, extra = divmod(len(cpus), parts)
+        sets, start = [], 0
+        for i in range(parts):
+            end = start + size + (1 if i < extra else 0)
+            sets.append(cpus[start:end])
+            start = end
+        return sets
+    return [[cpus[i % len(cpus)]] for i in range(parts)]
+
+def core_sets(workers: int, numa: bool = False) -> List[List[int]]:
+    """One CPU set per concurrent job; with numa, no set spans two nodes"""
+    if not numa:
+        return split_cores(allowed_cpus(), workers)
+    nodes = numa_nodes()
+    # Spread jobs over the nodes round-robin, then split each node among its jobs
+    per_node = [workers // len(nodes) + (1 if i < workers % len(nodes) else 0) for i in range(len(nodes))]
+    sets = []
+    for cpus, count in zip(nodes, per_node):
+        if count:
+            sets.extend(split_cores(cpus, count))
+    return sets
+
+class CorePlacement:
+    """Hands out disjoint CPU sets to concurrently running jobs"""
+
+    def __init__(self, workers: int, numa: bool = False):
+        self._free = queue.Queue()
+        for cpus in core_sets(workers, numa):
+            self._free.put(cpus)
+
+    def acquire(self) -> List[int]:
+        return self._free.get()
+
+    def release(self, cpus: Optional[List[int]]) -> None:
+        if cpus is not None:
+            self._free.put(cpus)
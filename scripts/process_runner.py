@@ -0,0 +1,173 @@
+import os
+import sys
+import subprocess
+import threading
+from typing import List, Dict, Callable, Optional
+import psutil
+from memory import PeakRssSampler
+
+# Seconds a process tree gets to exit after terminate() before it is killed
+TERMINATE_GRACE = 5
+
+# Runs before the tool on Linux: asks the kernel to kill it if this process dies
+# (PR_SET_PDEATHSIG = 1), exits if that already happened, then execs the tool
+PARENT_DEATH_WRAPPER = (
+    "import ctypes, os, signal, sys\n"
+    "ctypes.CDLL(None).prctl(1, signal.SIGKILL)\n"
+    "if os.getppid() != int(sys.argv[1]): sys.exit(1)\n"
+    "os.execvp(sys.argv[2], sys.argv[2:])"
+)
+
+class ConversionCancelled(Exception):
+    """Raised in stages that were running, or about to start, when the batch was cancelled"""
+
+def kill_tree(pid: int, grace: float = TERMINATE_GRACE) -> None:
+    """Terminate a process and all its descendants, killing whatever outlives the grace period"""
+    try:
+        parent = psutil.Process(pid)
+        processes = parent.children(recursive=True) + [parent]
+    except psutil.NoSuchProcess:
+        return
+    for proc in processes:
+        try:
+            proc.terminate()
+        except psutil.NoSuchProcess:
+            pass
+    _, alive = psutil.wait_procs(processes, timeout=grace)
+    for proc in alive:
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+
+def apply_placement(pid: int, affinity: Optional[List[int]] = None, nice: Optional[int] = None) -> None:
+    """Pin a process to CPUs and lower its priority; unsupported settings are skipped"""
+    try:
+        proc = psutil.Process(pid)
+        if affinity and hasattr(proc, "cpu_affinity"):
+            proc.cpu_affinity(list(affinity))
+        if nice:
+            if sys.platform == "win32":
+                # Windows has priority classes rather than nice values
+                proc.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS if nice > 0 else psutil.ABOVE_NORMAL_PRIORITY_CLASS)
+            else:
+                proc.nice(nice)
+    except (psutil.Error, OSError, ValueError) as e:
+        print(f"Could not apply CPU affinity/priority to process {pid}: {e}")
+
+class ProcessRunner:
+    """Runs external tools from argv lists and can cancel every process it started.
+
+    One runner is shared by everything in a batch; how many children run at once
+    is up to the caller's scheduler. cancel() kills every running process tree
+    and makes later run() calls fail with ConversionCancelled until reset().
+    With die_with_parent (Linux only), children are killed when this process
+    dies, even by SIGKILL, instead of running on as orphans.
+    """
+
+    def __init__(self, nice: Optional[int] = None, die_with_parent: bool = False):
+        self.nice = nice
+        self.die_with_parent = die_with_parent and sys.platform.startswith("linux")
+        self._lock = threading.Lock()
+        self._processes: Dict[int, subprocess.Popen] = {}
+        self._labels: Dict[int, str] = {}
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check_cancelled(self) -> None:
+        if self.cancelled:
+            raise ConversionCancelled("Conversion cancelled")
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        with self._lock:
+            pids = list(self._processes)
+        for pid in pids:
+            kill_tree(pid)
+
+    def reset(self) -> None:
+        self._cancelled.clear()
+
+    def running(self) -> Dict[int, str]:
+        """pid and label of every process currently running"""
+        with self._lock:
+            return dict(self._labels)
+
+    def run(self, argv: List[str], cwd: str = None, timeout: float = None, affinity: List[int] = None, nice: int = None, on_line: Callable[[str], None] = None, stats: Dict = None, label: str = None) -> None:
+        """Run argv to completion, echoing its output line by line.
+
+        Raises CalledProcessError on a non-zero exit, TimeoutExpired when the
+        timeout (seconds) is exceeded and ConversionCancelled after cancel().
+        stats, if given, receives the peak RSS of the child's process tree.
+        label names the process in running(), e.g. for resource telemetry.
+        """
+        argv = [str(arg) for arg in argv]
+        self.check_cancelled()
+        print(f"Running command: {subprocess.list2cmdline(argv)}")
+        # A separate process group keeps Ctrl+C in a terminal from reaching the
+        # child directly; the runner decides when children are stopped
+        group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if sys.platform == "win32" else {"start_new_session": True}
+        command = [sys.executable, "-c", PARENT_DEATH_WRAPPER, str(os.getpid())] + argv if self.die_with_parent else argv
+        # llama.cpp logs to stderr, so both streams are merged
+        process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, errors="replace", **group)
+        pinned = False
+        if affinity and hasattr(os, "sched_setaffinity"):
+            # Pinned as soon as the child exists (preexec_fn could deadlock this threaded
+            # process); llama-quantize starts its worker threads only after loading the model
+            try:
+                os.sched_setaffinity(process.pid, set(affinity))
+                pinned = True
+            except OSError:
+                pass
+        with self._lock:
+            self._processes[process.pid] = process
+            self._labels[process.pid] = label or os.path.basename(argv[0])
+        if self.cancelled:
+            # cancel() ran between the check above and registering the process
+            kill_tree(process.pid)
+        apply_placement(process.pid, None if pinned else affinity, nice if nice is not None else self.nice)
+        sampler = PeakRssSampler(process.pid).start()
+        timed_out = threading.Event()
+
+        def expire() -> None:
+            timed_out.set()
+            kill_tree(process.pid)
+
+        timer = threading.Timer(timeout, expire) if timeout else None
+        if timer:
+            timer.daemon = True
+            timer.start()
+        try:
+            try:
+                for line in process.stdout:
+                    sys.stdout.write(line)
+                    if on_line:
+                        on_line(line)
+                returncode = process.wait()
+            except BaseException:
+                # A failing on_line (or KeyboardInterrupt) must not leave the tool running unreaped
+                kill_tree(process.pid)
+                process.wait()
+                raise
+            finally:
+                process.stdout.close()
+        finally:
+            if timer:
+                timer.cancel()
+            peak = sampler.stop()
+            with self._lock:
+                self._processes.pop(process.pid, None)
+                self._labels.pop(process.pid, None)
+
+        print(f"Peak memory of child process: {peak / 1024 ** 2:.0f} MB")
+        if stats is not None:
+            stats["peak_rss"] = peak
+        if self.cancelled:
+            raise ConversionCancelled("Conversion cancelled")
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(argv, timeout)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, argv)
@@ -0,0 +1,92 @@
+import re
+import time
+from typing import Dict, Callable, Optional
+
+# llama-quantize and convert.py number each tensor as "[ 12/ 780]"
+TENSOR_COUNTER = re.compile(r"\[\s*(\d+)\s*/\s*(\d+)\s*\]")
+# Quantized tensors end with "size =    36.00 MiB ->    10.12 MiB", copied ones with "size =    0.000 MB"
+QUANTIZED_SIZE = re.compile(r"size\s*=\s*([\d.]+)\s*MiB\s*->\s*([\d.]+)\s*MiB")
+COPIED_SIZE = re.compile(r"size\s*=\s*([\d.]+)\s*MB")
+
+def parse_line(line: str) -> Optional[Dict]:
+    """Tensor counter and sizes from one line of tool output, or None if it has no counter"""
+    counter = TENSOR_COUNTER.search(line)
+    if counter is None:
+        return None
+    parsed = {"current": int(counter.group(1)), "total": int(counter.group(2)), "mb_in": 0.0, "mb_out": 0.0}
+    sizes = QUANTIZED_SIZE.search(line)
+    if sizes:
+        parsed["mb_in"], parsed["mb_out"] = float(sizes.group(1)), float(sizes.group(2))
+    else:
+        size = COPIED_SIZE.search(line)
+        if size:
+            parsed["mb_in"] = parsed["mb_out"] = float(size.group(1))
+    return parsed
+
+def format_eta(seconds: float) -> str:
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+class StageProgress:
+    """Fraction, throughput and ETA of one stage from its tensor counter.
+
+    Throughput comes from the reported tensor sizes; when the tool doesn't report
+    sizes it is estimated from total_mb and the fraction done.
+    """
+
+    def __init__(self, total_mb: float = 0.0, interval: float = 0.5):
+        self.total_mb = total_mb
+        self.interval = interval
+        self.start = time.time()
+        self.last_report = 0.0
+        self.current = 0
+        self.total = 0
+        self.mb_in = 0.0
+        self.mb_out = 0.0
+
+    def update(self, current: int, total: int, mb_in: float = 0.0, mb_out: float = 0.0) -> bool:
+        """Record a step; True when enough time has passed (or the stage finished) to report it"""
+        self.current, self.total = current, total
+        self.mb_in += mb_in
+        self.mb_out += mb_out
+        now = time.time()
+        if current < total and now - self.last_report < self.interval:
+            return False
+        self.last_report = now
+        return True
+
+    @property
+    def fraction(self) -> float:
+        return min(self.current / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def rate(self) -> float:
+        """Input MB per second"""
+        elapsed = time.time() - self.start
+        done_mb = self.mb_in or self.fraction * self.total_mb
+        return done_mb / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        if not 0 < self.fraction < 1:
+            return None
+        elapsed = time.time() - self.start
+        return elapsed / self.fraction * (1 - self.fraction)
+
+    def describe(self) -> str:
+        parts = [f"{self.current}/{self.total} tensors"]
+        if self.rate > 0:
+            parts.append(f"{self.rate:.1f} MB/s")
+        if self.eta is not None:
+            parts.append(f"ETA {format_eta(self.eta)}")
+        return ", ".join(parts)
+
+def line_handler(on_progress: Callable[..., None]) -> Callable[[str], None]:
+    """Adapt a progress callback taking parse_line's fields to a per-line output callback"""
+    def on_line(line: str) -> None:
+        parsed = parse_line(line)
+        if parsed is not None:
+            on_progress(**parsed)
+    return on_line
@@ -0,0 +1,59 @@
+import os
+import json
+import struct
+from typing import Dict, Tuple
+
+# Bytes per element for every dtype the safetensors format can store
+DTYPE_SIZES = {
+    "F64": 8, "I64": 8, "U64": 8,
+    "F32": 4, "I32": 4, "U32": 4,
+    "F16": 2, "BF16": 2, "I16": 2, "U16": 2,
+    "F8_E4M3": 1, "F8_E5M2": 1, "I8": 1, "U8": 1, "BOOL": 1,
+}
+
+# Refuse absurd header lengths instead of trying to allocate them
+MAX_HEADER_SIZE = 100 * 1024 * 1024
+
+def read_header(path: str) -> Dict:
+    """Read the JSON header of a .safetensors file without touching tensor data"""
+    return read_header_and_offset(path)[0]
+
+def read_header_and_offset(path: str) -> Tuple[Dict, int]:
+    """Like read_header, also returning the file offset where tensor data starts"""
+    with open(path, "rb") as f:
+        prefix = f.read(8)
+        if len(prefix) != 8:
+            raise ValueError(f"Not a safetensors file (truncated header): {path}")
+        (header_size,) = struct.unpack("<Q", prefix)
+        if header_size > MAX_HEADER_SIZE:
+            raise ValueError(f"Not a safetensors file (header too large): {path}")
+        raw = f.read(header_size)
+        if len(raw) != header_size:
+            raise ValueError(f"Not a safetensors file (truncated header): {path}")
+    try:
+        header = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"Not a safetensors file (invalid header): {path}") from e
+    if not isinstance(header, dict):
+        raise ValueError(f"Not a safetensors file (invalid header): {path}")
+    return header, 8 + header_size
+
+def tensor_entries(header: Dict) -> Dict[str, Dict]:
+    return {name: info for name, info in header.items() if name != "__metadata__"}
+
+def num_elements(shape) -> int:
+    count = 1
+    for dim in shape:
+        count *= dim
+    return count
+
+def estimate_f16_bytes(path: str) -> int:
+    """Approximate size of the F16 GGUF produced from a model file"""
+    if path.endswith(".safetensors"):
+        try:
+            header = read_header(path)
+            return sum(num_elements(info["shape"]) * 2 for info in tensor_entries(header).values())
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    # Unknown layout; assume the F16 file is about the size of the source
+    return os.path.getsize(path) if os.path.exists(path) else 0
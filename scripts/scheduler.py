@@ -0,0 +1,90 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Callable, Optional
+from placement import CorePlacement
+
+def cpu_count() -> int:
+    """Number of cores this process is allowed to run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+def resolve_workers(max_workers: Optional[int], n_jobs: int) -> int:
+    # 0/None means "as many as the cores allow", but never more than there are jobs
+    if not max_workers or max_workers < 1:
+        max_workers = cpu_count()
+    return max(1, min(max_workers, n_jobs))
+
+def threads_for_job(workers: int, threads_per_job: Optional[int] = None) -> int:
+    # Split the cores evenly so concurrent jobs don't oversubscribe the machine
+    if threads_per_job and threads_per_job > 0:
+        return threads_per_job
+    return max(1, cpu_count() // max(1, workers))
+
+class QuantizeScheduler:
+    """Runs independent jobs concurrently with a fixed per-job thread budget.
+
+    With pin_cores, each running job also gets its own CPU set (kept within one
+    NUMA node when numa is set) and as many threads as the set has cores.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, threads_per_job: Optional[int] = None, pin_cores: bool = False, numa: bool = False):
+        self.max_workers = max_workers
+        self.threads_per_job = threads_per_job
+        self.pin_cores = pin_cores or numa
+        self.numa = numa
+
+    def run(self, jobs: List[Dict], worker: Callable[[Dict, int, Optional[List[int]]], None], on_done: Callable[[Dict, Optional[Exception]], None] = None) -> None:
+        if not jobs:
+            return
+
+        workers = resolve_workers(self.max_workers, len(jobs))
+        nthreads = threads_for_job(workers, self.threads_per_job)
+        placement = CorePlacement(workers, self.numa) if self.pin_cores else None
+
+        if workers == 1:
+            for job in jobs:
+                self._run_one(job, worker, nthreads, placement, on_done)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quantize") as pool:
+            futures = [pool.submit(self._run_one, job, worker, nthreads, placement, on_done) for job in jobs]
+            for future in as_completed(futures):
+                future.result()
+
+    def _run_one(self, job: Dict, worker: Callable[[Dict, int, Optional[List[int]]], None], nthreads: int, placement: Optional[CorePlacement], on_done: Callable[[Dict, Optional[Exception]], None]) -> None:
+        error = None
+        cpus = placement.acquire() if placement else None
+        if cpus and not (self.threads_per_job and self.threads_per_job > 0):
+            # One thread per pinned core
+            nthreads = len(cpus)
+        try:
+            worker(job, nthreads, cpus)
+        except Exception as e:
+            error = e
+        finally:
+            if placement:
+                placement.release(cpus)
+        if on_done:
+            on_done(job, error)
+
+class ByteBudget:
+    """Blocks callers until the requested number of bytes fits under a limit"""
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit if limit and limit > 0 else None
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, nbytes: int) -> None:
+        with self._cond:
+            # A single item larger than the whole budget is still admitted once nothing else is held
+            while self.limit is not None and self.used > 0 and self.used + nbytes > self.limit:
+                self._cond.wait()
+            self.used += nbytes
+
+    def release(self, nbytes: int) -> None:
+        with self._cond:
+            self.used = max(0, self.used - nbytes)
+            self._cond.notify_all()
@@ -0,0 +1,381 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+import converter
+from fingerprint import default_index
+from journal import JobJournal, default_journal_path
+from events import EventRecorder
+from process_runner import ProcessRunner
+from convert_safetensors_to_gguf import parse_manifest
+
+# Progress events kept per submission for clients that connect late
+MAX_EVENTS = 1000
+
+# Largest request body accepted
+MAX_BODY_BYTES = 1024 * 1024
+
+# Request fields a submission may set; the scheduler limits stay the server's
+PLAN_OPTIONS = ["keep_f16"]
+
+STATUS_TEXT = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def plan_options(server: Dict, requested: Dict) -> Dict:
+    """The server's options with a submission's own settings applied.
+
+    Requests may only tighten the scheduler limits: fewer workers or threads,
+    a shorter timeout, more memory or disk kept free, a lower priority.
+    Pipelining and core pinning are the server's choice alone.
+    """
+    options = dict(server)
+    for key in PLAN_OPTIONS:
+        if key in requested:
+            options[key] = bool(requested[key])
+    try:
+        nice = requested.get("nice")
+        if nice is not None:
+            if int(nice) < 0:
+                raise HttpError(400, "nice can't be negative")
+            options["nice"] = max(int(nice), server.get("nice") or 0)
+        # 0 leaves the server's setting; for workers and threads it means one per core
+        for key, kind, default in (("max_workers", int, os.cpu_count()), ("threads_per_job", int, os.cpu_count()), ("timeout_minutes", float, None)):
+            value = kind(requested.get(key) or 0)
+            if value < 0:
+                raise HttpError(400, f"{key} can't be negative")
+            limit = server.get(key) or default
+            if value:
+                options[key] = min(value, limit) if limit else value
+        for key in ("min_free_gb", "memory_reserve_gb"):
+            if requested.get(key) is not None:
+                options[key] = max(float(requested[key]), server.get(key, 0))
+        if requested.get("max_intermediate_gb"):
+            limit = server.get("max_intermediate_gb")
+            options["max_intermediate_gb"] = min(float(requested["max_intermediate_gb"]), limit) if limit else float(requested["max_intermediate_gb"])
+        if server.get("pipeline") and requested.get("pipeline") is False:
+            options["pipeline"] = False
+    except (TypeError, ValueError):
+        raise HttpError(400, "Invalid option value")
+    return options
+
+class Submission:
+    """One submitted plan: its state, progress history and final report"""
+
+    def __init__(self, jobs: List[Dict], options: Dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.jobs = jobs
+        self.options = options
+        self.status = "queued"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.progress = 0.0
+        self.message = ""
+        self.plan = None
+        self.timings = None
+        self.error = None
+        self.runner = ProcessRunner(nice=options.get("nice"))
+        self.events = []
+        self.first_seq = 0
+        self.updated = asyncio.Event()
+
+    def add_event(self, kind: str, data: Dict) -> None:
+        """Append an event and wake streaming clients; runs on the event loop"""
+        seq = self.first_seq + len(self.events)
+        self.events.append({"seq": seq, "event": kind, "data": data})
+        if len(self.events) > MAX_EVENTS:
+            drop = len(self.events) - MAX_EVENTS
+            del self.events[:drop]
+            self.first_seq += drop
+        self.updated.set()
+        self.updated = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("finished", "cancelled", "failed")
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "inputs": [path for job in self.jobs for path in job["inputs"]],
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished
+        }
+
+    def report(self) -> Dict:
+        report = self.summary()
+        report["jobs"] = converter.plan_report(self.plan) if self.plan is not None else []
+        report["stage_timings"] = self.timings
+        if self.error:
+            report["error"] = self.error
+        return report
+
+class ConversionService:
+    """Queues submitted plans and runs them with the shared engine.
+
+    At most concurrent_plans plans run at a time, each with the configured
+    scheduler limits, so queued requests never oversubscribe the machine.
+    """
+
+    def __init__(self, options: Dict, concurrent_plans: int = 1, journal_path: str = None):
+        self.options = options
+        self.concurrent_plans = max(1, concurrent_plans)
+        self.journal = JobJournal(journal_path or default_journal_path())
+        self.fingerprints = default_index()
+        self.submissions: Dict[str, Submission] = {}
+        self.pending: Optional[asyncio.Queue] = None
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrent_plans, thread_name_prefix="plan")
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.pending = asyncio.Queue()
+        for _ in range(self.concurrent_plans):
+            asyncio.create_task(self._consume())
+
+    def submit(self, body: Dict) -> Submission:
+        try:
+            manifest = parse_manifest(body, os.getcwd(), "Request")
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        options = plan_options(self.options, manifest["options"])
+        submission = Submission(manifest["jobs"], options)
+        self.submissions[submission.id] = submission
+        submission.add_event("status", submission.summary())
+        self.pending.put_nowait(submission)
+        return submission
+
+    def cancel(self, submission: Submission) -> None:
+        if submission.done:
+            return
+        if submission.status == "queued":
+            self._finish(submission, "cancelled")
+            return
+        submission.message = "Cancelling..."
+        # Killing process trees waits for them to exit, so keep it off the event loop
+        threading.Thread(target=submission.runner.cancel, daemon=True).start()
+
+    def _finish(self, submission: Submission, status: str) -> None:
+        submission.status = status
+        submission.finished = time.time()
+        submission.add_event("status", submission.summary())
+        submission.add_event("finished", submission.report())
+
+    async def _consume(self) -> None:
+        while True:
+            submission = await self.pending.get()
+            if submission.done:
+                continue
+            submission.status = "running"
+            submission.started = time.time()
+            submission.add_event("status", submission.summary())
+            try:
+                await self.loop.run_in_executor(self.executor, self._run, submission)
+                status = "cancelled" if submission.runner.cancelled else "finished"
+            except Exception as e:
+                submission.error = str(e)
+                status = "failed"
+            self._finish(submission, status)
+
+    def _publish(self, submission: Submission, kind: str, data: Dict) -> None:
+        # Called from conversion threads; events are only touched on the loop
+        self.loop.call_soon_threadsafe(submission.add_event, kind, data)
+
+    def _run(self, submission: Submission) -> None:
+        options = submission.options
+        plan = []
+        for job in submission.jobs:
+            plan.extend(converter.generate_conversion_plan(job["inputs"], job["formats"], fingerprints=self.fingerprints, output_dir=job["output_dir"]))
+        submission.plan = plan
+
+        def progress_callback(info: Dict) -> None:
+            submission.progress = info["progress"]
+            submission.message = info["message"]
+            self._publish(submission, "progress", {key: info[key] for key in ("progress", "message", "current", "total", "rate", "eta") if key in info})
+
+        events = EventRecorder()
+        paths = converter.get_base_paths()
+        converter.process_models(
+            plan,
+            paths["convert_script_dir"],
+            paths["llama_quantize_exe"],
+            progress_callback=progress_callback,
+            keep_f16=options.get("keep_f16", False),
+            max_workers=options.get("max_workers", 1),
+            threads_per_job=options.get("threads_per_job") or None,
+            pipeline=options.get("pipeline", False),
+            max_intermediate_bytes=int(options.get("max_intermediate_gb", 0) * 1024 ** 3) or None,
+            journal=self.journal,
+            events=events,
+            min_free_bytes=int(options.get("min_free_gb", 1) * 1024 ** 3),
+            memory_reserve_bytes=int(options.get("memory_reserve_gb", 2) * 1024 ** 3),
+            runner=submission.runner,
+            process_timeout=options.get("timeout_minutes", 0) * 60 or None,
+            pin_cores=options.get("pin_cores", False),
+            numa=options.get("numa", False)
+        )
+        keys = ["stage", "runs", "failed", "mb_in", "mb_out", "seconds", "mb_per_s"]
+        submission.timings = [dict(zip(keys, row)) for row in events.summary()]
+
+    def get(self, submission_id: str) -> Submission:
+        submission = self.submissions.get(submission_id)
+        if submission is None:
+            raise HttpError(404, f"No job {submission_id}")
+        return submission
+
+    def shutdown(self) -> None:
+        for submission in self.submissions.values():
+            if submission.status == "running":
+                submission.runner.cancel()
+        self.executor.shutdown(wait=False)
+
+async def read_request(reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    if not request_line:
+        raise ConnectionError("Empty request")
+    try:
+        method, target, _ = request_line.split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target.split("?", 1)[0], headers, body
+
+def write_json(writer: asyncio.StreamWriter, status: int, payload) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+        + body
+    )
+
+async def stream_events(writer: asyncio.StreamWriter, submission: Submission, last_seq: int) -> None:
+    """Server-sent events: history after last_seq, then live events until the submission ends"""
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n")
+    next_seq = last_seq + 1
+    while True:
+        updated = submission.updated
+        # Events may have been trimmed from the front while this client waited
+        start = max(0, next_seq - submission.first_seq)
+        for entry in submission.events[start:]:
+            writer.write(f"id: {entry['seq']}\nevent: {entry['event']}\ndata: {json.dumps(entry['data'])}\n\n".encode("utf-8"))
+            next_seq = entry["seq"] + 1
+        await writer.drain()
+        if submission.done and next_seq >= submission.first_seq + len(submission.events):
+            return
+        try:
+            await asyncio.wait_for(updated.wait(), timeout=15)
+        except asyncio.TimeoutError:
+            # Keeps proxies from closing an idle stream
+            writer.write(b": keep-alive\n\n")
+
+async def handle(service: ConversionService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        try:
+            method, path, headers, body = await read_request(reader)
+            parts = [part for part in path.split("/") if part]
+
+            if parts == ["jobs"] and method == "GET":
+                write_json(writer, 200, [submission.summary() for submission in service.submissions.values()])
+            elif parts == ["jobs"] and method == "POST":
+                try:
+                    payload = json.loads(body or b"{}")
+                except ValueError:
+                    raise HttpError(400, "Request body must be JSON")
+                submission = service.submit(payload)
+                write_json(writer, 202, submission.summary())
+            elif len(parts) == 2 and parts[0] == "jobs" and method == "GET":
+                write_json(writer, 200, service.get(parts[1]).summary())
+            elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events" and method == "GET":
+                await stream_events(writer, service.get(parts[1]), int(headers.get("last-event-id", -1)))
+            elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel" and method == "POST":
+                submission = service.get(parts[1])
+                service.cancel(submission)
+                write_json(writer, 202, submission.summary())
+            elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "report" and method == "GET":
+                submission = service.get(parts[1])
+                if not submission.done:
+                    raise HttpError(409, f"Job {submission.id} is still {submission.status}")
+                write_json(writer, 200, submission.report())
+            elif parts and parts[0] == "jobs":
+                raise HttpError(405, f"{method} not allowed on {path}")
+            else:
+                raise HttpError(404, f"Unknown path {path}")
+        except HttpError as e:
+            write_json(writer, e.status, {"error": str(e)})
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            write_json(writer, 400, {"error": str(e)})
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(args) -> None:
+    options = {
+        "max_workers": args.max_workers,
+        "threads_per_job": args.threads_per_job,
+        "pipeline": args.pipeline,
+        "keep_f16": args.keep_f16,
+        "pin_cores": args.pin_cores,
+        "numa": args.numa,
+        "min_free_gb": args.min_free_gb,
+        "memory_reserve_gb": args.memory_reserve_gb,
+        "timeout_minutes": args.timeout_minutes
+    }
+    service = ConversionService(options, args.concurrent_plans, args.journal)
+    await service.start()
+    server = await asyncio.start_server(lambda r, w: handle(service, r, w), args.host, args.port)
+    print(f"Conversion service listening on http://{args.host}:{args.port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP service that queues and runs GGUF conversions")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--concurrent-plans", type=int, default=1, help="Submitted plans to run at the same time")
+    parser.add_argument("--max-workers", type=int, default=1, help="Quantizations to run in parallel per plan (0 = one per CPU core)")
+    parser.add_argument("--threads-per-job", type=int, default=0, help="Threads given to each llama-quantize job (0 = split the cores evenly)")
+    parser.add_argument("--pipeline", action="store_true", help="Export the next model's F16 while the current one is quantized")
+    parser.add_argument("--keep-f16", action="store_true", help="Keep the intermediate F16 files")
+    parser.add_argument("--pin-cores", action="store_true", help="Pin each parallel quantization to its own set of cores")
+    parser.add_argument("--numa", action="store_true", help="Like --pin-cores, keeping each core set on a single NUMA node")
+    parser.add_argument("--min-free-gb", type=float, default=1, help="Disk space to leave free")
+    parser.add_argument("--memory-reserve-gb", type=float, default=2, help="RAM to keep available")
+    parser.add_argument("--timeout-minutes", type=float, default=0, help="Stop any single child process that runs longer than this (0 = no limit)")
+    parser.add_argument("--journal", default=default_journal_path(), help="Journal file recording each finished stage")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\nService stopped")
+
+if __name__ == "__main__":
+    main()
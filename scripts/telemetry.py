@@ -0,0 +1,253 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import List, Dict, Optional
+import psutil
+from tabulate import tabulate
+
+try:
+    # NVML reads GPU counters in-process; GPUtil starts nvidia-smi for every reading
+    import pynvml
+except ImportError:
+    pynvml = None
+
+try:
+    import GPUtil
+except ImportError:
+    GPUtil = None
+
+# Seconds between GPU retries once no GPU tool worked, doubling up to the maximum
+GPU_BACKOFF = 30.0
+MAX_GPU_BACKOFF = 600.0
+
+# Label of this process, which runs the native exports in-process
+SELF_LABEL = "this process"
+
+class GpuProbe:
+    """GPU load and memory of the first GPU, read at most every interval seconds.
+
+    Uses NVML when pynvml is installed, else GPUtil. When neither works (no
+    driver, no nvidia-smi, no GPU) it stops trying for a while and backs off
+    further on every failure, so machines without a GPU pay almost nothing.
+    """
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self.last: Optional[Dict] = None
+        self._next = 0.0
+        self._backoff = GPU_BACKOFF
+        self._nvml = None
+
+    def _read_nvml(self) -> Optional[Dict]:
+        if self._nvml is None:
+            pynvml.nvmlInit()
+            self._nvml = pynvml.nvmlDeviceGetHandleByIndex(0)
+        load = pynvml.nvmlDeviceGetUtilizationRates(self._nvml).gpu
+        memory = pynvml.nvmlDeviceGetMemoryInfo(self._nvml)
+        return {"gpu_percent": float(load), "gpu_memory_used": memory.used, "gpu_memory_total": memory.total}
+
+    def _read_gputil(self) -> Optional[Dict]:
+        gpus = GPUtil.getGPUs()
+        if not gpus:
+            return None
+        gpu = gpus[0]
+        return {"gpu_percent": gpu.load * 100, "gpu_memory_used": int(gpu.memoryUsed * 1024 ** 2), "gpu_memory_total": int(gpu.memoryTotal * 1024 ** 2)}
+
+    def read(self, now: float) -> Optional[Dict]:
+        """Latest GPU reading, refreshed when due; None while no GPU is available"""
+        if now < self._next:
+            return self.last
+        reading = None
+        for module, reader in ((pynvml, self._read_nvml), (GPUtil, self._read_gputil)):
+            if module is None:
+                continue
+            try:
+                reading = reader()
+            except Exception:
+                reading = None
+            if reading is not None:
+                break
+        if reading is None:
+            self._next = now + self._backoff
+            self._backoff = min(self._backoff * 2, MAX_GPU_BACKOFF)
+        else:
+            self._next = now + self.interval
+            self._backoff = GPU_BACKOFF
+        self.last = reading
+        return reading
+
+class TelemetrySampler:
+    """Samples system and per-job resource use at a fixed interval on one background thread.
+
+    The last history samples are kept in a ring buffer. Every child the runner
+    is running is attributed to its label (e.g. "model.safetensors Q4_K_S")
+    with the CPU, RSS and IO of its whole process tree; this process, which
+    runs the native exports, is attributed to SELF_LABEL. Per-label totals
+    cover the whole run, not just the samples still in the buffer.
+    """
+
+    def __init__(self, runner=None, interval: float = 1.0, history: int = 600, gpu_interval: float = 5.0):
+        self.runner = runner
+        self.interval = interval
+        self.samples = deque(maxlen=max(1, history))
+        self.gpu = GpuProbe(gpu_interval)
+        self.totals: Dict[str, Dict] = {}
+        # IO counters of each label when its totals started; children start from zero
+        self._io_start: Dict[str, tuple] = {}
+        self._processes: Dict[int, psutil.Process] = {}
+        self._io: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _process(self, pid: int) -> psutil.Process:
+        # Processes are kept between samples so cpu_percent() measures since the last one
+        proc = self._processes.get(pid)
+        if proc is None:
+            proc = self._processes[pid] = psutil.Process(pid)
+            proc.cpu_percent(None)
+        return proc
+
+    def _usage(self, pid: int, tree: bool) -> Optional[Dict]:
+        """CPU percent, RSS and IO bytes of pid, plus its descendants when tree is set"""
+        try:
+            root = self._process(pid)
+            pids = [pid] + ([child.pid for child in root.children(recursive=True)] if tree else [])
+        except psutil.Error:
+            return None
+        usage = {"cpu_percent": 0.0, "rss": 0, "read_bytes": 0, "write_bytes": 0}
+        for member in pids:
+            try:
+                proc = self._process(member)
+                with proc.oneshot():
+                    usage["cpu_percent"] += proc.cpu_percent(None)
+                    usage["rss"] += proc.memory_info().rss
+                    if hasattr(proc, "io_counters"):
+                        io = proc.io_counters()
+                        self._io[member] = (io.read_bytes, io.write_bytes)
+            except (psutil.Error, OSError):
+                # Exited between listing and sampling, or IO counters not permitted
+                pass
+            read_bytes, write_bytes = self._io.get(member, (0, 0))
+            usage["read_bytes"] += read_bytes
+            usage["write_bytes"] += write_bytes
+        return usage
+
+    def sample(self) -> Dict:
+        now = time.time()
+        memory = psutil.virtual_memory()
+        entry = {"time": now, "cpu_percent": psutil.cpu_percent(None), "memory_percent": memory.percent, "memory_used": memory.used, "gpu": self.gpu.read(now), "jobs": []}
+
+        running = self.runner.running() if self.runner is not None else {}
+        targets = [(SELF_LABEL, os.getpid(), False)] + [(label, pid, True) for pid, label in running.items()]
+        for label, pid, tree in targets:
+            usage = self._usage(pid, tree)
+            if usage is None:
+                continue
+            usage.update({"label": label, "pid": pid})
+            entry["jobs"].append(usage)
+
+        with self._lock:
+            for usage in entry["jobs"]:
+                total = self.totals.setdefault(usage["label"], {"samples": 0, "cpu_seconds": 0.0, "peak_rss": 0, "read_bytes": 0, "write_bytes": 0})
+                total["samples"] += 1
+                total["cpu_seconds"] += usage["cpu_percent"] / 100 * self.interval
+                total["peak_rss"] = max(total["peak_rss"], usage["rss"])
+                if usage["label"] == SELF_LABEL:
+                    self._io_start.setdefault(SELF_LABEL, (usage["read_bytes"], usage["write_bytes"]))
+                # IO counters are cumulative per process, so the latest reading gives the total
+                read_start, write_start = self._io_start.get(usage["label"], (0, 0))
+                total["read_bytes"] = max(total["read_bytes"], usage["read_bytes"] - read_start)
+                total["write_bytes"] = max(total["write_bytes"], usage["write_bytes"] - write_start)
+            self.samples.append(entry)
+        # Forget processes that have exited
+        live = {usage["pid"] for usage in entry["jobs"]}
+        for pid in [pid for pid in self._processes if pid not in live and not self._alive(pid)]:
+            self._processes.pop(pid, None)
+            self._io.pop(pid, None)
+        return entry
+
+    def _alive(self, pid: int) -> bool:
+        proc = self._processes.get(pid)
+        try:
+            return proc is not None and proc.is_running() and proc.status() != psutil.STATUS_ZOMBIE
+        except psutil.Error:
+            return False
+
+    def _run(self) -> None:
+        next_tick = time.monotonic()
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Error sampling resource usage: {e}")
+            # Fixed rate: a slow sample shortens the following wait instead of drifting
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                next_tick = time.monotonic()
+                delay = 0
+            if self._stop.wait(delay):
+                return
+
+    def start(self) -> "TelemetrySampler":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset_totals(self) -> None:
+        """Start per-label totals afresh, e.g. at the start of a batch"""
+        with self._lock:
+            self.totals = {}
+            self._io_start = {}
+
+    def latest(self) -> Optional[Dict]:
+        with self._lock:
+            return self.samples[-1] if self.samples else None
+
+    def history(self, seconds: float = None) -> List[Dict]:
+        """Samples in the ring buffer, oldest first; only the last seconds if given"""
+        with self._lock:
+            samples = list(self.samples)
+        if seconds is not None:
+            cutoff = time.time() - seconds
+            samples = [entry for entry in samples if entry["time"] >= cutoff]
+        return samples
+
+    def report(self, seconds: float = None) -> Dict:
+        """Per-label totals and the sampled history, for run reports"""
+        with self._lock:
+            totals = {label: dict(total) for label, total in self.totals.items()}
+        return {"interval": self.interval, "jobs": totals, "history": self.history(seconds)}
+
+    def summary_table(self) -> str:
+        with self._lock:
+            rows = [
+                [label, f"{total['cpu_seconds']:.1f}", f"{total['peak_rss'] / 1024 ** 2:.0f}", f"{total['read_bytes'] / 1024 ** 2:.1f}", f"{total['write_bytes'] / 1024 ** 2:.1f}"]
+                for label, total in self.totals.items()
+            ]
+        return tabulate(rows, headers=["Process", "CPU Seconds", "Peak RSS MB", "MB Read", "MB Written"], tablefmt="grid")
+
+def format_status(entry: Optional[Dict]) -> str:
+    """One-line summary of a sample for status bars"""
+    if entry is None:
+        return ""
+    text = f"CPU: {entry['cpu_percent']:.0f}% | RAM: {entry['memory_percent']:.0f}%"
+    gpu = entry["gpu"]
+    if gpu is not None:
+        text += f" | GPU: {gpu['gpu_percent']:.1f}% ({gpu['gpu_memory_used'] / 1024 ** 2:.0f}MB/{gpu['gpu_memory_total'] / 1024 ** 2:.0f}MB)"
+    else:
+        text += " | GPU: N/A"
+    children = [job for job in entry["jobs"] if job["label"] != SELF_LABEL]
+    if children:
+        text += " | " + ", ".join(f"{job['label']}: {job['cpu_percent']:.0f}% {job['rss'] / 1024 ** 3:.1f}GB" for job in children)
+    return text
@@ -0,0 +1,99 @@
+import os
+import threading
+from typing import List, Dict, Optional, Tuple
+from safetensors_utils import read_header_and_offset, tensor_entries, num_elements, DTYPE_SIZES
+from gguf_export import select_tensors, detect_arch, RAW_DTYPES
+from gguf_check import is_output_fresh
+
+SUPPORTED_EXTENSIONS = [".safetensors", ".pth", ".pt", ".bin"]
+
+def check_safetensors(path: str, size: int) -> Optional[str]:
+    """Why a safetensors file can't be converted, from its JSON header alone; None if it looks fine"""
+    try:
+        header, data_start = read_header_and_offset(path)
+    except OSError as e:
+        return f"Unreadable: {e.strerror or e}"
+    except ValueError:
+        return "Invalid safetensors header"
+    try:
+        entries = tensor_entries(header)
+        end = max((info["data_offsets"][1] for info in entries.values()), default=0)
+        if data_start + end > size:
+            return "Truncated file"
+        for info in entries.values():
+            if info["data_offsets"][1] - info["data_offsets"][0] != num_elements(info["shape"]) * DTYPE_SIZES.get(info["dtype"], 0):
+                return "Invalid safetensors header"
+        tensors = select_tensors(header)
+        detect_arch(tensors)
+    except ValueError as e:
+        return str(e)
+    except (KeyError, TypeError, IndexError):
+        return "Invalid safetensors header"
+    unsupported = sorted({info["dtype"] for info in tensors.values()} - set(RAW_DTYPES))
+    if unsupported:
+        return f"Unsupported tensor types: {', '.join(unsupported)}"
+    return None
+
+class ValidationCache:
+    """Input and output checks, cached until the file's size or mtime changes.
+
+    Safe to share between threads; the GUI runs checks on a worker so slow
+    (e.g. network) filesystems never block the window.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inputs: Dict[str, Tuple[Tuple[int, int], Optional[str]]] = {}
+        self._outputs: Dict[Tuple[str, str, Optional[str]], Tuple[Tuple[int, int], bool]] = {}
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def check_input(self, path: str) -> Optional[str]:
+        """Why path isn't a convertible model, or None if it is"""
+        stat = self._stat(path)
+        if stat is None:
+            return "File not found"
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in SUPPORTED_EXTENSIONS:
+            return f"Unsupported format: {ext}"
+        with self._lock:
+            cached = self._inputs.get(path)
+        if cached is not None and cached[0] == stat:
+            return cached[1]
+        # PyTorch pickles can't be inspected without loading them, so only safetensors are parsed
+        reason = check_safetensors(path, stat[1]) if ext == ".safetensors" else None
+        with self._lock:
+            self._inputs[path] = (stat, reason)
+        return reason
+
+    def output_exists(self, path: str, fmt: str, fingerprint: Optional[str] = None) -> bool:
+        """is_output_fresh, repeated only when the output changed"""
+        stat = self._stat(path)
+        if stat is None:
+            return False
+        key = (path, fmt, fingerprint)
+        with self._lock:
+            cached = self._outputs.get(key)
+        if cached is not None and cached[0] == stat:
+            return cached[1]
+        fresh = is_output_fresh(path, fmt, fingerprint)
+        with self._lock:
+            self._outputs[key] = (stat, fresh)
+        return fresh
+
+def expected_outputs(path: str, formats: List[str], output_dir: Optional[str] = None) -> Dict[str, str]:
+    """Output path of each format for an input, as the conversion plan names them"""
+    f16_model = path.replace(".safetensors", "-F16.gguf")
+    outputs = {}
+    for fmt in formats:
+        output = f16_model.replace("-F16.gguf", f"-{fmt}.gguf")
+        if output_dir:
+            output = os.path.join(output_dir, os.path.basename(output))
+        outputs[fmt] = output
+    return outputs
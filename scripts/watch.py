@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+import select
+import signal
+import ctypes
+import argparse
+import threading
+from typing import List, Dict, Optional, Tuple
+import converter
+from fingerprint import default_index
+from journal import JobJournal, default_journal_path
+from process_runner import ProcessRunner
+from gguf_check import PARTIAL_SUFFIX
+from convert_safetensors_to_gguf import display_summary
+
+# inotify events that mean a file in the folder was written, created or moved in
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+class Inotify:
+    """Wakes a polling loop early when a folder changes (Linux only, through libc)"""
+
+    def __init__(self, folder: str):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {folder}")
+
+    def wait(self, timeout: float) -> bool:
+        """Block until the folder changes or timeout seconds pass; True if it changed"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        # Only the wake-up matters; the events themselves are discarded
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+def open_inotify(folder: str) -> Optional[Inotify]:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return Inotify(folder)
+    except (OSError, AttributeError) as e:
+        print(f"inotify not available, polling only: {e}")
+        return None
+
+class FolderWatcher:
+    """Finds .safetensors files in a folder that are new or changed and done being written.
+
+    A file is ready once its size and modification time have not changed for
+    stable_seconds. Each version of a file is reported once; a file that is
+    rewritten later is reported again. Polling finds every change, inotify
+    (where available) only wakes the loop sooner.
+    """
+
+    def __init__(self, folder: str, recursive: bool = False, interval: float = 5.0, stable_seconds: float = 10.0, use_inotify: bool = True):
+        self.folder = os.path.abspath(folder)
+        self.recursive = recursive
+        self.interval = interval
+        self.stable_seconds = stable_seconds
+        # Path -> (size, mtime) and when that version was first seen
+        self._candidates: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        self._reported: Dict[str, Tuple[int, int]] = {}
+        self._inotify = open_inotify(self.folder) if use_inotify else None
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        """Size and mtime of every .safetensors file in the folder"""
+        found = {}
+        pending = [self.folder]
+        while pending:
+            directory = pending.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError as e:
+                print(f"Could not scan {directory}: {e}")
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        if self.recursive:
+                            pending.append(entry.path)
+                    elif entry.name.endswith(".safetensors") and not entry.name.endswith(PARTIAL_SUFFIX):
+                        st = entry.stat()
+                        found[entry.path] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    # Removed while scanning
+                    continue
+        return found
+
+    def poll(self) -> List[str]:
+        """Files that became ready since the last poll"""
+        now = time.monotonic()
+        found = self.scan()
+        ready = []
+        for path, stat in found.items():
+            if self._reported.get(path) == stat:
+                continue
+            candidate = self._candidates.get(path)
+            if candidate is None or candidate[0] != stat:
+                # New, or still being written: start the stability clock again
+                self._candidates[path] = (stat, now)
+                continue
+            if now - candidate[1] >= self.stable_seconds and stat[0] > 0:
+                ready.append(path)
+                self._reported[path] = stat
+                del self._candidates[path]
+        for path in list(self._candidates):
+            if path not in found:
+                del self._candidates[path]
+        return sorted(ready)
+
+    def wait(self, stop: threading.Event) -> None:
+        """Sleep until the next poll is due; while files are settling, poll often enough to catch them"""
+        timeout = min(self.interval, self.stable_seconds) if self._candidates else self.interval
+        if self._inotify is not None:
+            deadline = time.monotonic() + timeout
+            while not stop.is_set() and time.monotonic() < deadline:
+                # Short slices so stop is noticed without a separate wake-up fd
+                if self._inotify.wait(min(1.0, max(0.0, deadline - time.monotonic()))):
+                    # Let the writer get ahead before looking; the stability clock decides the rest
+                    stop.wait(min(1.0, self.interval))
+                    return
+        else:
+            stop.wait(timeout)
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+def convert_ready(paths: List[str], args, runner: ProcessRunner) -> List[Dict]:
+    """Plan the configured formats for newly ready files and convert only the missing outputs"""
+    plan = converter.generate_conversion_plan(paths, args.outputs, fingerprints=default_index(), output_dir=args.output_dir)
+    plan = [item for item in plan if any(not out["exists"] for out in item["outputs"])]
+    if not plan:
+        print(f"All outputs already exist for: {', '.join(os.path.basename(path) for path in paths)}")
+        return plan
+    base_paths = converter.get_base_paths()
+    converter.process_models(
+        plan,
+        base_paths["convert_script_dir"],
+        base_paths["llama_quantize_exe"],
+        progress_callback=lambda info: print(f"[{info['progress']:5.1f}%] {info['message']}"),
+        keep_f16=args.keep_f16,
+        max_workers=args.max_workers,
+        threads_per_job=args.threads_per_job or None,
+        journal=JobJournal(args.journal),
+        runner=runner
+    )
+    display_summary(plan)
+    return plan
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a folder and convert every new or changed .safetensors file as it arrives")
+    parser.add_argument("--folder", required=True, help="Folder to watch")
+    parser.add_argument("--outputs", nargs="+", required=True, help="Output quantization formats")
+    parser.add_argument("--output-dir", help="Directory for the output files (default: next to each input)")
+    parser.add_argument("--recursive", action="store_true", help="Also watch subfolders")
+    parser.add_argument("--interval", type=float, default=5, help="Seconds between folder scans")
+    parser.add_argument("--stable-seconds", type=float, default=10, help="A file is converted once its size hasn't changed for this long")
+    parser.add_argument("--no-inotify", action="store_true", help="Only poll, e.g. on network filesystems where inotify misses remote writes")
+    parser.add_argument("--once", action="store_true", help="Convert what is already in the folder, then exit")
+    parser.add_argument("--max-workers", type=int, default=1, help="Quantizations to run in parallel (0 = one per CPU core)")
+    parser.add_argument("--threads-per-job", type=int, default=0, help="Threads given to each llama-quantize job (0 = split the cores evenly)")
+    parser.add_argument("--keep-f16", action="store_true", help="Keep the intermediate F16 files")
+    parser.add_argument("--journal", default=default_journal_path(), help="Journal file recording each finished stage")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.folder):
+        print(f"Error: Not a folder: {args.folder}")
+        sys.exit(2)
+    args.output_dir = os.path.abspath(args.output_dir) if args.output_dir else None
+
+    watcher = FolderWatcher(args.folder, recursive=args.recursive, interval=args.interval, stable_seconds=args.stable_seconds, use_inotify=not args.no_inotify)
+    runner = ProcessRunner()
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        print("\nStopping, cancelling any running conversion...")
+        stopping.set()
+        threading.Thread(target=runner.cancel, daemon=True).start()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    if args.once:
+        # Files already present count as settled
+        watcher.stable_seconds = 0
+        watcher.poll()
+    print(f"Watching {watcher.folder} for .safetensors files ({', '.join(args.outputs)})")
+    try:
+        while not stopping.is_set():
+            ready = watcher.poll()
+            if ready:
+                print(f"\nReady: {', '.join(os.path.basename(path) for path in ready)}")
+                try:
+                    convert_ready(ready, args, runner)
+                except Exception as e:
+                    # A failed batch is retried only once its files change again
+                    print(f"Error converting {', '.join(ready)}: {e}")
+            if args.once:
+                break
+            watcher.wait(stopping)
+    finally:
+        watcher.close()
+    print("Stopped watching")
+
+if __name__ == "__main__":
+    main()
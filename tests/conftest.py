@@ -0,0 +1,44 @@
+import os
+import sys
+import json
+import struct
+import numpy as np
+import pytest
+
+# The scripts import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+# Tensor names that make the exporter recognise a Flux model
+FLUX_KEY = "double_blocks.0.img_attn.proj.weight"
+
+def write_safetensors(path: str, tensors: dict, dtype: str = "BF16") -> str:
+    """Write {name: uint16/float array} as a safetensors file; uint16 arrays are raw BF16 bits"""
+    header, blobs, offset = {}, [], 0
+    for name, array in tensors.items():
+        data = np.ascontiguousarray(array).tobytes()
+        header[name] = {"dtype": dtype, "shape": list(array.shape), "data_offsets": [offset, offset + len(data)]}
+        blobs.append(data)
+        offset += len(data)
+    encoded = json.dumps(header).encode("utf-8")
+    encoded += b" " * (-len(encoded) % 8)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        for data in blobs:
+            f.write(data)
+    return path
+
+def bf16_bits(values: np.ndarray) -> np.ndarray:
+    """BF16 bits of float32 values, truncated"""
+    return (np.asarray(values, dtype=np.float32).view(np.uint32) >> 16).astype(np.uint16)
+
+@pytest.fixture
+def flux_model(tmp_path):
+    """A tiny BF16 checkpoint the exporter accepts, with one tensor too large for a single small chunk"""
+    rng = np.random.default_rng(0)
+    tensors = {
+        FLUX_KEY: bf16_bits(rng.standard_normal((64, 256))),
+        "double_blocks.0.img_attn.proj.bias": bf16_bits(rng.standard_normal(64)),
+        "final_layer.linear.weight": bf16_bits(rng.standard_normal((32, 512)) * 1e-6),
+    }
+    return write_safetensors(str(tmp_path / "model.safetensors"), tensors), tensors
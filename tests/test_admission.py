@@ -0,0 +1,38 @@
+import admission
+from admission import DiskAdmission
+
+GB = 1024 ** 3
+
+def need(outputs: float, f16: float = 0, directory: str = "/data") -> dict:
+    return {"directory": directory, "outputs": int(outputs * GB), "f16": int(f16 * GB)}
+
+def free_space(monkeypatch, **free_gb):
+    monkeypatch.setattr(admission, "free_bytes", lambda directory: int(free_gb[directory.strip("/")] * GB))
+
+def test_admitted_outputs_reduce_space_for_later_jobs(monkeypatch):
+    free_space(monkeypatch, data=10)
+    disk = DiskAdmission()
+    assert disk.admit({1: need(4, 2)}) is None
+    assert disk.admit({1: need(4, 2)}) is None
+    # 8 GB of outputs are now spoken for; the F16 files are gone once each job ends
+    reason = disk.admit({1: need(1, 2)})
+    assert reason is not None and "Not enough disk space in /data" in reason
+    # A smaller job later in the plan still fits
+    assert disk.admit({1: need(1)}) is None
+
+def test_kept_f16_stays_reserved(monkeypatch):
+    free_space(monkeypatch, data=10)
+    disk = DiskAdmission(keep_f16=True)
+    assert disk.admit({1: need(2, 4)}) is None
+    assert disk.admit({1: need(2, 4)}) is not None
+
+def test_min_free_bytes_is_held_back(monkeypatch):
+    free_space(monkeypatch, data=10)
+    assert DiskAdmission(min_free_bytes=7 * GB).admit({1: need(4)}) is not None
+    assert DiskAdmission(min_free_bytes=5 * GB).admit({1: need(4)}) is None
+
+def test_rejected_job_reserves_nothing_on_any_device(monkeypatch):
+    free_space(monkeypatch, data=10, scratch=1)
+    disk = DiskAdmission()
+    assert disk.admit({1: need(6), 2: need(0, 2, "/scratch")}) is not None
+    assert disk.admit({1: need(9)}) is None
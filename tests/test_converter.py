@@ -0,0 +1,107 @@
+import os
+import shutil
+import gguf
+import benchmark
+import converter
+from gguf_check import is_output_fresh
+from events import EventRecorder
+from fingerprint import FingerprintIndex
+
+def file_type(path: str) -> int:
+    return gguf.GGUFReader(path).get_field(gguf.Keys.General.FILE_TYPE).contents()
+
+def test_requested_f16_output_is_the_quantize_input(tmp_path, flux_model):
+    src, _ = flux_model
+    output_dir = str(tmp_path / "out")
+    plan = converter.generate_conversion_plan([src], ["F16", "Q4_K_S"], output_dir=output_dir)
+    converter.process_models(plan, "", benchmark.fake_quantize_command(str(tmp_path)), memory_aware=False)
+    assert [out["status"] for out in plan[0]["outputs"]] == ["done", "done"]
+    assert plan[0]["f16"] == os.path.join(output_dir, "model-F16.gguf")
+    # No second F16 was written next to the source
+    assert sorted(os.listdir(tmp_path)) == ["llama-quantize", "model.safetensors", "out"]
+    assert sorted(os.listdir(output_dir)) == ["model-F16.gguf", "model-Q4_K_S.gguf"]
+
+def test_existing_f16_output_is_reused_not_rewritten(tmp_path, flux_model):
+    src, _ = flux_model
+    quantize = benchmark.fake_quantize_command(str(tmp_path))
+    fingerprints = FingerprintIndex(str(tmp_path / "fingerprints.sqlite"))
+    plan = converter.generate_conversion_plan([src], ["F16"], fingerprints=fingerprints)
+    converter.process_models(plan, "", quantize, memory_aware=False)
+    f16 = plan[0]["outputs"][0]["output"]
+    assert file_type(f16) == gguf.LlamaFileType.MOSTLY_F16
+    written = os.stat(f16).st_mtime_ns
+
+    plan = converter.generate_conversion_plan([src], ["F16", "Q4_K_S"], fingerprints=fingerprints)
+    converter.process_models(plan, "", quantize, memory_aware=False)
+    assert [out["status"] for out in plan[0]["outputs"]] == ["skipped", "done"]
+    assert plan[0]["f16"] == f16
+    assert os.stat(f16).st_mtime_ns == written
+    assert file_type(f16) == gguf.LlamaFileType.MOSTLY_F16
+    assert is_output_fresh(f16, "F16", plan[0]["fingerprint"])
+
+def test_intermediate_is_f16_for_bf16_sources(tmp_path, flux_model):
+    src, _ = flux_model
+    plan = converter.generate_conversion_plan([src], ["Q4_K_S"], output_dir=str(tmp_path / "out"))
+    converter.process_models(plan, "", benchmark.fake_quantize_command(str(tmp_path)), keep_f16=True, memory_aware=False)
+    assert file_type(plan[0]["f16"]) == gguf.LlamaFileType.MOSTLY_F16
+
+def test_tagged_run_leaves_other_writers_partial_files_alone(tmp_path, flux_model):
+    src, _ = flux_model
+    plan = converter.generate_conversion_plan([src], ["F16"])
+    output = plan[0]["outputs"][0]["output"]
+    other = output + ".worker-1.part"
+    with open(other, "wb") as f:
+        f.write(b"another worker's file")
+    converter.process_models(plan, "", "llama-quantize-not-needed", memory_aware=False, partial_tag="worker-2")
+    assert is_output_fresh(output, "F16")
+    assert open(other, "rb").read() == b"another worker's file"
+    assert sorted(os.listdir(tmp_path)) == ["model-F16.gguf", "model-F16.gguf.worker-1.part", "model.safetensors"]
+
+def convert(plan) -> EventRecorder:
+    events = EventRecorder()
+    converter.process_models(plan, "", "llama-quantize-not-needed", events=events, memory_aware=False)
+    return events
+
+def test_copies_of_a_model_share_one_export(tmp_path, flux_model):
+    src, _ = flux_model
+    (tmp_path / "copy").mkdir()
+    copy = str(tmp_path / "copy" / "model.safetensors")
+    shutil.copyfile(src, copy)
+    fingerprints = FingerprintIndex(str(tmp_path / "fingerprints.sqlite"))
+    plan = converter.generate_conversion_plan([src, copy], ["F16", "Q8_0"], fingerprints=fingerprints)
+    assert plan[0]["fingerprint"] == plan[1]["fingerprint"]
+
+    events = convert(plan)
+    first, second = plan
+    assert [out["status"] for out in first["outputs"] + second["outputs"]] == ["done"] * 4
+    assert second["duplicate_of"] == src
+    for original, linked in zip(first["outputs"], second["outputs"]):
+        assert linked["linked_from"] == original["output"]
+        assert os.path.dirname(linked["output"]) == str(tmp_path / "copy")
+        with open(original["output"], "rb") as a, open(linked["output"], "rb") as b:
+            assert a.read() == b.read()
+    # Only the first copy was exported
+    assert [record["input"] for record in events.stages] == [src]
+
+def test_symlinked_model_is_linked_without_fingerprints(tmp_path, flux_model):
+    src, _ = flux_model
+    (tmp_path / "links").mkdir()
+    link = str(tmp_path / "links" / "model.safetensors")
+    os.symlink(src, link)
+    plan = converter.generate_conversion_plan([src, link], ["Q8_0"])
+    convert(plan)
+    assert plan[1]["outputs"][0]["status"] == "done"
+    assert plan[1]["outputs"][0]["linked_from"] == plan[0]["outputs"][0]["output"]
+
+def test_failed_source_fails_its_links(tmp_path, flux_model):
+    src, _ = flux_model
+    (tmp_path / "copy").mkdir()
+    copy = str(tmp_path / "copy" / "model.safetensors")
+    os.symlink(src, copy)
+    plan = converter.generate_conversion_plan([src, copy], ["Q4_K_S"])
+    # No llama-quantize here, so the quantization of the first copy fails
+    convert(plan)
+    assert plan[0]["outputs"][0]["status"] == "failed"
+    assert plan[1]["outputs"][0]["status"] == "failed"
+    assert "was not made" in plan[1]["outputs"][0]["error"]
+    assert not os.path.exists(plan[1]["outputs"][0]["output"])
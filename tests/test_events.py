@@ -0,0 +1,68 @@
+import json
+import subprocess
+import pytest
+from events import EventRecorder, open_recorder
+
+def test_stage_records_sizes_times_and_peak(tmp_path):
+    events = EventRecorder()
+    output = tmp_path / "out.gguf"
+    with events.stage("job", "f16_export", bytes_in=100, outputs=[str(output)], input="model.safetensors") as record:
+        output.write_bytes(b"x" * 40)
+        block = bytearray(64 * 1024 * 1024)
+    del block
+    record = events.stages[0]
+    assert record["job"] == "job" and record["stage"] == "f16_export" and record["input"] == "model.safetensors"
+    assert record["bytes_in"] == 100 and record["bytes_out"] == 40
+    assert record["exit_code"] == 0 and "error" not in record
+    assert record["end"] >= record["start"] and record["duration"] == record["end"] - record["start"]
+    assert record["peak_rss"] >= 64 * 1024 * 1024
+
+def test_peak_is_per_stage_not_per_process():
+    events = EventRecorder()
+    with events.stage("job", "big"):
+        block = bytearray(200 * 1024 * 1024)
+    del block
+    with events.stage("job", "small"):
+        pass
+    big, small = events.stages
+    assert small["peak_rss"] < big["peak_rss"] - 100 * 1024 * 1024
+
+def test_child_stage_keeps_the_childs_peak():
+    events = EventRecorder()
+    with events.stage("job", "quantize", sample_rss=False) as record:
+        record["peak_rss"] = 1234
+    assert events.stages[0]["peak_rss"] == 1234
+
+def test_failed_stage_records_exit_code_and_error(tmp_path):
+    events = EventRecorder()
+    output = tmp_path / "out.gguf"
+    output.write_bytes(b"partial")
+    with pytest.raises(subprocess.CalledProcessError):
+        with events.stage("job", "quantize", outputs=[str(output)], sample_rss=False):
+            raise subprocess.CalledProcessError(3, ["llama-quantize"])
+    record = events.stages[0]
+    assert record["exit_code"] == 3
+    assert record["bytes_out"] == 0
+    assert "exit status 3" in record["error"]
+
+def test_events_stream_to_a_file_and_summarize(tmp_path):
+    path = tmp_path / "events.jsonl"
+    events = open_recorder(str(path))
+    events.emit("run_start", jobs=1)
+    with events.stage("job", "cleanup", bytes_in=2 * 1024 ** 2):
+        pass
+    with events.stage("job", "cleanup", bytes_in=2 * 1024 ** 2):
+        pass
+    events.close()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["event"] for line in lines] == ["run_start", "stage_start", "stage_end", "stage_start", "stage_end"]
+    assert lines[2]["stage"] == "cleanup" and "outputs" not in lines[2]
+    (row,) = events.summary()
+    assert row[:5] == ["cleanup", 2, 0, "4.0", "0.0"]
+
+def test_unreachable_sink_only_disables_streaming():
+    events = open_recorder("tcp://127.0.0.1:1")
+    assert events.sink is None
+    with events.stage("job", "cleanup"):
+        pass
+    assert len(events.stages) == 1
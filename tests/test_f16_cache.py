@@ -0,0 +1,60 @@
+import os
+from f16_cache import F16Cache
+
+def add_entry(cache: F16Cache, tmp_path, name: str, size: int, mtime: int) -> str:
+    """Put a size-byte file into the cache as key name, last used at mtime"""
+    staged = tmp_path / f"{name}.gguf"
+    staged.write_bytes(b"x" * size)
+    path = cache.put(name, str(staged))
+    os.utime(path, (mtime, mtime))
+    return path
+
+def test_get_misses_until_put(tmp_path):
+    cache = F16Cache(str(tmp_path / "cache"))
+    key = cache.key_for("model.safetensors", "abc")
+    assert key == cache.key_for("other.safetensors", "abc")
+    assert key != cache.key_for("model.safetensors", "abd")
+    assert cache.get(key) is None
+    staged = cache.staging_path(key)
+    with open(staged, "wb") as f:
+        f.write(b"gguf")
+    assert cache.put(key, staged) == cache.path_for(key)
+    assert cache.get(key) == cache.path_for(key)
+    assert not os.path.exists(staged)
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = F16Cache(str(tmp_path / "cache"))
+    old = add_entry(cache, tmp_path, "old", 40, 1000)
+    hit = add_entry(cache, tmp_path, "hit", 40, 1001)
+    newer = add_entry(cache, tmp_path, "newer", 40, 1002)
+    # A hit makes "hit" the most recently used entry
+    cache.get("hit")
+    cache.max_bytes = 100
+    cache.evict()
+    assert not os.path.exists(old)
+    assert os.path.exists(hit) and os.path.exists(newer)
+    cache.max_bytes = 50
+    cache.evict()
+    assert os.path.exists(hit) and not os.path.exists(newer)
+
+def test_entries_in_use_are_never_evicted(tmp_path):
+    cache = F16Cache(str(tmp_path / "cache"))
+    pinned = add_entry(cache, tmp_path, "pinned", 40, 1000)
+    other = add_entry(cache, tmp_path, "other", 40, 1001)
+    cache.acquire("pinned")
+    cache.acquire("pinned")
+    cache.max_bytes = 50
+    cache.evict()
+    assert os.path.exists(pinned) and not os.path.exists(other)
+    cache.release("pinned")
+    assert os.path.exists(pinned)
+    # Evicted once the last reader is done, since the cache is still over its limit
+    cache.max_bytes = 10
+    cache.release("pinned")
+    assert not os.path.exists(pinned)
+
+def test_unlimited_cache_keeps_everything(tmp_path):
+    cache = F16Cache(str(tmp_path / "cache"), max_bytes=0)
+    paths = [add_entry(cache, tmp_path, f"e{i}", 1000, 1000 + i) for i in range(3)]
+    cache.evict()
+    assert all(os.path.exists(path) for path in paths)
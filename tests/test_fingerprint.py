@@ -0,0 +1,60 @@
+import os
+import fingerprint
+from fingerprint import FingerprintIndex, content_hash
+
+def counting_hashes(monkeypatch) -> list:
+    calls = []
+
+    def counted(path):
+        calls.append(path)
+        return content_hash(path)
+    monkeypatch.setattr(fingerprint, "content_hash", counted)
+    return calls
+
+def test_unchanged_file_is_answered_from_the_index(tmp_path, flux_model, monkeypatch):
+    src, _ = flux_model
+    index = FingerprintIndex(str(tmp_path / "index.sqlite"))
+    digest = index.fingerprint(src)
+    assert digest == content_hash(src)
+    calls = counting_hashes(monkeypatch)
+    assert index.fingerprint(src) == digest
+    # A second index on the same file shares the stored record
+    assert FingerprintIndex(index.db_path).fingerprint(src) == digest
+    assert calls == []
+
+def test_changed_mtime_or_size_is_rehashed(tmp_path, monkeypatch):
+    path = tmp_path / "model.safetensors"
+    path.write_bytes(b"\x00" * 8 + b"a" * 100)
+    index = FingerprintIndex(str(tmp_path / "index.sqlite"))
+    calls = counting_hashes(monkeypatch)
+    first = index.fingerprint(str(path))
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert index.fingerprint(str(path)) == first
+    with open(path, "ab") as f:
+        f.write(b"b")
+    assert index.fingerprint(str(path)) != first
+    assert len(calls) == 3
+
+def test_changed_header_with_same_size_and_mtime_is_rehashed(tmp_path, monkeypatch):
+    path = tmp_path / "model.safetensors"
+    path.write_bytes((4).to_bytes(8, "little") + b"{}  " + b"a" * 100)
+    st = os.stat(path)
+    index = FingerprintIndex(str(tmp_path / "index.sqlite"))
+    calls = counting_hashes(monkeypatch)
+    first = index.fingerprint(str(path))
+    # Same size, mtime restored: only the header hash can tell
+    path.write_bytes((4).to_bytes(8, "little") + b"{ } " + b"a" * 100)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert index.fingerprint(str(path)) != first
+    assert len(calls) == 2
+
+def test_symlinks_share_the_record_of_their_target(tmp_path, flux_model, monkeypatch):
+    src, _ = flux_model
+    index = FingerprintIndex(str(tmp_path / "index.sqlite"))
+    digest = index.fingerprint(src)
+    link = tmp_path / "link.safetensors"
+    link.symlink_to(src)
+    calls = counting_hashes(monkeypatch)
+    assert index.fingerprint(str(link)) == digest
+    assert calls == []
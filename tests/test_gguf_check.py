@@ -0,0 +1,57 @@
+import os
+import pytest
+from gguf_export import export_gguf_formats
+from gguf_check import is_output_fresh, partial_path, publish, discard
+
+@pytest.fixture
+def q8_output(tmp_path, flux_model):
+    src, _ = flux_model
+    path = str(tmp_path / "model-Q8_0.gguf")
+    export_gguf_formats(src, {path: "Q8_0"}, source_fingerprint="abc")
+    return path
+
+def test_complete_output_of_the_right_source_is_fresh(q8_output):
+    assert is_output_fresh(q8_output, "Q8_0", "abc")
+    # No expectations at all: only completeness counts
+    assert is_output_fresh(q8_output)
+
+def test_wrong_fingerprint_is_stale(q8_output):
+    assert not is_output_fresh(q8_output, "Q8_0", "other")
+
+def test_wrong_file_type_is_stale(q8_output):
+    assert not is_output_fresh(q8_output, "F16", "abc")
+    assert not is_output_fresh(q8_output, "Q4_K_S", "abc")
+
+def test_truncated_output_is_stale(q8_output):
+    size = os.path.getsize(q8_output)
+    os.truncate(q8_output, size - 1)
+    assert not is_output_fresh(q8_output, "Q8_0", "abc")
+    os.truncate(q8_output, 64)
+    assert not is_output_fresh(q8_output, "Q8_0", "abc")
+
+def test_missing_or_empty_output_is_stale(tmp_path):
+    assert not is_output_fresh(str(tmp_path / "missing.gguf"))
+    empty = tmp_path / "empty.gguf"
+    empty.write_bytes(b"")
+    assert not is_output_fresh(str(empty))
+
+def test_output_without_recorded_fingerprint_is_accepted(tmp_path, flux_model):
+    src, _ = flux_model
+    path = str(tmp_path / "old.gguf")
+    export_gguf_formats(src, {path: "Q8_0"})
+    assert is_output_fresh(path, "Q8_0", "abc")
+
+def test_partial_files_are_published_atomically(tmp_path):
+    final = str(tmp_path / "out.gguf")
+    assert partial_path(final) == final + ".part"
+    temp = partial_path(final)
+    with open(temp, "wb") as f:
+        f.write(b"data")
+    publish(temp, final)
+    assert not os.path.exists(temp) and open(final, "rb").read() == b"data"
+    discard(temp)
+
+def test_tagged_partial_names_keep_overlapping_writers_apart(tmp_path):
+    final = str(tmp_path / "out.gguf")
+    assert partial_path(final, "worker-1") == final + ".worker-1.part"
+    assert partial_path(final, "worker-1") != partial_path(final, "worker-2") != partial_path(final)
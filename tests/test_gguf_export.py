@@ -0,0 +1,64 @@
+import numpy as np
+import gguf
+import pytest
+from gguf_export import bf16_to_f16, export_gguf_formats, ChunkCaster, CHUNK_ALIGN
+
+def reference_f16(bits: np.ndarray) -> np.ndarray:
+    with np.errstate(over="ignore"):
+        return (bits.astype(np.uint32) << 16).view(np.float32).astype(np.float16).view(np.uint16)
+
+def test_bf16_to_f16_matches_float_cast_for_every_value():
+    src = np.arange(1 << 16, dtype=np.uint32).astype(np.uint16)
+    out = np.empty_like(src)
+    bf16_to_f16(src, out, np.empty(src.size, dtype=np.int32))
+    np.testing.assert_array_equal(out, reference_f16(src))
+
+def test_bf16_to_f16_uses_only_the_prefix_of_work():
+    src = np.array([0x3F80, 0xC000, 0x0001, 0x7F80], dtype=np.uint16)
+    out = np.empty_like(src)
+    bf16_to_f16(src, out, np.full(1024, -1, dtype=np.int32))
+    np.testing.assert_array_equal(out, reference_f16(src))
+
+def read_tensors(path):
+    return {tensor.name: tensor for tensor in gguf.GGUFReader(path).tensors}
+
+@pytest.mark.parametrize("threads", [1, 3])
+def test_chunked_export_matches_single_chunk(tmp_path, flux_model, threads):
+    src, tensors = flux_model
+    # The smallest buffer gives one CHUNK_ALIGN-element chunk, so every matrix is split
+    small = {str(tmp_path / f"small-{fmt}.gguf"): fmt for fmt in ("F16", "Q8_0")}
+    large = {str(tmp_path / f"large-{fmt}.gguf"): fmt for fmt in ("F16", "Q8_0")}
+    export_gguf_formats(src, small, buffer_bytes=CHUNK_ALIGN * 4, threads=threads)
+    export_gguf_formats(src, large, threads=threads)
+    for (small_path, fmt), large_path in zip(small.items(), large):
+        chunked, whole = read_tensors(small_path), read_tensors(large_path)
+        assert chunked.keys() == whole.keys() == tensors.keys()
+        for name in tensors:
+            assert chunked[name].tensor_type == whole[name].tensor_type
+            np.testing.assert_array_equal(np.asarray(chunked[name].data), np.asarray(whole[name].data))
+
+def test_f16_export_values(tmp_path, flux_model):
+    src, tensors = flux_model
+    dst = str(tmp_path / "model-F16.gguf")
+    export_gguf_formats(src, {dst: "F16"}, buffer_bytes=CHUNK_ALIGN * 4)
+    written = read_tensors(dst)
+    for name, bits in tensors.items():
+        data = np.asarray(written[name].data).reshape(-1)
+        if bits.ndim == 1:
+            # Biases and norms stay F32, widened exactly
+            assert written[name].tensor_type == gguf.GGMLQuantizationType.F32
+            np.testing.assert_array_equal(data, (bits.astype(np.uint32) << 16).view(np.float32))
+        else:
+            assert written[name].tensor_type == gguf.GGMLQuantizationType.F16
+            np.testing.assert_array_equal(data.view(np.uint16), reference_f16(bits).reshape(-1))
+
+def test_caster_converts_one_chunk_for_several_outputs():
+    caster = ChunkCaster(CHUNK_ALIGN * 4)
+    values = np.linspace(-2, 2, CHUNK_ALIGN, dtype=np.float32)
+    data = (values.view(np.uint32) >> 16).astype(np.uint16)
+    f16 = np.empty(CHUNK_ALIGN * 2, dtype=np.uint8)
+    f32 = np.empty(CHUNK_ALIGN * 4, dtype=np.uint8)
+    caster.convert(data, "BF16", [(gguf.GGMLQuantizationType.F16, f16), (gguf.GGMLQuantizationType.F32, f32)])
+    widened = (data.astype(np.uint32) << 16).view(np.float32)
+    np.testing.assert_array_equal(f32.view(np.float32), widened)
+    np.testing.assert_array_equal(f16.view(np.float16), widened.astype(np.float16))
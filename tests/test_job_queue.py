@@ -0,0 +1,73 @@
+import types
+import pytest
+import job_queue
+from job_queue import JobQueue, MAX_ATTEMPTS
+
+def plan_item(name: str, formats=("Q8_0",)) -> dict:
+    return {"input": f"/models/{name}.safetensors", "outputs": [{"format": fmt, "output": f"/out/{name}-{fmt}.gguf", "exists": False} for fmt in formats]}
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Queue time that only moves when a test advances it"""
+    now = types.SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(job_queue, "time", types.SimpleNamespace(time=lambda: now.value))
+    return now
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return JobQueue(str(tmp_path / "queue.sqlite"))
+
+def test_claim_takes_oldest_job_once(queue):
+    ids = queue.submit([plan_item("a"), plan_item("b")])
+    first = queue.claim("w1")
+    second = queue.claim("w2")
+    assert [first["id"], second["id"]] == ids
+    assert first["status"] == "running" and first["worker"] == "w1" and first["attempts"] == 1
+    assert first["outputs"] == [{"format": "Q8_0", "output": "/out/a-Q8_0.gguf"}]
+    assert queue.claim("w3") is None
+
+def test_submit_skips_finished_outputs_and_active_duplicates(queue):
+    done = plan_item("a")
+    done["outputs"][0]["exists"] = True
+    assert queue.submit([done]) == []
+    assert len(queue.submit([plan_item("b")])) == 1
+    assert queue.submit([plan_item("b")]) == []
+
+def test_requeue_stale_returns_job_to_queue(queue, clock):
+    queue.submit([plan_item("a")])
+    job = queue.claim("w1")
+    assert queue.requeue_stale(60) == 0
+    clock.value += 120
+    assert queue.requeue_stale(60) == 1
+    # The old claim is gone: its heartbeat and result are refused
+    assert not queue.heartbeat(job["id"], "w1")
+    assert not queue.finish(job["id"], "w1", "done", [])
+    again = queue.claim("w2")
+    assert again["id"] == job["id"] and again["attempts"] == 2
+    assert queue.finish(again["id"], "w2", "done", [])
+    assert queue.counts() == {"done": 1}
+
+def test_requeue_stale_fails_job_out_of_attempts(queue, clock):
+    queue.submit([plan_item("a")])
+    for attempt in range(MAX_ATTEMPTS):
+        assert queue.claim(f"w{attempt}")["attempts"] == attempt + 1
+        clock.value += 120
+        assert queue.requeue_stale(60) == 1
+    job = queue.jobs()[0]
+    assert job["status"] == "failed"
+    assert job["result"] == [{"error": "Worker stopped responding"}]
+    assert queue.claim("w9") is None
+
+def test_heartbeat_keeps_claim(queue, clock):
+    queue.submit([plan_item("a")])
+    job = queue.claim("w1")
+    clock.value += 50
+    assert queue.heartbeat(job["id"], "w1")
+    clock.value += 50
+    assert queue.requeue_stale(60) == 0
+
+def test_release_hands_job_back_without_using_an_attempt(queue):
+    queue.submit([plan_item("a")])
+    job = queue.claim("w1")
+    queue.release(job["id"], "w1")
+    assert queue.claim("w2")["attempts"] == 1
@@ -0,0 +1,36 @@
+from journal import JobJournal, F16_STARTED, F16_DONE, QUANT_DONE, CLEANUP_DONE
+
+def test_load_replays_latest_state_per_job(tmp_path):
+    journal = JobJournal(str(tmp_path / "journal.jsonl"))
+    journal.record("a", F16_STARTED, input="a.safetensors")
+    journal.record("a", F16_DONE, path="a-F16.gguf")
+    journal.record("a", QUANT_DONE, format="Q8_0", output="a-Q8_0.gguf")
+    journal.record("b", F16_STARTED, input="b.safetensors")
+    journal.record("b", F16_DONE, path="cache/b.gguf", cached=True)
+    journal.record("b", QUANT_DONE, format="Q4_K_S", output="b-Q4_K_S.gguf")
+    journal.record("b", CLEANUP_DONE, path="cache/b.gguf")
+
+    states = journal.load()
+    assert states["a"] == {"f16": "a-F16.gguf", "f16_cached": False, "quants": {"Q8_0": "a-Q8_0.gguf"}, "cleaned": False}
+    assert states["b"]["f16_cached"] is True
+    assert states["b"]["cleaned"] is True
+
+def test_new_export_supersedes_earlier_f16(tmp_path):
+    journal = JobJournal(str(tmp_path / "journal.jsonl"))
+    journal.record("a", F16_DONE, path="a-F16.gguf")
+    journal.record("a", CLEANUP_DONE, path="a-F16.gguf")
+    journal.record("a", F16_STARTED, input="a.safetensors")
+    state = journal.load()["a"]
+    assert state["f16"] is None
+    assert state["cleaned"] is False
+
+def test_load_skips_torn_last_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = JobJournal(str(path))
+    journal.record("a", QUANT_DONE, format="Q8_0", output="a-Q8_0.gguf")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"time": 1, "job": "a", "stage": "quant_do')
+    assert journal.load()["a"]["quants"] == {"Q8_0": "a-Q8_0.gguf"}
+
+def test_load_of_missing_journal_is_empty(tmp_path):
+    assert JobJournal(str(tmp_path / "sub" / "journal.jsonl")).load() == {}
@@ -0,0 +1,29 @@
+import placement
+from placement import split_cores, core_sets, parse_cpulist, format_cpulist
+
+def test_split_cores_near_equal_contiguous_sets():
+    assert split_cores(list(range(8)), 3) == [[0, 1, 2], [3, 4, 5], [6, 7]]
+    assert split_cores(list(range(4)), 4) == [[0], [1], [2], [3]]
+    assert split_cores([2, 3, 6, 7], 1) == [[2, 3, 6, 7]]
+
+def test_split_cores_repeats_cores_when_oversubscribed():
+    assert split_cores([0, 1], 5) == [[0], [1], [0], [1], [0]]
+
+def test_split_cores_covers_every_core_once():
+    cpus = list(range(13))
+    sets = split_cores(cpus, 4)
+    assert sorted(cpu for cpu_set in sets for cpu in cpu_set) == cpus
+    assert max(map(len, sets)) - min(map(len, sets)) <= 1
+
+def test_core_sets_without_numa_splits_allowed_cpus(monkeypatch):
+    monkeypatch.setattr(placement, "allowed_cpus", lambda: [0, 1, 2, 3, 4, 5])
+    assert core_sets(2) == [[0, 1, 2], [3, 4, 5]]
+
+def test_core_sets_with_numa_never_span_nodes(monkeypatch):
+    monkeypatch.setattr(placement, "numa_nodes", lambda: [[0, 1, 2, 3], [4, 5, 6, 7]])
+    assert core_sets(3, numa=True) == [[0, 1], [2, 3], [4, 5, 6, 7]]
+    assert core_sets(1, numa=True) == [[0, 1, 2, 3]]
+
+def test_cpulist_round_trip():
+    assert parse_cpulist("0-3,8,10-11\n") == [0, 1, 2, 3, 8, 10, 11]
+    assert format_cpulist([11, 0, 1, 2, 3, 8, 10]) == "0-3,8,10-11"
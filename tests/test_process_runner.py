@@ -0,0 +1,65 @@
+import subprocess
+import sys
+import threading
+import time
+import psutil
+import pytest
+from process_runner import ProcessRunner, ConversionCancelled
+
+SLEEPER = [sys.executable, "-c", "import time\nprint('started', flush=True)\ntime.sleep(60)"]
+
+def test_output_lines_and_peak_rss_are_reported():
+    lines, stats = [], {}
+    ProcessRunner().run([sys.executable, "-c", "print('[1/2]'); print('[2/2]')"], on_line=lines.append, stats=stats)
+    assert [line.strip() for line in lines] == ["[1/2]", "[2/2]"]
+    assert stats["peak_rss"] > 0
+
+def test_non_zero_exit_raises():
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        ProcessRunner().run([sys.executable, "-c", "raise SystemExit(3)"])
+    assert error.value.returncode == 3
+
+def test_timeout_kills_the_process():
+    runner = ProcessRunner()
+    start = time.time()
+    with pytest.raises(subprocess.TimeoutExpired):
+        runner.run(SLEEPER, timeout=0.5)
+    assert time.time() - start < 30
+    assert runner.running() == {}
+
+def test_cancel_kills_running_processes_and_blocks_new_ones():
+    runner = ProcessRunner()
+    started = threading.Event()
+    errors = []
+
+    def run() -> None:
+        try:
+            runner.run(SLEEPER, on_line=lambda line: started.set(), label="sleeper")
+        except ConversionCancelled as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert started.wait(30)
+    assert list(runner.running().values()) == ["sleeper"]
+    runner.cancel()
+    thread.join(30)
+    assert not thread.is_alive() and len(errors) == 1
+    with pytest.raises(ConversionCancelled):
+        runner.run([sys.executable, "-c", "pass"])
+    runner.reset()
+    runner.run([sys.executable, "-c", "pass"])
+
+def test_failing_line_callback_kills_and_reaps_the_child():
+    runner = ProcessRunner()
+    pids = []
+
+    def on_line(line: str) -> None:
+        pids.extend(runner.running())
+        raise ValueError("bad line")
+
+    with pytest.raises(ValueError):
+        runner.run(SLEEPER, on_line=on_line)
+    assert len(pids) == 1
+    assert not psutil.pid_exists(pids[0])
+    assert runner.running() == {}
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+import progress
+from progress import parse_line, format_eta, line_handler, StageProgress
+
+QUANTIZED = "[  12/ 780]  double_blocks.0.img_attn.qkv.weight - [ 3072,  9216,     1,     1], type =   bf16, converting to q4_K .. size =    54.00 MiB ->    15.19 MiB"
+COPIED = "[   3/ 780]  img_in.bias - [ 3072,     1,     1,     1], type =    f32, size =    0.012 MB"
+
+def test_quantized_line_reports_both_sizes():
+    assert parse_line(QUANTIZED) == {"current": 12, "total": 780, "mb_in": 54.0, "mb_out": 15.19}
+
+def test_copied_line_reports_one_size_for_both():
+    assert parse_line(COPIED) == {"current": 3, "total": 780, "mb_in": 0.012, "mb_out": 0.012}
+
+def test_counter_without_sizes():
+    assert parse_line("[5/10] writing tensor") == {"current": 5, "total": 10, "mb_in": 0.0, "mb_out": 0.0}
+
+def test_lines_without_a_counter_are_ignored():
+    assert parse_line("llama_model_quantize_internal: model size = 22700.00 MB") is None
+    assert parse_line("") is None
+
+def test_line_handler_forwards_only_counter_lines():
+    seen = []
+    on_line = line_handler(lambda **fields: seen.append(fields))
+    for line in ["loading model", QUANTIZED, "done"]:
+        on_line(line)
+    assert seen == [parse_line(QUANTIZED)]
+
+def test_format_eta():
+    assert format_eta(0) == "0:00"
+    assert format_eta(65.4) == "1:05"
+    assert format_eta(3725) == "1:02:05"
+
+def fake_clock(monkeypatch, start=1000.0):
+    clock = SimpleNamespace(now=start)
+    monkeypatch.setattr(progress, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+def test_stage_progress_throttles_reports_but_not_the_last(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    stage = StageProgress(interval=0.5)
+    clock.now += 1
+    assert stage.update(1, 4)
+    clock.now += 0.1
+    assert not stage.update(2, 4)
+    assert stage.update(4, 4)
+
+def test_stage_progress_rate_and_eta_from_reported_sizes(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    stage = StageProgress()
+    clock.now += 10
+    stage.update(1, 4, mb_in=50.0, mb_out=14.0)
+    assert stage.fraction == 0.25
+    assert stage.rate == 5.0
+    assert stage.eta == 30.0
+    assert stage.describe() == "1/4 tensors, 5.0 MB/s, ETA 0:30"
+
+def test_stage_progress_estimates_rate_from_total_mb(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    stage = StageProgress(total_mb=400.0)
+    clock.now += 10
+    stage.update(2, 4)
+    assert stage.rate == 20.0
+    stage.update(4, 4)
+    assert stage.eta is None
@@ -0,0 +1,90 @@
+import threading
+import time
+import scheduler
+from scheduler import QuantizeScheduler, ByteBudget, resolve_workers, threads_for_job
+
+def test_workers_and_threads(monkeypatch):
+    monkeypatch.setattr(scheduler, "cpu_count", lambda: 8)
+    assert resolve_workers(0, 5) == 5
+    assert resolve_workers(None, 20) == 8
+    assert resolve_workers(4, 2) == 2
+    assert threads_for_job(3) == 2
+    assert threads_for_job(16) == 1
+    assert threads_for_job(2, threads_per_job=6) == 6
+
+def test_runs_jobs_concurrently_up_to_max_workers(monkeypatch):
+    monkeypatch.setattr(scheduler, "cpu_count", lambda: 8)
+    lock = threading.Lock()
+    running = {"now": 0, "peak": 0}
+    threads = []
+
+    def worker(job, nthreads, cpus):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+            threads.append(nthreads)
+        time.sleep(0.05)
+        with lock:
+            running["now"] -= 1
+
+    done = []
+    QuantizeScheduler(max_workers=2).run([{"n": i} for i in range(6)], worker, lambda job, error: done.append((job["n"], error)))
+    assert running["peak"] == 2
+    assert threads == [4] * 6
+    assert sorted(done) == [(i, None) for i in range(6)]
+
+def test_a_failing_job_is_reported_and_the_rest_still_run():
+    def worker(job, nthreads, cpus):
+        if job["n"] == 1:
+            raise RuntimeError("boom")
+
+    done = {}
+    QuantizeScheduler(max_workers=3).run([{"n": i} for i in range(4)], worker, lambda job, error: done.__setitem__(job["n"], error))
+    assert set(done) == {0, 1, 2, 3}
+    assert str(done[1]) == "boom"
+    assert all(done[n] is None for n in (0, 2, 3))
+
+def test_pinned_jobs_get_disjoint_core_sets(monkeypatch):
+    import placement
+    monkeypatch.setattr(placement, "allowed_cpus", lambda: list(range(8)))
+    lock = threading.Lock()
+    held, seen = set(), []
+
+    def worker(job, nthreads, cpus):
+        with lock:
+            assert not held & set(cpus)
+            held.update(cpus)
+            seen.append((nthreads, tuple(cpus)))
+        time.sleep(0.02)
+        with lock:
+            held.difference_update(cpus)
+
+    QuantizeScheduler(max_workers=2, pin_cores=True).run([{} for _ in range(4)], worker)
+    assert sorted(set(seen)) == [(4, (0, 1, 2, 3)), (4, (4, 5, 6, 7))]
+
+def test_byte_budget_blocks_until_bytes_are_released():
+    budget = ByteBudget(100)
+    budget.acquire(60)
+    entered = threading.Event()
+
+    def second():
+        budget.acquire(60)
+        entered.set()
+
+    thread = threading.Thread(target=second, daemon=True)
+    thread.start()
+    assert not entered.wait(0.1)
+    budget.release(60)
+    assert entered.wait(2)
+    thread.join()
+    assert budget.used == 60
+
+def test_byte_budget_admits_an_oversized_item_alone():
+    budget = ByteBudget(100)
+    budget.acquire(500)
+    assert budget.used == 500
+    budget.release(500)
+    unlimited = ByteBudget(0)
+    unlimited.acquire(10 ** 12)
+    unlimited.acquire(10 ** 12)
+    assert unlimited.limit is None
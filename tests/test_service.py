@@ -0,0 +1,65 @@
+import os
+import asyncio
+import pytest
+import service
+from service import plan_options, HttpError, Submission, stream_events
+
+SERVER = {"max_workers": 2, "threads_per_job": 4, "pipeline": False, "keep_f16": False, "pin_cores": True, "numa": False, "min_free_gb": 1, "memory_reserve_gb": 2, "timeout_minutes": 30}
+
+def test_requests_cannot_loosen_server_limits():
+    options = plan_options(SERVER, {"max_workers": 64, "threads_per_job": 64, "timeout_minutes": 0, "memory_reserve_gb": 0, "min_free_gb": 0, "pipeline": True, "pin_cores": False, "numa": True})
+    assert options == SERVER
+
+def test_requests_may_tighten_limits_and_choose_plan_fields():
+    options = plan_options(SERVER, {"max_workers": 1, "timeout_minutes": 5, "memory_reserve_gb": 8, "nice": 10, "keep_f16": True})
+    assert options["max_workers"] == 1
+    assert options["timeout_minutes"] == 5
+    assert options["memory_reserve_gb"] == 8
+    assert options["nice"] == 10
+    assert options["keep_f16"] is True
+
+def test_unlimited_server_settings_are_bounded_by_the_machine():
+    options = plan_options(dict(SERVER, max_workers=0, timeout_minutes=0), {"max_workers": 10 ** 6, "timeout_minutes": 10})
+    assert options["max_workers"] == os.cpu_count()
+    assert options["timeout_minutes"] == 10
+
+@pytest.mark.parametrize("requested", [{"nice": -20}, {"max_workers": -1}, {"max_workers": "many"}])
+def test_invalid_values_are_rejected(requested):
+    with pytest.raises(HttpError) as error:
+        plan_options(SERVER, requested)
+    assert error.value.status == 400
+
+
+class FakeWriter:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+    async def drain(self) -> None:
+        pass
+
+    def sent_ids(self):
+        return [int(line[4:]) for line in self.data.decode().splitlines() if line.startswith("id: ")]
+
+def test_stream_resumes_at_oldest_kept_event_after_trimming(monkeypatch):
+    monkeypatch.setattr(service, "MAX_EVENTS", 3)
+
+    async def scenario() -> FakeWriter:
+        submission = Submission([], {})
+        submission.add_event("progress", {"n": 0})
+        submission.add_event("progress", {"n": 1})
+        writer = FakeWriter()
+        stream = asyncio.ensure_future(stream_events(writer, submission, -1))
+        await asyncio.sleep(0)
+        assert writer.sent_ids() == [0, 1]
+        # Event 2 is trimmed before the waiting client wakes up
+        for n in range(2, 5):
+            submission.add_event("progress", {"n": n})
+        submission.status = "finished"
+        submission.add_event("finished", {})
+        await asyncio.wait_for(stream, 5)
+        return writer
+
+    assert asyncio.run(scenario()).sent_ids() == [0, 1, 3, 4, 5]
@@ -0,0 +1,78 @@
+import os
+import numpy as np
+import converter
+import validation
+from conftest import write_safetensors, FLUX_KEY
+from gguf_export import export_gguf_formats
+from validation import ValidationCache, check_safetensors, expected_outputs
+
+def counting(monkeypatch, name):
+    calls = []
+    original = getattr(validation, name)
+
+    def wrapper(*args):
+        calls.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(validation, name, wrapper)
+    return calls
+
+def touch(path, delta_ns):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + delta_ns))
+
+def test_input_is_checked_again_only_after_it_changes(monkeypatch, flux_model):
+    src, _ = flux_model
+    calls = counting(monkeypatch, "check_safetensors")
+    cache = ValidationCache()
+    assert cache.check_input(src) is None
+    assert cache.check_input(src) is None
+    assert len(calls) == 1
+    touch(src, 1_000_000_000)
+    assert cache.check_input(src) is None
+    assert len(calls) == 2
+    with open(src, "r+b") as f:
+        f.truncate(os.path.getsize(src) - 1)
+    assert cache.check_input(src) == "Truncated file"
+    assert len(calls) == 3
+
+def test_missing_and_unsupported_inputs(tmp_path):
+    cache = ValidationCache()
+    assert cache.check_input(str(tmp_path / "gone.safetensors")) == "File not found"
+    other = tmp_path / "model.ckpt"
+    other.write_bytes(b"x")
+    assert cache.check_input(str(other)) == "Unsupported format: .ckpt"
+
+def test_safetensors_problems_are_named(tmp_path):
+    garbage = tmp_path / "garbage.safetensors"
+    garbage.write_bytes(b"\xff" * 64)
+    assert check_safetensors(str(garbage), 64) == "Invalid safetensors header"
+    f64 = write_safetensors(str(tmp_path / "f64.safetensors"), {FLUX_KEY: np.zeros((4, 4), dtype=np.float64)}, dtype="F64")
+    assert check_safetensors(f64, os.path.getsize(f64)) == "Unsupported tensor types: F64"
+
+def test_output_freshness_is_rechecked_after_it_changes(monkeypatch, tmp_path, flux_model):
+    src, _ = flux_model
+    output = str(tmp_path / "model-Q8_0.gguf")
+    export_gguf_formats(src, {output: "Q8_0"}, source_fingerprint="abc")
+    calls = counting(monkeypatch, "is_output_fresh")
+    cache = ValidationCache()
+    assert cache.output_exists(output, "Q8_0", "abc")
+    assert cache.output_exists(output, "Q8_0", "abc")
+    assert len(calls) == 1
+    # A different source fingerprint is a different question
+    assert not cache.output_exists(output, "Q8_0", "other")
+    assert len(calls) == 2
+    with open(output, "r+b") as f:
+        f.truncate(os.path.getsize(output) // 2)
+    assert not cache.output_exists(output, "Q8_0", "abc")
+    assert len(calls) == 3
+    os.remove(output)
+    assert not cache.output_exists(output, "Q8_0", "abc")
+    assert len(calls) == 3
+
+def test_expected_outputs_match_the_conversion_plan(tmp_path, flux_model):
+    src, _ = flux_model
+    for output_dir in (None, str(tmp_path / "out")):
+        plan = converter.generate_conversion_plan([src], ["F16", "Q8_0", "Q4_K_S"], output_dir=output_dir)
+        planned = {out["format"]: out["output"] for out in plan[0]["outputs"]}
+        assert expected_outputs(src, ["F16", "Q8_0", "Q4_K_S"], output_dir) == planned
@@ -0,0 +1,71 @@
+import os
+import types
+import pytest
+import watch
+from watch import FolderWatcher
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = types.SimpleNamespace(value=100.0)
+    monkeypatch.setattr(watch, "time", types.SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+def write(path, data: bytes, mtime: int) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+    os.utime(path, ns=(mtime, mtime))
+
+def test_file_is_ready_once_stable(tmp_path, clock):
+    watcher = FolderWatcher(str(tmp_path), stable_seconds=10, use_inotify=False)
+    path = str(tmp_path / "model.safetensors")
+    write(path, b"x" * 10, 1)
+    assert watcher.poll() == []
+    clock.value += 5
+    assert watcher.poll() == []
+    clock.value += 5
+    assert watcher.poll() == [path]
+    # Reported once per version
+    clock.value += 20
+    assert watcher.poll() == []
+
+def test_growing_file_restarts_the_clock(tmp_path, clock):
+    watcher = FolderWatcher(str(tmp_path), stable_seconds=10, use_inotify=False)
+    path = str(tmp_path / "model.safetensors")
+    write(path, b"x" * 10, 1)
+    watcher.poll()
+    clock.value += 8
+    write(path, b"x" * 20, 2)
+    assert watcher.poll() == []
+    clock.value += 8
+    assert watcher.poll() == []
+    clock.value += 2
+    assert watcher.poll() == [path]
+
+def test_rewritten_file_is_reported_again(tmp_path, clock):
+    watcher = FolderWatcher(str(tmp_path), stable_seconds=0, use_inotify=False)
+    path = str(tmp_path / "model.safetensors")
+    write(path, b"x" * 10, 1)
+    watcher.poll()
+    assert watcher.poll() == [path]
+    write(path, b"y" * 10, 2)
+    watcher.poll()
+    assert watcher.poll() == [path]
+
+def test_ignores_empty_partial_and_other_files(tmp_path, clock):
+    watcher = FolderWatcher(str(tmp_path), stable_seconds=0, use_inotify=False)
+    write(str(tmp_path / "empty.safetensors"), b"", 1)
+    write(str(tmp_path / "model.safetensors.part"), b"x", 1)
+    write(str(tmp_path / "notes.txt"), b"x", 1)
+    watcher.poll()
+    assert watcher.poll() == []
+
+def test_subfolders_only_when_recursive(tmp_path, clock):
+    (tmp_path / "sub").mkdir()
+    path = str(tmp_path / "sub" / "model.safetensors")
+    write(path, b"x", 1)
+    flat = FolderWatcher(str(tmp_path), stable_seconds=0, use_inotify=False)
+    deep = FolderWatcher(str(tmp_path), recursive=True, stable_seconds=0, use_inotify=False)
+    for watcher in (flat, deep):
+        watcher.poll()
+    assert flat.poll() == []
+    assert deep.poll() == [path]